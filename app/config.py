@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict, List, Optional, Set
 
 
 class Settings(BaseSettings):
@@ -11,16 +12,121 @@ class Settings(BaseSettings):
     DB_USER: str = "prescription_user"
     DB_PASSWORD: str = "prescription_pass"
     DB_NAME: str = "prescription_db"
+    # Full SQLAlchemy URL overriding the DB_* settings (e.g. sqlite:///bench.db)
+    DATABASE_URL: Optional[str] = None
+    # Comma-separated SQLAlchemy URLs, one per prescription shard; the first is the home shard
+    SHARD_DATABASE_URLS: Optional[str] = None
+    SHARD_SCATTER_WORKERS: int = 8
+    # Deepest `skip` accepted by list endpoints; deeper pages are read with `after_id`
+    PAGINATION_MAX_SKIP: int = 10000
 
     # Application settings
     APP_NAME: str = "Prescription Service"
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = False
 
+    # Rollup settings
+    ROLLUP_REBUILD_CHUNK_SIZE: int = 5000
+
+    # Medication dictionary settings
+    MEDICATION_INDEX_REFRESH_SECONDS: int = 300
+
+    # Idempotency settings
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_CACHE_SIZE: int = 10000
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: int = 300
+    IDEMPOTENCY_PURGE_CHUNK_SIZE: int = 1000
+
+    # Write-behind ingestion settings
+    INGESTION_MODE: str = "direct"  # "direct" (commit per request) or "batched" (group commits)
+    INGESTION_ACK: str = "commit"  # "commit" (201 after group commit) or "accepted" (202 + status URL)
+    INGESTION_QUEUE_SIZE: int = 10000
+    INGESTION_BATCH_SIZE: int = 200
+    INGESTION_FLUSH_INTERVAL_MS: int = 50
+    INGESTION_ACK_TIMEOUT_SECONDS: float = 10.0
+    INGESTION_TRACKED_TICKETS: int = 100000
+    INGESTION_RETRY_AFTER_SECONDS: int = 1
+
+    # Partitioning and archival settings
+    PARTITION_MONTHS_AHEAD: int = 3
+    ARCHIVE_RETENTION_MONTHS: int = 12
+    ARCHIVE_MODE: str = "table"  # "table" (prescriptions_archive) or "file" (gzipped JSON lines)
+    ARCHIVE_DIR: str = "archive"
+    ARCHIVE_CHUNK_SIZE: int = 5000
+
+    # Change feed settings
+    CHANGE_FEED_MAX_SUBSCRIBERS: int = 1000
+    CHANGE_FEED_MAX_WAIT_SECONDS: int = 30
+    CHANGE_FEED_HEARTBEAT_SECONDS: int = 15
+    CHANGE_FEED_SETTLE_MS: int = 2000
+
+    # Appointment validation settings (validation is disabled when no URL is set)
+    APPOINTMENT_SERVICE_URL: Optional[str] = None
+    APPOINTMENT_TIMEOUT_SECONDS: float = 2.0
+    APPOINTMENT_CACHE_TTL_SECONDS: float = 300
+    APPOINTMENT_NEGATIVE_CACHE_TTL_SECONDS: float = 10
+    APPOINTMENT_CACHE_SIZE: int = 10000
+    APPOINTMENT_POOL_SIZE: int = 20
+    APPOINTMENT_BREAKER_FAILURE_THRESHOLD: int = 5
+    APPOINTMENT_BREAKER_RESET_SECONDS: float = 30
+    APPOINTMENT_FAIL_OPEN: bool = False
+
+    # Diagnostics settings (admin endpoints are disabled when no token is set)
+    ADMIN_TOKEN: Optional[str] = None
+    SLOW_REQUEST_THRESHOLD_MS: float = 500
+    SLOW_REQUEST_BUFFER_SIZE: int = 100
+    SLOW_REQUEST_MAX_STATEMENTS: int = 200
+    # Comma-separated query/path parameters whose values are kept in slow request records; others are redacted
+    SLOW_REQUEST_RECORDED_PARAMS: str = "skip,limit,start,end,wait"
+    PROFILER_SAMPLE_RATE: float = 0.0  # Fraction of requests profiled, 0.0 - 1.0
+    PROFILER_INTERVAL_MS: float = 5
+
+    # Rate limiting settings (rate limiting is disabled when the rate is 0)
+    RATE_LIMIT_PER_SECOND: float = 0.0  # Tokens refilled per client per second
+    RATE_LIMIT_BURST: float = 60
+    RATE_LIMIT_KEY_HEADER: str = "X-API-Key"
+    # Comma-separated API keys limited per key; clients without one of them are limited by address
+    RATE_LIMIT_API_KEYS: Optional[str] = None
+    # Header holding the client address, set by a trusted proxy in front of the service (e.g. X-Real-IP)
+    RATE_LIMIT_CLIENT_IP_HEADER: Optional[str] = None
+    RATE_LIMIT_ROWS_PER_TOKEN: int = 100  # Requested `skip + limit` rows that cost one extra token
+    # Comma-separated "METHOD /path=cost" base costs, e.g. "POST /api/v1/prescriptions/=2" (default cost 1)
+    RATE_LIMIT_ROUTE_COSTS: Optional[str] = None
+    RATE_LIMIT_MAX_CLIENTS: int = 100000
+    # Redis URL for buckets shared between instances (requires the redis package; in-process when unset)
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+    RATE_LIMIT_REDIS_TIMEOUT_SECONDS: float = 0.1
+    RATE_LIMIT_REDIS_RETRY_SECONDS: float = 5  # How long local buckets are used after a Redis failure
+
     @property
     def database_url(self) -> str:
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return f"mysql+pymysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def shard_urls(self) -> List[str]:
+        if self.SHARD_DATABASE_URLS:
+            return [url.strip() for url in self.SHARD_DATABASE_URLS.split(",") if url.strip()]
+        return [self.database_url]
+
+    @property
+    def rate_limit_route_costs(self) -> Dict[str, float]:
+        costs = {}
+        for entry in (self.RATE_LIMIT_ROUTE_COSTS or "").split(","):
+            route, _, cost = entry.rpartition("=")
+            if route.strip():
+                costs[route.strip()] = float(cost)
+        return costs
+
+    @property
+    def rate_limit_api_keys(self) -> Set[str]:
+        return {key.strip() for key in (self.RATE_LIMIT_API_KEYS or "").split(",") if key.strip()}
+
+    @property
+    def slow_request_recorded_params(self) -> Set[str]:
+        return {name.strip() for name in self.SLOW_REQUEST_RECORDED_PARAMS.split(",") if name.strip()}
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,20 +1,55 @@
-from sqlalchemy import create_engine
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, TypeVar
+import contextvars
+import threading
+import zlib
+
+from sqlalchemy import BigInteger, Integer, create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.config import get_settings
 
 settings = get_settings()
 
-# Create engine with connection pooling
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-    echo=settings.DEBUG
-)
+T = TypeVar("T")
+
+# The home shard also holds the medications dictionary
+HOME_SHARD = 0
+
+# Prescription and change IDs of shard N are allocated above N * SHARD_ID_SPACE and below (N + 1) * SHARD_ID_SPACE
+SHARD_ID_SPACE = 2 ** 40
+
+# Column type for those IDs; SQLite only auto-increments INTEGER primary keys
+ShardedId = BigInteger().with_variant(Integer, "sqlite")
+
+
+def _create_engine(url: str):
+    # SQLite connections are shared across the request threadpool
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+
+    # Create engine with connection pooling
+    return create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        echo=settings.DEBUG,
+        connect_args=connect_args
+    )
+
+
+# One engine and session factory per shard
+shard_engines = [_create_engine(url) for url in settings.shard_urls]
+shard_sessions = [
+    sessionmaker(autocommit=False, autoflush=False, bind=shard_engine, info={"shard_id": shard_id})
+    for shard_id, shard_engine in enumerate(shard_engines)
+]
+SHARD_COUNT = len(shard_engines)
+
+engine = shard_engines[HOME_SHARD]
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = shard_sessions[HOME_SHARD]
 
 # Create base class for models
 Base = declarative_base()
@@ -28,3 +63,93 @@ def get_db():
     finally:
         db.close()
 
+
+def shard_for_patient(patient_id: int) -> int:
+    """Shard holding a patient's prescriptions"""
+    if SHARD_COUNT == 1:
+        return HOME_SHARD
+    return zlib.crc32(str(patient_id).encode("utf-8")) % SHARD_COUNT
+
+
+def shard_for_id(record_id: int) -> int:
+    """Shard that allocated a prescription or change ID"""
+    return record_id // SHARD_ID_SPACE
+
+
+def shard_id_base(shard_id: int) -> int:
+    """ID just below a shard's ID range"""
+    return shard_id * SHARD_ID_SPACE
+
+
+def session_shard(db: Session) -> int:
+    """Shard a session is bound to"""
+    return db.info.get("shard_id", HOME_SHARD)
+
+
+@contextmanager
+def shard_session(db: Session, shard_id: int) -> Iterator[Session]:
+    """
+    Session on a shard for the duration of the context
+
+    Yields `db` itself when it is already bound to the shard, otherwise a
+    new session whose objects stay loaded after commit and close.
+    """
+    if session_shard(db) == shard_id:
+        yield db
+        return
+
+    session = shard_sessions[shard_id](expire_on_commit=False)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+_scatter_executor: Optional[ThreadPoolExecutor] = None
+_scatter_lock = threading.Lock()
+
+
+def _get_scatter_executor() -> ThreadPoolExecutor:
+    global _scatter_executor
+    with _scatter_lock:
+        if _scatter_executor is None:
+            _scatter_executor = ThreadPoolExecutor(
+                max_workers=settings.SHARD_SCATTER_WORKERS,
+                thread_name_prefix="shard-scatter"
+            )
+        return _scatter_executor
+
+
+def _run_on_shard(shard_id: int, fn: Callable[[Session], T]) -> T:
+    session = shard_sessions[shard_id](expire_on_commit=False)
+    try:
+        return fn(session)
+    finally:
+        session.close()
+
+
+def scatter(db: Session, fn: Callable[[Session], T]) -> List[T]:
+    """
+    Run a read against every shard in parallel
+
+    The shard `db` is bound to is read with `db` in the calling thread; the
+    others get their own short-lived sessions on worker threads.
+
+    Returns:
+        Results in shard order
+    """
+    if SHARD_COUNT == 1:
+        return [fn(db)]
+
+    own_shard = session_shard(db)
+    futures = {
+        shard_id: _get_scatter_executor().submit(contextvars.copy_context().run, _run_on_shard, shard_id, fn)
+        for shard_id in range(SHARD_COUNT)
+        if shard_id != own_shard
+    }
+    own_result = fn(db)
+
+    return [
+        own_result if shard_id == own_shard else futures[shard_id].result()
+        for shard_id in range(SHARD_COUNT)
+    ]
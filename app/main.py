@@ -1,10 +1,17 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 
 from app.config import get_settings
+from app.database import shard_engines
+from app.middleware import CorrelationIdMiddleware, SlowRequestMiddleware
 from app.routes import router
 from app.utils.db_init import setup_database
+from app.utils.idempotency import purge_idempotency_keys_periodically
+from app.services.ingestion_service import ingestion_enabled, ingestion_queue
+from app.services.appointment_client import appointment_validator
+from app.utils.request_trace import install_sql_tracing
 
 settings = get_settings()
 
@@ -15,9 +22,16 @@ async def lifespan(app: FastAPI):
     # Startup: Initialize database and seed data
     print("Starting up application...")
     setup_database()
+    purge_task = asyncio.create_task(purge_idempotency_keys_periodically())
+    if ingestion_enabled():
+        ingestion_queue.start()
     yield
     # Shutdown
     print("Shutting down application...")
+    purge_task.cancel()
+    # Flush everything already accepted before the process exits
+    await asyncio.to_thread(ingestion_queue.stop)
+    appointment_validator.close()
 
 
 app = FastAPI(
@@ -36,6 +50,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request tracing: the correlation ID is set first so slow request records carry it
+app.add_middleware(SlowRequestMiddleware)
+app.add_middleware(CorrelationIdMiddleware)
+for shard_engine in shard_engines:
+    install_sql_tracing(shard_engine)
+
 # Include routers
 app.include_router(router, prefix="/api/v1")
 
@@ -1,6 +1,8 @@
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from app.utils.logger import set_correlation_id, clear_correlation_id, get_correlation_id
+from app.utils.request_trace import RequestTrace, request_trace_var, slow_request_recorder
+from app.utils.profiler import profiler
 
 
 class CorrelationIdMiddleware(BaseHTTPMiddleware):
@@ -20,3 +22,39 @@ class CorrelationIdMiddleware(BaseHTTPMiddleware):
 
         return response
 
+
+class SlowRequestMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware that traces every request and keeps the slow ones
+
+    Must run inside CorrelationIdMiddleware so the correlation ID is set.
+    Streaming responses are timed until their headers are sent.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        trace = RequestTrace(
+            correlation_id=get_correlation_id(),
+            method=request.method,
+            params=dict(request.query_params),
+            profiled=profiler.should_profile()
+        )
+        token = request_trace_var.set(trace)
+        if trace.profiled:
+            profiler.start(trace)
+
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            if trace.profiled:
+                profiler.stop(trace)
+            request_trace_var.reset(token)
+
+            # The router stores the matched route in the shared scope
+            route = request.scope.get("route")
+            trace.route = getattr(route, "path", None)
+            trace.params.update(request.scope.get("path_params", {}))
+            trace.finish(status_code)
+            slow_request_recorder.record(trace)
@@ -1,4 +1,26 @@
+from app.models.medication import Medication
 from app.models.prescription import Prescription
+from app.models.rollup import (
+    DoctorDailyRollup,
+    MedicationDailyRollup,
+    DoctorDailyRollupRebuild,
+    MedicationDailyRollupRebuild
+)
+from app.models.idempotency import IdempotencyKey
+from app.models.archive import ArchivedPrescription, ArchivedPartition
+from app.models.change_log import PrescriptionChange
+from app.models.relocation import RelocatedPrescription
 
-__all__ = ["Prescription"]
-
+__all__ = [
+    "Medication",
+    "Prescription",
+    "DoctorDailyRollup",
+    "MedicationDailyRollup",
+    "DoctorDailyRollupRebuild",
+    "MedicationDailyRollupRebuild",
+    "IdempotencyKey",
+    "ArchivedPrescription",
+    "ArchivedPartition",
+    "PrescriptionChange",
+    "RelocatedPrescription"
+]
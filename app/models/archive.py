@@ -0,0 +1,47 @@
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey
+from sqlalchemy.orm import relationship
+from app.database import Base, ShardedId
+from datetime import datetime
+
+
+class ArchivedPrescription(Base):
+    """Prescriptions moved out of the prescriptions table by the archival job"""
+
+    __tablename__ = "prescriptions_archive"
+
+    prescription_id = Column(ShardedId, primary_key=True, autoincrement=False)
+    appointment_id = Column(String(50), nullable=False)
+    patient_id = Column(Integer, nullable=False)
+    doctor_id = Column(Integer, nullable=False)
+    medication_id = Column(Integer, ForeignKey("medications.medication_id"), nullable=False)
+    dosage = Column(String(50), nullable=False)
+    days = Column(Integer, nullable=False)
+    issued_at = Column(DateTime, nullable=False)
+
+    medication_entry = relationship("Medication", lazy="joined", innerjoin=True)
+
+    @property
+    def medication(self):
+        """Medication name, resolved through the medications dictionary"""
+        return self.medication_entry.name if self.medication_entry is not None else None
+
+    def __repr__(self):
+        return f"<ArchivedPrescription(prescription_id={self.prescription_id}, appointment_id={self.appointment_id})>"
+
+
+class ArchivedPartition(Base):
+    """A month of prescriptions that has been archived, and where it went"""
+
+    __tablename__ = "archived_partitions"
+
+    archive_id = Column(Integer, primary_key=True, index=True)
+    partition_name = Column(String(16), nullable=False, index=True)
+    period_start = Column(Date, nullable=False)
+    min_prescription_id = Column(ShardedId, nullable=False, index=True)
+    max_prescription_id = Column(ShardedId, nullable=False, index=True)
+    row_count = Column(Integer, nullable=False)
+    location = Column(String(512), nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ArchivedPartition(partition_name={self.partition_name}, location={self.location})>"
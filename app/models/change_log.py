@@ -0,0 +1,28 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.orm import relationship
+from app.database import Base, ShardedId
+from datetime import datetime
+
+
+class PrescriptionChange(Base):
+    """Monotonic log of prescription changes, written with the change itself"""
+
+    __tablename__ = "prescription_changes"
+    # Lets each SQLite shard start its ID sequence at its own range
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    change_id = Column(ShardedId, primary_key=True, index=True)
+    prescription_id = Column(ShardedId, nullable=False, index=True)
+    change_type = Column(String(16), nullable=False)
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # No database foreign key: prescriptions may be partitioned or archived
+    prescription = relationship(
+        "Prescription",
+        primaryjoin="foreign(PrescriptionChange.prescription_id) == Prescription.prescription_id",
+        lazy="joined",
+        viewonly=True
+    )
+
+    def __repr__(self):
+        return f"<PrescriptionChange(change_id={self.change_id}, prescription_id={self.prescription_id}, change_type={self.change_type})>"
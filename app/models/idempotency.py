@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from app.database import Base, ShardedId
+from datetime import datetime
+
+
+class IdempotencyKey(Base):
+    """Stored responses of prescription creates, keyed by the client's Idempotency-Key"""
+
+    __tablename__ = "idempotency_keys"
+
+    idempotency_key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    prescription_id = Column(ShardedId, nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey(idempotency_key={self.idempotency_key}, prescription_id={self.prescription_id})>"
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String
+from app.database import Base
+
+
+class Medication(Base):
+    """Medication dictionary referenced by prescriptions"""
+
+    __tablename__ = "medications"
+
+    medication_id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255), nullable=False)
+    name_key = Column(String(255), nullable=False, unique=True, index=True)
+
+    def __repr__(self):
+        return f"<Medication(medication_id={self.medication_id}, name={self.name})>"
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime
-from app.database import Base
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from app.database import Base, ShardedId
 from datetime import datetime
 
 
@@ -7,45 +8,24 @@ class Prescription(Base):
     """Prescription model representing the prescriptions table"""
 
     __tablename__ = "prescriptions"
+    # Lets each SQLite shard start its ID sequence at its own range
+    __table_args__ = {"sqlite_autoincrement": True}
 
-    prescription_id = Column(Integer, primary_key=True, index=True)
+    prescription_id = Column(ShardedId, primary_key=True, index=True)
     appointment_id = Column(String(50), nullable=False, index=True)
     patient_id = Column(Integer, nullable=False, index=True)
     doctor_id = Column(Integer, nullable=False, index=True)
-    medication = Column(String(255), nullable=False)
+    medication_id = Column(Integer, ForeignKey("medications.medication_id"), nullable=False, index=True)
     dosage = Column(String(50), nullable=False)
     days = Column(Integer, nullable=False)
     issued_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
-    def __repr__(self):
-        return f"<Prescription(prescription_id={self.prescription_id}, appointment_id={self.appointment_id})>"
-from sqlalchemy import create_engine, event
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from app.config import get_settings
-
-settings = get_settings()
-
-# Create engine with connection pooling
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-    echo=settings.DEBUG
-)
-
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    medication_entry = relationship("Medication", lazy="joined", innerjoin=True)
 
-# Create base class for models
-Base = declarative_base()
-
-
-def get_db():
-    """Dependency for getting database session"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    @property
+    def medication(self):
+        """Medication name, resolved through the medications dictionary"""
+        return self.medication_entry.name if self.medication_entry is not None else None
 
+    def __repr__(self):
+        return f"<Prescription(prescription_id={self.prescription_id}, appointment_id={self.appointment_id})>"
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, DateTime
+from app.database import Base, ShardedId
+from datetime import datetime
+
+
+class RelocatedPrescription(Base):
+    """Prescriptions moved to their patient's shard by resharding, and the shard they were moved to"""
+
+    __tablename__ = "relocated_prescriptions"
+
+    prescription_id = Column(ShardedId, primary_key=True, autoincrement=False)
+    shard_id = Column(Integer, nullable=False)
+    relocated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<RelocatedPrescription(prescription_id={self.prescription_id}, shard_id={self.shard_id})>"
@@ -0,0 +1,60 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+class DoctorDailyRollup(Base):
+    """Daily prescription counts per doctor, maintained alongside prescriptions"""
+
+    __tablename__ = "rollup_doctor_daily"
+
+    doctor_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    prescription_count = Column(Integer, nullable=False, default=0)
+    total_days = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DoctorDailyRollup(doctor_id={self.doctor_id}, day={self.day}, count={self.prescription_count})>"
+
+
+class MedicationDailyRollup(Base):
+    """Daily prescription counts per medication, maintained alongside prescriptions"""
+
+    __tablename__ = "rollup_medication_daily"
+
+    medication_id = Column(Integer, ForeignKey("medications.medication_id"), primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    prescription_count = Column(Integer, nullable=False, default=0)
+    total_days = Column(Integer, nullable=False, default=0)
+
+    medication_entry = relationship("Medication", lazy="joined", innerjoin=True)
+
+    @property
+    def medication(self):
+        """Medication name, resolved through the medications dictionary"""
+        return self.medication_entry.name if self.medication_entry is not None else None
+
+    def __repr__(self):
+        return f"<MedicationDailyRollup(medication_id={self.medication_id}, day={self.day}, count={self.prescription_count})>"
+
+
+class DoctorDailyRollupRebuild(Base):
+    """Staging table a rollup rebuild fills before swapping it into rollup_doctor_daily"""
+
+    __tablename__ = "rollup_doctor_daily_rebuild"
+
+    doctor_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    prescription_count = Column(Integer, nullable=False, default=0)
+    total_days = Column(Integer, nullable=False, default=0)
+
+
+class MedicationDailyRollupRebuild(Base):
+    """Staging table a rollup rebuild fills before swapping it into rollup_medication_daily"""
+
+    __tablename__ = "rollup_medication_daily_rebuild"
+
+    medication_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    prescription_count = Column(Integer, nullable=False, default=0)
+    total_days = Column(Integer, nullable=False, default=0)
@@ -1,10 +1,22 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from app.routes.change_feed import router as change_feed_router
 from app.routes.prescription import router as prescription_router
+from app.routes.dashboard import router as dashboard_router
+from app.routes.medication import router as medication_router
+from app.routes.admin import router as admin_router
+from app.utils.rate_limit import rate_limit
 
 router = APIRouter()
 
+# Client-facing routes are rate limited per client; admin routes are not
+rate_limited = [Depends(rate_limit)]
+
 # Include all route modules
-router.include_router(prescription_router)
+# The change feed must come first so /prescriptions/changes is not taken for a prescription ID
+router.include_router(change_feed_router, dependencies=rate_limited)
+router.include_router(prescription_router, dependencies=rate_limited)
+router.include_router(dashboard_router, dependencies=rate_limited)
+router.include_router(medication_router, dependencies=rate_limited)
+router.include_router(admin_router)
 
 __all__ = ["router"]
-
@@ -0,0 +1,112 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import secrets
+
+from app.schemas.admin import SlowRequestListResponse, ProfilerSettings
+from app.utils.request_trace import slow_request_recorder
+from app.utils.profiler import profiler
+from app.utils.logger import setup_logger
+from app.config import get_settings
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
+    """Only allow callers presenting the configured admin token"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled"
+        )
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin token"
+        )
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get(
+    "/slow-requests",
+    response_model=SlowRequestListResponse,
+    summary="Get recent slow requests"
+)
+def get_slow_requests(
+    limit: int = Query(50, ge=1, le=1000, description="Maximum number of requests to return")
+):
+    """
+    Retrieve the most recent requests slower than the configured threshold, slowest first,
+    with every SQL statement they ran and the time spent waiting for a pooled connection.
+
+    - **limit**: Maximum number of requests to return (default: 50)
+    """
+    return SlowRequestListResponse(
+        threshold_ms=slow_request_recorder.threshold_ms,
+        requests=slow_request_recorder.get_slowest(limit)
+    )
+
+
+@router.delete(
+    "/slow-requests",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Clear recorded slow requests"
+)
+def clear_slow_requests():
+    """Empty the slow request buffer."""
+    slow_request_recorder.clear()
+
+
+@router.get(
+    "/profiler",
+    response_model=ProfilerSettings,
+    summary="Get sampling profiler settings"
+)
+def get_profiler_settings():
+    """Retrieve the fraction of requests being profiled and the sampling interval."""
+    return ProfilerSettings(sample_rate=profiler.sample_rate, interval_ms=profiler.interval_ms)
+
+
+@router.put(
+    "/profiler",
+    response_model=ProfilerSettings,
+    summary="Switch the sampling profiler"
+)
+def update_profiler_settings(profiler_settings: ProfilerSettings):
+    """
+    Change the fraction of requests being profiled; 0 switches profiling off.
+
+    - **sample_rate**: Fraction of requests to profile, 0.0 - 1.0
+    - **interval_ms**: Sampling interval (optional, unchanged if omitted)
+    """
+    logger.info(f"Setting profiler sample_rate={profiler_settings.sample_rate}, interval_ms={profiler_settings.interval_ms}")
+    profiler.sample_rate = profiler_settings.sample_rate
+    if profiler_settings.interval_ms is not None:
+        profiler.interval_ms = profiler_settings.interval_ms
+    return ProfilerSettings(sample_rate=profiler.sample_rate, interval_ms=profiler.interval_ms)
+
+
+@router.get(
+    "/profile",
+    response_class=PlainTextResponse,
+    summary="Get the aggregate profile as folded stacks"
+)
+def get_profile():
+    """
+    Retrieve every sample taken so far, one `frame;frame;... count` line per stack,
+    ready for flamegraph.pl or speedscope.
+    """
+    return PlainTextResponse(profiler.folded())
+
+
+@router.delete(
+    "/profile",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Clear the aggregate profile"
+)
+def clear_profile():
+    """Discard every sample taken so far."""
+    profiler.reset()
@@ -0,0 +1,155 @@
+from fastapi import APIRouter, HTTPException, status, Query, Header, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import asyncio
+
+from app.database import SessionLocal
+from app.schemas.change_feed import ChangeFeedResponse, PrescriptionChangeResponse
+from app.services.change_feed_service import (
+    ChangeFeedService,
+    TooManySubscribersError,
+    advance_cursor,
+    change_gaps,
+    change_notifier,
+    format_cursor,
+    initial_cursor,
+    parse_cursor
+)
+from app.utils.logger import setup_logger
+from app.utils.request_trace import TracedRoute
+from app.config import get_settings
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+router = APIRouter(prefix="/prescriptions", tags=["changes"], route_class=TracedRoute)
+
+
+def _parse_cursor(cursor: Optional[str]) -> List[int]:
+    if not cursor:
+        return initial_cursor()
+    try:
+        return parse_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid change feed cursor: {cursor}"
+        )
+
+
+def _fetch_changes(since: List[int], limit: int) -> list[PrescriptionChangeResponse]:
+    """Read a page of changes in short-lived sessions, so no connection is held while waiting"""
+    db = SessionLocal()
+    try:
+        return [
+            PrescriptionChangeResponse.model_validate(change)
+            for change in ChangeFeedService.get_changes_from_shards(db, cursor=since, limit=limit)
+        ]
+    finally:
+        db.close()
+
+
+async def _wait_for_changes(event: asyncio.Event, since: List[int], limit: int, timeout: float):
+    """
+    Return changes after `since`, waiting up to `timeout` seconds for them if there are none
+
+    Waiters wake on a notification, and when a gap in change IDs settles
+    so the changes held back behind it can be returned.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    event.clear()
+    changes = await asyncio.to_thread(_fetch_changes, since, limit)
+    while not changes and loop.time() < deadline:
+        wait = deadline - loop.time()
+        gap_settles_in = change_gaps.seconds_until_settled()
+        if gap_settles_in is not None:
+            wait = min(wait, gap_settles_in)
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout=wait)
+        except asyncio.TimeoutError:
+            # Catches writes made by other processes, which cannot notify us
+            pass
+
+        event.clear()
+        changes = await asyncio.to_thread(_fetch_changes, since, limit)
+
+    return changes
+
+
+def _too_many_subscribers(e: TooManySubscribersError) -> HTTPException:
+    logger.error(f"Rejecting change feed subscriber: {str(e)}")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": "1"}
+    )
+
+
+@router.get(
+    "/changes",
+    response_model=ChangeFeedResponse,
+    summary="Get the prescription change feed"
+)
+async def get_changes(
+    request: Request,
+    since: Optional[str] = Query(None, description="Cursor returned by the previous call (omit to start from the beginning)"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of changes to return"),
+    wait: float = Query(0, ge=0, le=settings.CHANGE_FEED_MAX_WAIT_SECONDS, description="Seconds to long-poll when there are no changes"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Retrieve prescription changes after a cursor, oldest first.
+
+    - **since**: Cursor from the previous response's `next_cursor`
+    - **limit**: Maximum number of changes to return
+    - **wait**: Long-poll for up to this many seconds when there are no new changes
+
+    Send `Accept: text/event-stream` to receive the feed as Server-Sent Events instead;
+    reconnecting clients resume from `Last-Event-ID`.
+    """
+    cursor = _parse_cursor(since or last_event_id)
+
+    if "text/event-stream" in request.headers.get("accept", ""):
+        try:
+            subscriber = change_notifier.acquire()
+        except TooManySubscribersError as e:
+            raise _too_many_subscribers(e)
+        return StreamingResponse(
+            _stream_changes(request, subscriber, cursor, limit),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    try:
+        async with change_notifier.subscribe() as event:
+            changes = await _wait_for_changes(event, cursor, limit, wait)
+    except TooManySubscribersError as e:
+        raise _too_many_subscribers(e)
+
+    for change in changes:
+        cursor = advance_cursor(cursor, change.change_id)
+    return ChangeFeedResponse(changes=changes, next_cursor=format_cursor(cursor))
+
+
+async def _stream_changes(request: Request, subscriber, cursor: List[int], limit: int):
+    """Server-Sent Events stream of changes, with heartbeats while idle"""
+    _, event = subscriber
+    try:
+        while not await request.is_disconnected():
+            changes = await _wait_for_changes(event, cursor, limit, settings.CHANGE_FEED_HEARTBEAT_SECONDS)
+            if not changes:
+                yield ": heartbeat\n\n"
+                continue
+
+            for change in changes:
+                cursor = advance_cursor(cursor, change.change_id)
+                yield (
+                    f"id: {format_cursor(cursor)}\n"
+                    f"event: prescription.{change.change_type}\n"
+                    f"data: {change.model_dump_json()}\n\n"
+                )
+    finally:
+        change_notifier.release(subscriber)
@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date
+
+from app.database import get_db
+from app.schemas.rollup import DoctorDailyResponse, MedicationDailyResponse
+from app.services.rollup_service import RollupService
+from app.services.medication_service import MedicationService
+from app.utils.logger import setup_logger
+from app.utils.request_trace import TracedRoute
+
+logger = setup_logger(__name__)
+
+router = APIRouter(prefix="/dashboards", tags=["dashboards"], route_class=TracedRoute)
+
+
+@router.get(
+    "/doctors/{doctor_id}/daily",
+    response_model=DoctorDailyResponse,
+    summary="Get daily prescription counts for a doctor"
+)
+def get_doctor_daily(
+    doctor_id: int,
+    start: Optional[date] = Query(None, description="First day to include"),
+    end: Optional[date] = Query(None, description="Last day to include"),
+    db: Session = Depends(get_db)
+):
+    """
+    Retrieve daily prescription counts for a doctor, served from the rollup tables.
+
+    - **doctor_id**: The ID of the doctor
+    - **start**: First day to include (optional)
+    - **end**: Last day to include (optional)
+    """
+    logger.info(f"Fetching daily dashboard for doctor_id={doctor_id}, start={start}, end={end}")
+    days = RollupService.get_doctor_daily(db=db, doctor_id=doctor_id, start=start, end=end)
+
+    return DoctorDailyResponse(
+        doctor_id=doctor_id,
+        total=sum(day.prescription_count for day in days),
+        days=days
+    )
+
+
+@router.get(
+    "/medications/daily",
+    response_model=MedicationDailyResponse,
+    summary="Get daily prescription counts per medication"
+)
+def get_medication_daily(
+    medication: Optional[str] = Query(None, description="Filter by medication name"),
+    start: Optional[date] = Query(None, description="First day to include"),
+    end: Optional[date] = Query(None, description="Last day to include"),
+    db: Session = Depends(get_db)
+):
+    """
+    Retrieve daily prescription counts per medication, served from the rollup tables.
+
+    - **medication**: Filter by medication name (optional)
+    - **start**: First day to include (optional)
+    - **end**: Last day to include (optional)
+    """
+    logger.info(f"Fetching medication dashboard for medication={medication}, start={start}, end={end}")
+    medication_id = None
+    if medication is not None:
+        medication_id = MedicationService.resolve_id(db, medication)
+        if medication_id is None:
+            return MedicationDailyResponse(total=0, days=[])
+
+    days = RollupService.get_medication_daily(db=db, medication_id=medication_id, start=start, end=end)
+
+    return MedicationDailyResponse(
+        total=sum(day.prescription_count for day in days),
+        days=days
+    )
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.schemas.medication import MedicationSearchResponse, MedicationSuggestion
+from app.services.medication_service import MedicationService
+from app.utils.request_trace import TracedRoute
+
+router = APIRouter(prefix="/medications", tags=["medications"], route_class=TracedRoute)
+
+
+@router.get(
+    "/search",
+    response_model=MedicationSearchResponse,
+    summary="Autocomplete medication names"
+)
+def search_medications(
+    prefix: str = Query(..., min_length=1, max_length=255, description="Medication name prefix"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of matches to return"),
+    db: Session = Depends(get_db)
+):
+    """
+    Find medications whose name starts with the given prefix (case-insensitive).
+
+    Served from an in-memory sorted index of the medications dictionary.
+
+    - **prefix**: Medication name prefix
+    - **limit**: Maximum number of matches to return
+    """
+    matches = MedicationService.search(db=db, prefix=prefix, limit=limit)
+
+    return MedicationSearchResponse(
+        prefix=prefix,
+        results=[
+            MedicationSuggestion(medication_id=medication_id, name=name)
+            for medication_id, name in matches
+        ]
+    )
@@ -1,16 +1,230 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from typing import Optional
+import asyncio
 
-from app.database import get_db
+from app.database import get_db, shard_for_patient, shard_session, shard_sessions
 from app.schemas.prescription import (
     PrescriptionCreate,
     PrescriptionResponse,
-    PrescriptionListResponse
+    PrescriptionListResponse,
+    IngestionTicketResponse
 )
 from app.services.prescription_service import PrescriptionService
+from app.services.appointment_client import AppointmentServiceUnavailableError
+from app.services.idempotency_service import IdempotencyService, StoredResponse
+from app.services.ingestion_service import (
+    IngestionTicket,
+    QueueFullError,
+    ingestion_enabled,
+    ingestion_queue
+)
+from app.config import get_settings
+from app.utils.logger import setup_logger
+from app.utils.request_trace import TracedRoute
+from app.utils.wire_format import negotiate, vary_on_accept
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+# Every route answers in the format negotiated from the Accept header (JSON by default)
+router = APIRouter(
+    prefix="/prescriptions",
+    tags=["prescriptions"],
+    route_class=TracedRoute,
+    dependencies=[Depends(vary_on_accept)]
+)
+
+
+def _replay(
+    request: Request,
+    stored: StoredResponse,
+    request_hash: str,
+    idempotency_key: str
+) -> Response:
+    """Return the original response for a retried idempotent request"""
+    if stored.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request body"
+        )
+
+    logger.info(f"Replaying response for Idempotency-Key={idempotency_key}")
+    return negotiate(
+        request,
+        stored.body,
+        PrescriptionResponse,
+        status_code=stored.status_code,
+        headers={"Idempotent-Replayed": "true"}
+    )
+
+
+def _appointment_service_unavailable(e: AppointmentServiceUnavailableError) -> HTTPException:
+    logger.error(f"Cannot validate appointment: {str(e)}")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e)
+    )
+
+
+def _ticket_response(request: Request, ticket: IngestionTicket) -> IngestionTicketResponse:
+    """Describe a queued prescription and where to poll for its outcome"""
+    return IngestionTicketResponse(
+        ticket_id=ticket.ticket_id,
+        status=ticket.status,
+        status_url=str(request.url_for("get_ingestion_status", ticket_id=ticket.ticket_id)),
+        prescription=ticket.result,
+        error=ticket.error
+    )
+
+
+def _enqueue_prescription(
+    prescription: PrescriptionCreate,
+    idempotency_key: Optional[str],
+    request_hash: Optional[str]
+) -> IngestionTicket:
+    """Queue a prescription for the write-behind group commit"""
+    try:
+        PrescriptionService.validate_appointments([prescription])
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except AppointmentServiceUnavailableError as e:
+        raise _appointment_service_unavailable(e)
+
+    try:
+        ticket = ingestion_queue.submit(prescription, idempotency_key)
+    except QueueFullError as e:
+        logger.error(f"Rejecting prescription: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(settings.INGESTION_RETRY_AFTER_SECONDS)}
+        )
+
+    # A retry whose key is still queued shares the original ticket
+    if idempotency_key is not None and IdempotencyService.hash_request(ticket.prescription) != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request body"
+        )
+
+    return ticket
+
+
+async def _ticket_outcome(request: Request, ticket: IngestionTicket):
+    """
+    Answer for a queued prescription
+
+    With `INGESTION_ACK=commit` the request waits for the group commit on the
+    event loop, so waiting requests do not hold threadpool threads.
+    """
+    if settings.INGESTION_ACK == "commit":
+        # Shielded: giving up on the wait must not cancel the ticket
+        outcome = asyncio.wrap_future(ticket.future)
+        try:
+            result = await asyncio.wait_for(asyncio.shield(outcome), timeout=settings.INGESTION_ACK_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            # Still queued; hand back the ticket rather than failing the request
+            outcome.add_done_callback(lambda done: done.cancelled() or done.exception())
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except AppointmentServiceUnavailableError as e:
+            raise _appointment_service_unavailable(e)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to create prescription: {str(e)}"
+            )
+        else:
+            return negotiate(request, result, PrescriptionResponse, status_code=status.HTTP_201_CREATED)
+
+    ticket_response = _ticket_response(request, ticket)
+    return negotiate(
+        request,
+        ticket_response,
+        IngestionTicketResponse,
+        status_code=status.HTTP_202_ACCEPTED,
+        headers={"Location": ticket_response.status_url}
+    )
+
+
+def _lookup_stored_response(shard_id: int, idempotency_key: str) -> Optional[StoredResponse]:
+    """
+    Look an idempotency key up in a session of its own
+
+    The session is closed before the prescription is created or queued, so a
+    request waiting for its group commit does not hold a pooled connection.
+    """
+    lookup_db = shard_sessions[shard_id]()
+    try:
+        return IdempotencyService.lookup(lookup_db, idempotency_key)
+    finally:
+        lookup_db.close()
 
-router = APIRouter(prefix="/prescriptions", tags=["prescriptions"])
+
+def _create_or_enqueue(
+    request: Request,
+    prescription: PrescriptionCreate,
+    idempotency_key: Optional[str],
+    db: Session
+):
+    """Replay, create or queue a prescription; returns the response or the ticket of a queued prescription"""
+    # Idempotency keys are scoped to the patient: stored and looked up on the patient's shard only
+    shard_id = shard_for_patient(prescription.patient_id)
+
+    request_hash = None
+    if idempotency_key is not None:
+        request_hash = IdempotencyService.hash_request(prescription)
+        stored = _lookup_stored_response(shard_id, idempotency_key)
+        if stored is not None:
+            return _replay(request, stored, request_hash, idempotency_key)
+
+    if ingestion_enabled():
+        return _enqueue_prescription(prescription, idempotency_key, request_hash)
+
+    with shard_session(db, shard_id) as shard_db:
+        try:
+            db_prescription = PrescriptionService.create_prescription(
+                shard_db,
+                prescription,
+                idempotency_key=idempotency_key
+            )
+            return negotiate(request, db_prescription, PrescriptionResponse, status_code=status.HTTP_201_CREATED)
+        except IntegrityError:
+            shard_db.rollback()
+            if idempotency_key is None:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Failed to create prescription: integrity error"
+                )
+            # A concurrent request with the same key committed first
+            stored = _lookup_stored_response(shard_id, idempotency_key)
+            if stored is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is already in progress"
+                )
+            return _replay(request, stored, request_hash, idempotency_key)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except AppointmentServiceUnavailableError as e:
+            raise _appointment_service_unavailable(e)
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to create prescription: {str(e)}"
+            )
 
 
 @router.post(
@@ -19,8 +233,16 @@ router = APIRouter(prefix="/prescriptions", tags=["prescriptions"])
     status_code=status.HTTP_201_CREATED,
     summary="Create a new prescription"
 )
-def create_prescription(
+async def create_prescription(
+    request: Request,
     prescription: PrescriptionCreate,
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias="Idempotency-Key",
+        min_length=1,
+        max_length=255,
+        description="Client-generated key; retries with the same key return the original response"
+    ),
     db: Session = Depends(get_db)
 ):
     """
@@ -34,22 +256,45 @@ def create_prescription(
     - **days**: Number of days for the prescription
     - **issued_at**: Timestamp when prescription was issued (optional, defaults to current time)
 
+    Send an **Idempotency-Key** header to make retries safe: a repeated request with the
+    same key returns the original response instead of creating a duplicate.
+
+    When batched ingestion is enabled (`INGESTION_MODE=batched`) the prescription is
+    written in a group commit; depending on `INGESTION_ACK` the response is either sent
+    after that commit or immediately as `202 Accepted` with a status URL.
+
     Note: Prescription cannot be created without a valid appointment.
     """
-    try:
-        db_prescription = PrescriptionService.create_prescription(db, prescription)
-        return db_prescription
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        )
-    except Exception as e:
+    outcome = await run_in_threadpool(_create_or_enqueue, request, prescription, idempotency_key, db)
+    if isinstance(outcome, IngestionTicket):
+        return await _ticket_outcome(request, outcome)
+    return outcome
+
+
+@router.get(
+    "/ingestion/{ticket_id}",
+    response_model=IngestionTicketResponse,
+    summary="Get the status of a queued prescription"
+)
+def get_ingestion_status(
+    request: Request,
+    ticket_id: str
+):
+    """
+    Retrieve the outcome of a prescription accepted by batched ingestion.
+
+    - **ticket_id**: Ticket returned by the create endpoint
+    """
+    ticket = ingestion_queue.get_ticket(ticket_id)
+
+    if ticket is None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to create prescription: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Ingestion ticket {ticket_id} not found"
         )
 
+    return negotiate(request, _ticket_response(request, ticket), IngestionTicketResponse)
+
 
 @router.get(
     "/{prescription_id}",
@@ -57,6 +302,7 @@ def create_prescription(
     summary="Get a prescription by ID"
 )
 def get_prescription(
+    request: Request,
     prescription_id: int,
     db: Session = Depends(get_db)
 ):
@@ -73,7 +319,7 @@ def get_prescription(
             detail=f"Prescription with ID {prescription_id} not found"
         )
 
-    return db_prescription
+    return negotiate(request, db_prescription, PrescriptionResponse)
 
 
 @router.get(
@@ -82,34 +328,46 @@ def get_prescription(
     summary="Get prescriptions with optional filters"
 )
 def get_prescriptions(
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    request: Request,
+    skip: int = Query(0, ge=0, le=settings.PAGINATION_MAX_SKIP, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=500, description="Maximum number of records to return"),
+    after_id: Optional[int] = Query(None, ge=0, description="Return prescriptions after this prescription ID"),
     patient_id: Optional[int] = Query(None, description="Filter by patient ID"),
     doctor_id: Optional[int] = Query(None, description="Filter by doctor ID"),
     appointment_id: Optional[str] = Query(None, description="Filter by appointment ID"),
+    medication: Optional[str] = Query(None, description="Filter by medication name"),
     db: Session = Depends(get_db)
 ):
     """
     Retrieve a list of prescriptions with optional filters.
 
-    - **skip**: Number of records to skip (for pagination)
+    - **skip**: Number of records to skip (for pagination, at most PAGINATION_MAX_SKIP)
     - **limit**: Maximum number of records to return
+    - **after_id**: Return prescriptions after this ID; pass the last ID of the previous page to read deep pages
     - **patient_id**: Filter prescriptions by patient ID
     - **doctor_id**: Filter prescriptions by doctor ID
     - **appointment_id**: Filter prescriptions by appointment ID
+    - **medication**: Filter prescriptions by medication name
+
+    Send `Accept: application/vnd.hms.columnar+json` (or `+msgpack`) to receive the
+    prescriptions as one array per field, or `Accept: application/msgpack` for MessagePack.
     """
-    logger.info(f"Fetching prescriptions with filters: patient_id={patient_id}, doctor_id={doctor_id}, appointment_id={appointment_id}, skip={skip}, limit={limit}")
+    logger.info(f"Fetching prescriptions with filters: patient_id={patient_id}, doctor_id={doctor_id}, appointment_id={appointment_id}, medication={medication}, skip={skip}, limit={limit}, after_id={after_id}")
     prescriptions, total = PrescriptionService.get_prescriptions(
+        db=db,
         skip=skip,
         limit=limit,
         patient_id=patient_id,
         doctor_id=doctor_id,
-        appointment_id=appointment_id
+        appointment_id=appointment_id,
+        medication=medication,
+        after_id=after_id
     )
 
-    return PrescriptionListResponse(
-        total=total,
-        prescriptions=prescriptions
+    return negotiate(
+        request,
+        PrescriptionListResponse(total=total, prescriptions=prescriptions),
+        PrescriptionListResponse
     )
 
 
@@ -119,9 +377,11 @@ def get_prescriptions(
     summary="Get all prescriptions for a patient"
 )
 def get_patient_prescriptions(
+    request: Request,
     patient_id: int,
-    skip: int = Query(0, ge=0),
+    skip: int = Query(0, ge=0, le=settings.PAGINATION_MAX_SKIP),
     limit: int = Query(100, ge=1, le=500),
+    after_id: Optional[int] = Query(None, ge=0),
     db: Session = Depends(get_db)
 ):
     """
@@ -130,17 +390,20 @@ def get_patient_prescriptions(
     - **patient_id**: The ID of the patient
     - **skip**: Number of records to skip
     - **limit**: Maximum number of records to return
+    - **after_id**: Return prescriptions after this prescription ID
     """
     prescriptions, total = PrescriptionService.get_prescriptions_by_patient(
         db=db,
         patient_id=patient_id,
         skip=skip,
-        limit=limit
+        limit=limit,
+        after_id=after_id
     )
 
-    return PrescriptionListResponse(
-        total=total,
-        prescriptions=prescriptions
+    return negotiate(
+        request,
+        PrescriptionListResponse(total=total, prescriptions=prescriptions),
+        PrescriptionListResponse
     )
 
 
@@ -150,9 +413,11 @@ def get_patient_prescriptions(
     summary="Get all prescriptions issued by a doctor"
 )
 def get_doctor_prescriptions(
+    request: Request,
     doctor_id: int,
-    skip: int = Query(0, ge=0),
+    skip: int = Query(0, ge=0, le=settings.PAGINATION_MAX_SKIP),
     limit: int = Query(100, ge=1, le=500),
+    after_id: Optional[int] = Query(None, ge=0),
     db: Session = Depends(get_db)
 ):
     """
@@ -161,17 +426,20 @@ def get_doctor_prescriptions(
     - **doctor_id**: The ID of the doctor
     - **skip**: Number of records to skip
     - **limit**: Maximum number of records to return
+    - **after_id**: Return prescriptions after this prescription ID
     """
     prescriptions, total = PrescriptionService.get_prescriptions_by_doctor(
         db=db,
         doctor_id=doctor_id,
         skip=skip,
-        limit=limit
+        limit=limit,
+        after_id=after_id
     )
 
-    return PrescriptionListResponse(
-        total=total,
-        prescriptions=prescriptions
+    return negotiate(
+        request,
+        PrescriptionListResponse(total=total, prescriptions=prescriptions),
+        PrescriptionListResponse
     )
 
 
@@ -181,6 +449,7 @@ def get_doctor_prescriptions(
     summary="Get all prescriptions for an appointment"
 )
 def get_appointment_prescriptions(
+    request: Request,
     appointment_id: str,
     db: Session = Depends(get_db)
 ):
@@ -196,5 +465,5 @@ def get_appointment_prescriptions(
     )
 
     logger.info(f"Successfully fetched {len(prescriptions)} prescriptions for appointment_id={appointment_id}")
-    return prescriptions
+    return negotiate(request, prescriptions, list[PrescriptionResponse])
 
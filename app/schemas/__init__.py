@@ -2,13 +2,35 @@ from app.schemas.prescription import (
     PrescriptionBase,
     PrescriptionCreate,
     PrescriptionResponse,
-    PrescriptionListResponse
+    PrescriptionListResponse,
+    IngestionTicketResponse
 )
+from app.schemas.rollup import (
+    DoctorDailyCount,
+    MedicationDailyCount,
+    DoctorDailyResponse,
+    MedicationDailyResponse
+)
+from app.schemas.medication import MedicationSuggestion, MedicationSearchResponse
+from app.schemas.change_feed import PrescriptionChangeResponse, ChangeFeedResponse
+from app.schemas.admin import SqlStatementTrace, SlowRequest, SlowRequestListResponse, ProfilerSettings
 
 __all__ = [
     "PrescriptionBase",
     "PrescriptionCreate",
     "PrescriptionResponse",
-    "PrescriptionListResponse"
+    "PrescriptionListResponse",
+    "IngestionTicketResponse",
+    "DoctorDailyCount",
+    "MedicationDailyCount",
+    "DoctorDailyResponse",
+    "MedicationDailyResponse",
+    "MedicationSuggestion",
+    "MedicationSearchResponse",
+    "PrescriptionChangeResponse",
+    "ChangeFeedResponse",
+    "SqlStatementTrace",
+    "SlowRequest",
+    "SlowRequestListResponse",
+    "ProfilerSettings"
 ]
-
@@ -0,0 +1,37 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class SqlStatementTrace(BaseModel):
+    """Schema for one SQL statement executed by a request"""
+    statement: str
+    duration_ms: float
+    row_count: int
+
+
+class SlowRequest(BaseModel):
+    """Schema for a recorded slow request"""
+    correlation_id: Optional[str]
+    method: str
+    route: Optional[str]
+    params: dict = Field(..., description="Query and path parameters; values not in SLOW_REQUEST_RECORDED_PARAMS are redacted")
+    status_code: Optional[int]
+    started_at: float
+    duration_ms: float
+    sql_ms: float
+    pool_wait_ms: float
+    statement_count: int
+    statements: list[SqlStatementTrace]
+    profile: Optional[str] = Field(None, description="Folded stacks, if the request was profiled")
+
+
+class SlowRequestListResponse(BaseModel):
+    """Schema for the slow request buffer"""
+    threshold_ms: float
+    requests: list[SlowRequest]
+
+
+class ProfilerSettings(BaseModel):
+    """Schema for switching the sampling profiler"""
+    sample_rate: float = Field(..., ge=0.0, le=1.0, description="Fraction of requests to profile")
+    interval_ms: Optional[float] = Field(None, gt=0, description="Sampling interval")
@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+from app.schemas.prescription import PrescriptionResponse
+
+
+class PrescriptionChangeResponse(BaseModel):
+    """Schema for a single change feed entry"""
+    change_id: int
+    change_type: str
+    prescription_id: int
+    changed_at: datetime
+    prescription: Optional[PrescriptionResponse] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ChangeFeedResponse(BaseModel):
+    """Schema for a page of the change feed"""
+    changes: list[PrescriptionChangeResponse]
+    next_cursor: str
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+
+
+class MedicationSuggestion(BaseModel):
+    """Schema for a single medication autocomplete match"""
+    medication_id: int
+    name: str
+
+
+class MedicationSearchResponse(BaseModel):
+    """Schema for medication autocomplete results"""
+    prefix: str
+    results: list[MedicationSuggestion]
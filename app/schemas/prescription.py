@@ -40,3 +40,12 @@ class PrescriptionListResponse(BaseModel):
     total: int
     prescriptions: list[PrescriptionResponse]
 
+
+class IngestionTicketResponse(BaseModel):
+    """Schema for a prescription queued for a group commit"""
+    ticket_id: str
+    status: str
+    status_url: str
+    prescription: Optional[PrescriptionResponse] = None
+    error: Optional[str] = None
+
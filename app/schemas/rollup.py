@@ -0,0 +1,38 @@
+from pydantic import BaseModel
+from datetime import date
+
+
+class DoctorDailyCount(BaseModel):
+    """Schema for a doctor's prescription count on one day"""
+    doctor_id: int
+    day: date
+    prescription_count: int
+    total_days: int
+
+    class Config:
+        from_attributes = True
+
+
+class MedicationDailyCount(BaseModel):
+    """Schema for a medication's prescription count on one day"""
+    medication_id: int
+    medication: str
+    day: date
+    prescription_count: int
+    total_days: int
+
+    class Config:
+        from_attributes = True
+
+
+class DoctorDailyResponse(BaseModel):
+    """Schema for a doctor's daily dashboard"""
+    doctor_id: int
+    total: int
+    days: list[DoctorDailyCount]
+
+
+class MedicationDailyResponse(BaseModel):
+    """Schema for the daily medication dashboard"""
+    total: int
+    days: list[MedicationDailyCount]
@@ -1,4 +1,15 @@
 from app.services.prescription_service import PrescriptionService
+from app.services.rollup_service import RollupService
+from app.services.medication_service import MedicationService
+from app.services.idempotency_service import IdempotencyService
+from app.services.partition_service import PartitionService
+from app.services.archive_service import ArchiveService
 
-__all__ = ["PrescriptionService"]
-
+__all__ = [
+    "PrescriptionService",
+    "RollupService",
+    "MedicationService",
+    "IdempotencyService",
+    "PartitionService",
+    "ArchiveService"
+]
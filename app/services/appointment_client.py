@@ -0,0 +1,303 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+from urllib.parse import quote
+import threading
+import time
+
+import httpx
+
+from app.utils.logger import setup_logger
+from app.config import get_settings
+
+settings = get_settings()
+logger = setup_logger(__name__)
+
+
+class AppointmentServiceUnavailableError(Exception):
+    """Raised when appointments cannot be validated and the policy is fail-closed"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_seconds`; then lets a single trial call through (half-open)
+    and closes again if it succeeds.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now"""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class TTLCache:
+    """Bounded LRU whose entries expire individually"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bool]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: bool, ttl_seconds: float):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class AppointmentValidator:
+    """
+    Checks that appointments exist in the appointment service.
+
+    Uses one pooled keep-alive HTTP client, caches positive answers for
+    `cache_ttl_seconds` and negative answers for `negative_cache_ttl_seconds`,
+    and collapses concurrent lookups of the same appointment into a single
+    request. A circuit breaker stops calling an unhealthy appointment
+    service; while it is open (or on errors) appointments are accepted when
+    `fail_open` is set and rejected with AppointmentServiceUnavailableError
+    otherwise.
+
+    The appointment service is expected to answer `GET /appointments/{id}`
+    with 200 when the appointment exists and 404 when it does not.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str],
+        timeout_seconds: float,
+        cache_ttl_seconds: float,
+        negative_cache_ttl_seconds: float,
+        cache_size: int,
+        pool_size: int,
+        failure_threshold: int,
+        reset_seconds: float,
+        fail_open: bool
+    ):
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.timeout_seconds = timeout_seconds
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.negative_cache_ttl_seconds = negative_cache_ttl_seconds
+        self.pool_size = pool_size
+        self.fail_open = fail_open
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.cache = TTLCache(cache_size)
+        self._client: Optional[httpx.Client] = None
+        self._client_lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._in_flight_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.base_url is not None
+
+    def _get_client(self) -> httpx.Client:
+        with self._client_lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    base_url=self.base_url,
+                    timeout=self.timeout_seconds,
+                    limits=httpx.Limits(
+                        max_connections=self.pool_size,
+                        max_keepalive_connections=self.pool_size
+                    )
+                )
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.pool_size,
+                    thread_name_prefix="appointment-validation"
+                )
+            return self._client
+
+    def close(self):
+        """Close pooled connections and worker threads"""
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def exists(self, appointment_id: str) -> bool:
+        """
+        Check whether an appointment exists
+
+        Args:
+            appointment_id: Appointment ID
+
+        Returns:
+            True if the appointment exists (or validation is disabled / failing open)
+
+        Raises:
+            AppointmentServiceUnavailableError: If the appointment service is unavailable and failing closed
+        """
+        if not self.enabled:
+            return True
+
+        cached = self.cache.get(appointment_id)
+        if cached is not None:
+            return cached
+
+        with self._in_flight_lock:
+            future = self._in_flight.get(appointment_id)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[appointment_id] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = self._fetch(appointment_id)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(appointment_id, None)
+
+    def validate_many(self, appointment_ids: Iterable[str]) -> Dict[str, bool]:
+        """
+        Check many appointments, looking up cache misses concurrently over the pooled client
+
+        Returns:
+            Mapping of appointment ID -> exists
+
+        Raises:
+            AppointmentServiceUnavailableError: If the appointment service is unavailable and failing closed
+        """
+        unique_ids = list(dict.fromkeys(appointment_ids))
+        if not self.enabled:
+            return {appointment_id: True for appointment_id in unique_ids}
+
+        results = {}
+        misses = []
+        for appointment_id in unique_ids:
+            cached = self.cache.get(appointment_id)
+            if cached is None:
+                misses.append(appointment_id)
+            else:
+                results[appointment_id] = cached
+
+        if len(misses) == 1:
+            results[misses[0]] = self.exists(misses[0])
+        elif misses:
+            self._get_client()
+            futures = {appointment_id: self._executor.submit(self.exists, appointment_id) for appointment_id in misses}
+            for appointment_id, future in futures.items():
+                results[appointment_id] = future.result()
+
+        return results
+
+    def _fetch(self, appointment_id: str) -> bool:
+        if not self.breaker.allow():
+            return self._unavailable(appointment_id, "circuit breaker is open")
+
+        try:
+            # Quoted as a single path segment, so IDs cannot reach other endpoints
+            response = self._get_client().get(f"/appointments/{quote(appointment_id, safe='')}")
+        except httpx.HTTPError as e:
+            self.breaker.record_failure()
+            return self._unavailable(appointment_id, str(e) or e.__class__.__name__)
+        except BaseException:
+            # Also ends a half-open trial, so the breaker cannot stay stuck waiting for it
+            self.breaker.record_failure()
+            raise
+
+        if response.status_code == 404:
+            self.breaker.record_success()
+            self.cache.put(appointment_id, False, self.negative_cache_ttl_seconds)
+            return False
+
+        if response.status_code >= 400:
+            self.breaker.record_failure()
+            return self._unavailable(appointment_id, f"HTTP {response.status_code}")
+
+        self.breaker.record_success()
+        self.cache.put(appointment_id, True, self.cache_ttl_seconds)
+        return True
+
+    def _unavailable(self, appointment_id: str, reason: str) -> bool:
+        if self.fail_open:
+            logger.error(f"Appointment service unavailable ({reason}); accepting appointment_id={appointment_id}")
+            return True
+        raise AppointmentServiceUnavailableError(f"Appointment service unavailable: {reason}")
+
+
+appointment_validator = AppointmentValidator(
+    base_url=settings.APPOINTMENT_SERVICE_URL,
+    timeout_seconds=settings.APPOINTMENT_TIMEOUT_SECONDS,
+    cache_ttl_seconds=settings.APPOINTMENT_CACHE_TTL_SECONDS,
+    negative_cache_ttl_seconds=settings.APPOINTMENT_NEGATIVE_CACHE_TTL_SECONDS,
+    cache_size=settings.APPOINTMENT_CACHE_SIZE,
+    pool_size=settings.APPOINTMENT_POOL_SIZE,
+    failure_threshold=settings.APPOINTMENT_BREAKER_FAILURE_THRESHOLD,
+    reset_seconds=settings.APPOINTMENT_BREAKER_RESET_SECONDS,
+    fail_open=settings.APPOINTMENT_FAIL_OPEN
+)
@@ -0,0 +1,278 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, insert
+from typing import List, Optional, Tuple, Union
+from datetime import date, datetime
+from bisect import bisect_right
+from functools import lru_cache
+import gzip
+import json
+import os
+
+from app.database import session_shard
+from app.models.archive import ArchivedPrescription, ArchivedPartition
+from app.models.medication import Medication
+from app.models.prescription import Prescription
+from app.services.partition_service import PartitionService, add_months, month_start, partition_name
+
+ARCHIVE_COLUMNS = ("prescription_id", "appointment_id", "patient_id", "doctor_id", "medication_id", "dosage", "days", "issued_at")
+
+
+# Suffix of the sparse index written next to each archive file
+INDEX_SUFFIX = ".idx.json"
+
+
+def _row_to_dict(row) -> dict:
+    return {column: getattr(row, column) for column in ARCHIVE_COLUMNS}
+
+
+@lru_cache(maxsize=256)
+def _load_file_index(path: str) -> Optional[Tuple[List[int], List[Tuple[int, int]]]]:
+    """
+    Sparse index of an archive file: first ID of each gzip member, and its byte range
+
+    Archive files are never rewritten (their names carry a timestamp), so
+    the index is cached per path. Returns None for files written without one.
+    """
+    try:
+        with open(path + INDEX_SUFFIX, 'r', encoding='utf-8') as file:
+            members = json.load(file)["members"]
+    except FileNotFoundError:
+        return None
+
+    return [member[0] for member in members], [(member[1], member[2]) for member in members]
+
+
+class ArchiveService:
+    """Service layer for moving cold prescriptions out of the prescriptions table"""
+
+    @staticmethod
+    def archive_before(
+        db: Session,
+        cutoff: date,
+        mode: str = "table",
+        archive_dir: str = "archive",
+        chunk_size: int = 5000
+    ) -> List[ArchivedPartition]:
+        """
+        Archive every whole month of prescriptions issued before a cutoff
+
+        Each month is moved in chunks of `chunk_size` rows, either into the
+        prescriptions_archive table (copy and delete in the same transaction)
+        or into a gzipped JSON-lines file that is written in full before any
+        row is deleted. Each chunk is a separate gzip member, and a sparse
+        index of the members' first IDs and byte offsets is written next to
+        the file so lookups decompress a single chunk. Emptied monthly
+        partitions are dropped.
+
+        Args:
+            db: Database session
+            cutoff: First day that is kept; earlier months are archived
+            mode: "table" or "file"
+            archive_dir: Directory for file archives
+            chunk_size: Rows moved per transaction
+
+        Returns:
+            Archive records created, one per month
+        """
+        if mode not in ("table", "file"):
+            raise ValueError(f"Unknown archive mode: {mode}")
+
+        cutoff = month_start(cutoff)
+        archived = []
+
+        while True:
+            oldest = db.query(func.min(Prescription.issued_at)).filter(
+                Prescription.issued_at < datetime.combine(cutoff, datetime.min.time())
+            ).scalar()
+            if oldest is None:
+                break
+
+            period_start = month_start(oldest.date())
+            if mode == "table":
+                record = ArchiveService._archive_month_to_table(db, period_start, chunk_size)
+            else:
+                record = ArchiveService._archive_month_to_file(db, period_start, archive_dir, chunk_size)
+
+            PartitionService.drop_partition(db, period_start)
+            db.commit()
+            archived.append(record)
+
+        return archived
+
+    @staticmethod
+    def _month_query(db: Session, period_start: date):
+        start = datetime.combine(period_start, datetime.min.time())
+        end = datetime.combine(add_months(period_start, 1), datetime.min.time())
+        # Plain column rows: nothing is loaded into the identity map
+        return db.query(*[getattr(Prescription, column) for column in ARCHIVE_COLUMNS]).filter(
+            Prescription.issued_at >= start,
+            Prescription.issued_at < end
+        )
+
+    @staticmethod
+    def _archive_month_to_table(db: Session, period_start: date, chunk_size: int) -> ArchivedPartition:
+        record = ArchivedPartition(
+            partition_name=partition_name(period_start),
+            period_start=period_start,
+            min_prescription_id=0,
+            max_prescription_id=0,
+            row_count=0,
+            location=ArchivedPrescription.__tablename__
+        )
+
+        while True:
+            chunk = ArchiveService._month_query(db, period_start).order_by(
+                Prescription.prescription_id
+            ).limit(chunk_size).all()
+            if not chunk:
+                break
+
+            ids = [prescription.prescription_id for prescription in chunk]
+            db.execute(insert(ArchivedPrescription), [_row_to_dict(prescription) for prescription in chunk])
+            db.query(Prescription).filter(Prescription.prescription_id.in_(ids)).delete(synchronize_session=False)
+
+            ArchiveService._extend(record, ids)
+            db.add(record)
+            db.commit()
+
+        return record
+
+    @staticmethod
+    def _archive_month_to_file(
+        db: Session,
+        period_start: date,
+        archive_dir: str,
+        chunk_size: int
+    ) -> ArchivedPartition:
+        os.makedirs(archive_dir, exist_ok=True)
+        name = partition_name(period_start)
+        path = os.path.join(
+            archive_dir,
+            f"prescriptions-shard{session_shard(db)}-{name}-{datetime.utcnow():%Y%m%d%H%M%S}.jsonl.gz"
+        )
+
+        record = ArchivedPartition(
+            partition_name=name,
+            period_start=period_start,
+            min_prescription_id=0,
+            max_prescription_id=0,
+            row_count=0,
+            location=path
+        )
+
+        # Write the whole month before deleting anything
+        ids = []
+        members = []
+        last_id = 0
+        with open(path, 'wb') as file:
+            while True:
+                chunk = ArchiveService._month_query(db, period_start).filter(
+                    Prescription.prescription_id > last_id
+                ).order_by(Prescription.prescription_id).limit(chunk_size).all()
+                if not chunk:
+                    break
+                lines = []
+                for prescription in chunk:
+                    row = _row_to_dict(prescription)
+                    row["issued_at"] = row["issued_at"].isoformat()
+                    lines.append(json.dumps(row) + "\n")
+                    ids.append(prescription.prescription_id)
+                member = gzip.compress("".join(lines).encode('utf-8'))
+                members.append([chunk[0].prescription_id, file.tell(), len(member)])
+                file.write(member)
+                last_id = chunk[-1].prescription_id
+
+        with open(path + INDEX_SUFFIX, 'w', encoding='utf-8') as file:
+            json.dump({"members": members}, file)
+
+        ArchiveService._extend(record, ids)
+        db.add(record)
+        db.commit()
+
+        for offset in range(0, len(ids), chunk_size):
+            db.query(Prescription).filter(
+                Prescription.prescription_id.in_(ids[offset:offset + chunk_size])
+            ).delete(synchronize_session=False)
+            db.commit()
+
+        return record
+
+    @staticmethod
+    def _extend(record: ArchivedPartition, ids: List[int]):
+        if not ids:
+            return
+        if record.row_count:
+            record.min_prescription_id = min(record.min_prescription_id, min(ids))
+            record.max_prescription_id = max(record.max_prescription_id, max(ids))
+        else:
+            record.min_prescription_id = min(ids)
+            record.max_prescription_id = max(ids)
+        record.row_count += len(ids)
+
+    @staticmethod
+    def get_archived_prescription(
+        db: Session,
+        prescription_id: int
+    ) -> Optional[Union[ArchivedPrescription, Prescription]]:
+        """
+        Find a prescription that has been archived
+
+        Consults the archive records whose ID range covers the prescription,
+        then reads the archive table or the matching archive file.
+
+        Args:
+            db: Database session
+            prescription_id: Prescription ID
+
+        Returns:
+            The archived prescription if found, None otherwise
+        """
+        records = db.query(ArchivedPartition).filter(
+            ArchivedPartition.min_prescription_id <= prescription_id,
+            ArchivedPartition.max_prescription_id >= prescription_id
+        ).all()
+
+        for record in records:
+            if record.location == ArchivedPrescription.__tablename__:
+                archived = db.get(ArchivedPrescription, prescription_id)
+            else:
+                archived = ArchiveService._read_from_file(db, record.location, prescription_id)
+            if archived is not None:
+                return archived
+
+        return None
+
+    @staticmethod
+    def _read_from_file(db: Session, path: str, prescription_id: int) -> Optional[Prescription]:
+        if not os.path.exists(path):
+            return None
+
+        index = _load_file_index(path)
+        if index is None:
+            # Archived without a sparse index: scan the whole file
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                return ArchiveService._find_in_lines(db, file, prescription_id)
+
+        first_ids, byte_ranges = index
+        position = bisect_right(first_ids, prescription_id) - 1
+        if position < 0:
+            return None
+        offset, length = byte_ranges[position]
+        with open(path, 'rb') as file:
+            file.seek(offset)
+            member = gzip.decompress(file.read(length)).decode('utf-8')
+        return ArchiveService._find_in_lines(db, member.splitlines(), prescription_id)
+
+    @staticmethod
+    def _find_in_lines(db: Session, lines, prescription_id: int) -> Optional[Prescription]:
+        for line in lines:
+            row = json.loads(line)
+            if row["prescription_id"] != prescription_id:
+                continue
+            row["issued_at"] = datetime.fromisoformat(row["issued_at"])
+            # Transient object; never added to the session
+            prescription = Prescription(**row)
+            prescription.medication_entry = db.get(Medication, row["medication_id"])
+            return prescription
+
+        return None
@@ -0,0 +1,259 @@
+from sqlalchemy.orm import Session
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime
+import asyncio
+import heapq
+import threading
+import time
+
+from app.database import SHARD_COUNT, scatter, session_shard, shard_for_id, shard_id_base
+from app.models.change_log import PrescriptionChange
+from app.models.prescription import Prescription
+from app.config import get_settings
+
+settings = get_settings()
+
+# Change types
+CREATED = "created"
+
+# Gaps in change IDs remembered per process; older ones are forgotten first
+MAX_TRACKED_GAPS = 10000
+
+
+class TooManySubscribersError(Exception):
+    """Raised when the change feed already has the maximum number of waiting clients"""
+
+
+def parse_cursor(cursor: str) -> List[int]:
+    """
+    Parse a change feed cursor: the last change ID seen on each shard, joined with "."
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for a different number of shards
+    """
+    positions = [int(position) for position in cursor.split(".")]
+    if len(positions) != SHARD_COUNT or any(position < 0 for position in positions):
+        raise ValueError(f"Invalid change feed cursor: {cursor}")
+    return positions
+
+
+def format_cursor(positions: List[int]) -> str:
+    """Inverse of `parse_cursor`"""
+    return ".".join(str(position) for position in positions)
+
+
+def initial_cursor() -> List[int]:
+    """Cursor positioned before the first change"""
+    return [0] * SHARD_COUNT
+
+
+def advance_cursor(positions: List[int], change_id: int) -> List[int]:
+    """Cursor after a change has been seen"""
+    positions = list(positions)
+    positions[shard_for_id(change_id)] = change_id
+    return positions
+
+
+class ChangeNotifier:
+    """
+    In-process wake-up signal for change feed subscribers.
+
+    Writers call `notify` from any thread after committing; every waiting
+    subscriber's event is set on its own event loop. The number of
+    concurrent subscribers is bounded.
+    """
+
+    def __init__(self, max_subscribers: int):
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def notify(self):
+        """Wake every subscriber"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, event in subscribers:
+            loop.call_soon_threadsafe(event.set)
+
+    def acquire(self) -> Tuple[asyncio.AbstractEventLoop, asyncio.Event]:
+        """
+        Register a subscriber on the running event loop
+
+        Raises:
+            TooManySubscribersError: If the subscriber limit has been reached
+        """
+        subscriber = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribersError("Too many change feed subscribers")
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def release(self, subscriber: Tuple[asyncio.AbstractEventLoop, asyncio.Event]):
+        """Unregister a subscriber"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Event]:
+        """Register for wake-ups for the duration of the context"""
+        subscriber = self.acquire()
+        try:
+            yield subscriber[1]
+        finally:
+            self.release(subscriber)
+
+
+change_notifier = ChangeNotifier(max_subscribers=settings.CHANGE_FEED_MAX_SUBSCRIBERS)
+
+
+class GapTracker:
+    """
+    When this process first saw each gap in a shard's change IDs.
+
+    A gap is a missing change ID with later ones already visible: an insert
+    that has not committed yet, or one that was rolled back. Readers hold
+    back the changes after it until it has been seen for the settle window.
+    Time is measured from the first read that found the gap, on this
+    process's clock, never from the writer's `changed_at`.
+    """
+
+    def __init__(self, settle_seconds: float, max_gaps: int):
+        self.settle_seconds = settle_seconds
+        self.max_gaps = max_gaps
+        self._lock = threading.Lock()
+        self._first_seen: OrderedDict = OrderedDict()
+
+    def is_settled(self, shard_id: int, change_id: int) -> bool:
+        """
+        Record a gap starting at a change ID
+
+        Returns:
+            True once the gap has been seen for the settle window
+        """
+        key = (shard_id, change_id)
+        now = time.monotonic()
+        with self._lock:
+            first_seen = self._first_seen.get(key)
+            if first_seen is None:
+                first_seen = self._first_seen[key] = now
+                if len(self._first_seen) > self.max_gaps:
+                    self._first_seen.popitem(last=False)
+            else:
+                self._first_seen.move_to_end(key)
+        return now - first_seen >= self.settle_seconds
+
+    def seconds_until_settled(self) -> Optional[float]:
+        """Time until the next unsettled gap settles, or None if there is none"""
+        now = time.monotonic()
+        with self._lock:
+            pending = [
+                first_seen + self.settle_seconds - now
+                for first_seen in self._first_seen.values()
+                if first_seen + self.settle_seconds > now
+            ]
+        return min(pending) if pending else None
+
+    def clear(self):
+        with self._lock:
+            self._first_seen.clear()
+
+
+change_gaps = GapTracker(settle_seconds=settings.CHANGE_FEED_SETTLE_MS / 1000, max_gaps=MAX_TRACKED_GAPS)
+
+
+class ChangeFeedService:
+    """Service layer for the prescription change feed"""
+
+    @staticmethod
+    def record_created(db: Session, prescriptions: Iterable[Prescription]):
+        """
+        Append "created" entries to the change log.
+
+        Must be called in the transaction that inserts the prescriptions,
+        after they have been flushed; the caller is responsible for committing
+        and then calling `change_notifier.notify()`.
+        """
+        now = datetime.utcnow()
+        db.add_all([
+            PrescriptionChange(
+                prescription_id=prescription.prescription_id,
+                change_type=CREATED,
+                changed_at=now
+            )
+            for prescription in prescriptions
+        ])
+
+    @staticmethod
+    def get_changes(db: Session, since: int, limit: int = 100) -> List[PrescriptionChange]:
+        """
+        Get changes after a cursor, oldest first
+
+        Change IDs are allocated at insert time but become visible at commit
+        time, so a later ID can be visible before an earlier one. To keep
+        cursors safe to resume from, results stop at the first gap in the
+        sequence until this process has seen that gap for the settle window
+        (it is then a rolled-back insert and is skipped). Every gap in the
+        page is recorded, so a page with several gaps settles at once.
+
+        Args:
+            db: Database session (on the shard being read)
+            since: Last change ID the client has seen on this shard
+            limit: Maximum number of changes to return
+
+        Returns:
+            Changes with IDs greater than `since`
+        """
+        shard_id = session_shard(db)
+        # The shard's first change ID follows its range base
+        since = max(since, shard_id_base(shard_id))
+
+        changes = db.query(PrescriptionChange).filter(
+            PrescriptionChange.change_id > since
+        ).order_by(PrescriptionChange.change_id).limit(limit).all()
+
+        expected = since + 1
+        contiguous = []
+        held_back = False
+        for change in changes:
+            if change.change_id != expected and not change_gaps.is_settled(shard_id, expected):
+                held_back = True
+            if not held_back:
+                contiguous.append(change)
+            expected = change.change_id + 1
+
+        return contiguous
+
+    @staticmethod
+    def get_changes_from_shards(db: Session, cursor: List[int], limit: int = 100) -> List[PrescriptionChange]:
+        """
+        Get changes after a cursor from every shard
+
+        Each shard's changes stay in change ID order; shards are interleaved
+        by change time, so advancing the cursor over the returned changes
+        never skips one.
+
+        Args:
+            db: Database session
+            cursor: Last change ID seen on each shard
+            limit: Maximum number of changes to return
+
+        Returns:
+            Up to `limit` changes
+        """
+        pages = scatter(db, lambda shard_db: ChangeFeedService.get_changes(
+            shard_db,
+            since=cursor[session_shard(shard_db)],
+            limit=limit
+        ))
+        if len(pages) == 1:
+            return pages[0]
+
+        merged = heapq.merge(*pages, key=lambda change: change.changed_at)
+        return [change for _, change in zip(range(limit), merged)]
@@ -0,0 +1,192 @@
+from sqlalchemy.orm import Session
+from typing import NamedTuple, Optional
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import hashlib
+import json
+import threading
+
+from app.models.idempotency import IdempotencyKey
+from app.models.prescription import Prescription
+from app.schemas.prescription import PrescriptionCreate, PrescriptionResponse
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class StoredResponse(NamedTuple):
+    """Response recorded for an idempotency key"""
+    request_hash: str
+    status_code: int
+    body: dict
+    expires_at: datetime
+
+
+class IdempotencyCache:
+    """Bounded, thread-safe LRU of recently seen idempotency keys"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, StoredResponse]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        """Get a cached response, dropping it if it has expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= datetime.utcnow():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: StoredResponse):
+        """Cache a response, evicting the least recently used key when full"""
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+idempotency_cache = IdempotencyCache(max_size=settings.IDEMPOTENCY_CACHE_SIZE)
+
+
+class IdempotencyService:
+    """Service layer for Idempotency-Key handling on prescription creation"""
+
+    @staticmethod
+    def hash_request(prescription: PrescriptionCreate) -> str:
+        """Fingerprint a create request so a reused key with a different body can be rejected"""
+        return hashlib.sha256(prescription.model_dump_json().encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def lookup(db: Session, key: str) -> Optional[StoredResponse]:
+        """
+        Find the stored response for an idempotency key
+
+        Checks the in-memory LRU first and falls back to a single primary-key
+        read of the dedupe table on the shard of `db`. Keys are scoped to the
+        patient: they are stored with the prescription on the patient's shard
+        and only looked up there. Nothing is written, so the session can be
+        closed straight away; an expired row is replaced by `record`.
+
+        Args:
+            db: Database session on the shard of the patient the prescription is for
+            key: Idempotency key sent by the client
+
+        Returns:
+            Stored response if the key was seen and has not expired, None otherwise
+        """
+        entry = idempotency_cache.get(key)
+        if entry is not None:
+            return entry
+
+        record = db.get(IdempotencyKey, key)
+        if record is None:
+            return None
+
+        if record.expires_at <= datetime.utcnow():
+            return None
+
+        entry = StoredResponse(
+            request_hash=record.request_hash,
+            status_code=record.status_code,
+            body=json.loads(record.response_body),
+            expires_at=record.expires_at
+        )
+        idempotency_cache.put(key, entry)
+        return entry
+
+    @staticmethod
+    def record(
+        db: Session,
+        key: str,
+        request_hash: str,
+        prescription: Prescription,
+        status_code: int = 201
+    ) -> StoredResponse:
+        """
+        Store the response for an idempotency key.
+
+        Must be called in the transaction that creates the prescription and
+        after it has been flushed; the caller is responsible for committing.
+        An expired row for the key that has not been purged yet is replaced.
+
+        Args:
+            db: Database session
+            key: Idempotency key sent by the client
+            request_hash: Fingerprint of the request body
+            prescription: Newly created prescription
+            status_code: HTTP status of the original response
+
+        Returns:
+            The stored response
+        """
+        now = datetime.utcnow()
+        body = PrescriptionResponse.model_validate(prescription).model_dump(mode="json")
+        entry = StoredResponse(
+            request_hash=request_hash,
+            status_code=status_code,
+            body=body,
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+        )
+
+        db.query(IdempotencyKey).filter(
+            IdempotencyKey.idempotency_key == key,
+            IdempotencyKey.expires_at <= now
+        ).delete(synchronize_session=False)
+        db.add(IdempotencyKey(
+            idempotency_key=key,
+            request_hash=request_hash,
+            prescription_id=prescription.prescription_id,
+            status_code=status_code,
+            response_body=json.dumps(body),
+            created_at=now,
+            expires_at=entry.expires_at
+        ))
+
+        return entry
+
+    @staticmethod
+    def purge_expired(db: Session, chunk_size: int = 1000) -> int:
+        """
+        Delete expired idempotency keys in chunks, committing after each chunk
+
+        Args:
+            db: Database session
+            chunk_size: Maximum number of keys deleted per statement
+
+        Returns:
+            Number of keys deleted
+        """
+        deleted = 0
+
+        while True:
+            now = datetime.utcnow()
+            keys = [
+                row.idempotency_key
+                for row in db.query(IdempotencyKey.idempotency_key)
+                .filter(IdempotencyKey.expires_at <= now)
+                .limit(chunk_size)
+                .all()
+            ]
+            if not keys:
+                break
+
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.idempotency_key.in_(keys)
+            ).delete(synchronize_session=False)
+            db.commit()
+            deleted += len(keys)
+
+            if len(keys) < chunk_size:
+                break
+
+        return deleted
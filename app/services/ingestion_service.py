@@ -0,0 +1,276 @@
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+from collections import OrderedDict
+import queue
+import threading
+import time
+import uuid
+
+from app.database import SessionLocal, shard_for_patient
+from app.models.prescription import Prescription
+from app.schemas.prescription import PrescriptionCreate, PrescriptionResponse
+from app.services.prescription_service import PrescriptionService
+from app.utils.logger import setup_logger
+from app.config import get_settings
+
+settings = get_settings()
+logger = setup_logger(__name__)
+
+# Ingestion ticket statuses
+PENDING = "pending"
+COMMITTED = "committed"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue cannot accept more prescriptions"""
+
+
+class IngestionTicket:
+    """A queued prescription and the outcome of its group commit"""
+
+    def __init__(self, prescription: PrescriptionCreate, idempotency_key: Optional[str]):
+        self.ticket_id = str(uuid.uuid4())
+        self.prescription = prescription
+        self.idempotency_key = idempotency_key
+        self.status = PENDING
+        self.result: Optional[PrescriptionResponse] = None
+        self.error: Optional[str] = None
+        self.future: Future = Future()
+
+    def resolve(self, result: PrescriptionResponse):
+        self.status = COMMITTED
+        self.result = result
+        self.future.set_result(result)
+
+    def fail(self, error: Exception):
+        # The original exception is kept so the route can answer with its status code
+        self.status = FAILED
+        self.error = str(error)
+        self.future.set_exception(error)
+
+
+class IngestionQueue:
+    """
+    Write-behind queue for prescription creation.
+
+    Requests are appended to a bounded in-process queue and written by a
+    single background worker, which groups them into one transaction per
+    batch. A batch is flushed when it reaches `batch_size` or when
+    `flush_interval_ms` has passed since its first item was taken.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        batch_size: int,
+        flush_interval_ms: int,
+        max_tracked_tickets: int
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_tracked_tickets = max_tracked_tickets
+        self._queue: "queue.Queue[Optional[IngestionTicket]]" = queue.Queue(maxsize=max_size)
+        self._tickets: "OrderedDict[str, IngestionTicket]" = OrderedDict()
+        self._tickets_lock = threading.Lock()
+        # Queued tickets by idempotency key, so a retry joins the original instead of writing again
+        self._pending_keys: Dict[str, IngestionTicket] = {}
+        self._worker: Optional[threading.Thread] = None
+        self._accepting = False
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and self._worker.is_alive()
+
+    def start(self):
+        """Start the background flush worker"""
+        if self.running:
+            return
+        self._accepting = True
+        self._worker = threading.Thread(target=self._run, name="prescription-ingestion", daemon=True)
+        self._worker.start()
+        logger.info(f"Ingestion worker started (batch_size={self.batch_size}, flush_interval={self.flush_interval}s)")
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop accepting prescriptions and wait until the queue has been drained"""
+        if not self.running:
+            return
+        self._accepting = False
+        self._queue.put(None)
+        self._worker.join(timeout)
+        logger.info("Ingestion worker stopped")
+
+    def submit(self, prescription: PrescriptionCreate, idempotency_key: Optional[str] = None) -> IngestionTicket:
+        """
+        Queue a prescription for the next group commit
+
+        A prescription whose idempotency key is already queued is not queued
+        again; the ticket of the queued one is returned instead.
+
+        Args:
+            prescription: Validated prescription data
+            idempotency_key: Client Idempotency-Key (optional)
+
+        Returns:
+            Ticket tracking the prescription
+
+        Raises:
+            QueueFullError: If the queue is full or shutting down
+        """
+        if not self._accepting:
+            raise QueueFullError("Ingestion queue is not accepting prescriptions")
+
+        ticket = IngestionTicket(prescription, idempotency_key)
+        with self._tickets_lock:
+            if idempotency_key is not None:
+                pending = self._pending_keys.get(idempotency_key)
+                if pending is not None:
+                    return pending
+            try:
+                self._queue.put_nowait(ticket)
+            except queue.Full:
+                raise QueueFullError("Ingestion queue is full")
+            if idempotency_key is not None:
+                self._pending_keys[idempotency_key] = ticket
+
+            self._tickets[ticket.ticket_id] = ticket
+            while len(self._tickets) > self.max_tracked_tickets:
+                self._tickets.popitem(last=False)
+
+        return ticket
+
+    def get_ticket(self, ticket_id: str) -> Optional[IngestionTicket]:
+        """Get a recently submitted ticket by ID"""
+        with self._tickets_lock:
+            return self._tickets.get(ticket_id)
+
+    def depth(self) -> int:
+        """Number of prescriptions waiting to be flushed"""
+        return self._queue.qsize()
+
+    def _next_batch(self) -> tuple[List[IngestionTicket], bool]:
+        """Block for the first ticket, then gather more until the batch is full or the window closes"""
+        first = self._queue.get()
+        if first is None:
+            return self._drain_remaining(), True
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                ticket = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if ticket is None:
+                return batch + self._drain_remaining(), True
+            batch.append(ticket)
+
+        return batch, False
+
+    def _drain_remaining(self) -> List[IngestionTicket]:
+        """Take everything still queued (used on shutdown)"""
+        remaining = []
+        while True:
+            try:
+                ticket = self._queue.get_nowait()
+            except queue.Empty:
+                return remaining
+            if ticket is not None:
+                remaining.append(ticket)
+
+    def _run(self):
+        while True:
+            batch, stopping = self._next_batch()
+            for group in self._group_by_shard(batch):
+                for offset in range(0, len(group), self.batch_size):
+                    self._flush(group[offset:offset + self.batch_size])
+            if stopping:
+                return
+
+    @staticmethod
+    def _group_by_shard(batch: List[IngestionTicket]) -> List[List[IngestionTicket]]:
+        """Split a batch by patient shard; a group commit covers a single shard"""
+        groups = {}
+        for ticket in batch:
+            groups.setdefault(shard_for_patient(ticket.prescription.patient_id), []).append(ticket)
+        return list(groups.values())
+
+    def _flush(self, batch: List[IngestionTicket]):
+        """Write a batch in one transaction, falling back to one transaction per item on failure"""
+        if not batch:
+            return
+
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            try:
+                written = self._write(db, batch)
+            except Exception as e:
+                db.rollback()
+                if len(batch) == 1:
+                    self._fail(batch[0], e)
+                    return
+                logger.error(f"Group commit of {len(batch)} prescriptions failed, retrying individually: {str(e)}")
+            else:
+                self._resolve(batch, written)
+                return
+
+            for ticket in batch:
+                try:
+                    written = self._write(db, [ticket])
+                except Exception as e:
+                    db.rollback()
+                    self._fail(ticket, e)
+                else:
+                    self._resolve([ticket], written)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _write(db, batch: List[IngestionTicket]) -> List[Prescription]:
+        """Insert a batch with a single commit"""
+        return PrescriptionService.create_prescriptions(
+            db,
+            [ticket.prescription for ticket in batch],
+            idempotency_keys=[ticket.idempotency_key for ticket in batch]
+        )
+
+    def _resolve(self, batch: List[IngestionTicket], db_prescriptions: List[Prescription]):
+        """Hand committed prescriptions back to the waiting requests"""
+        for ticket, db_prescription in zip(batch, db_prescriptions):
+            try:
+                ticket.resolve(PrescriptionResponse.model_validate(db_prescription))
+            except Exception as e:
+                # Already committed: report the failure but never write it again
+                self._fail(ticket, e)
+            else:
+                self._release(ticket)
+
+    def _fail(self, ticket: IngestionTicket, error: Exception):
+        ticket.fail(error)
+        self._release(ticket)
+        logger.error(f"Failed to ingest prescription ticket={ticket.ticket_id}: {str(error)}")
+
+    def _release(self, ticket: IngestionTicket):
+        """Stop routing retries to a finished ticket; later ones are answered from the stored response"""
+        if ticket.idempotency_key is None:
+            return
+        with self._tickets_lock:
+            if self._pending_keys.get(ticket.idempotency_key) is ticket:
+                del self._pending_keys[ticket.idempotency_key]
+
+
+ingestion_queue = IngestionQueue(
+    max_size=settings.INGESTION_QUEUE_SIZE,
+    batch_size=settings.INGESTION_BATCH_SIZE,
+    flush_interval_ms=settings.INGESTION_FLUSH_INTERVAL_MS,
+    max_tracked_tickets=settings.INGESTION_TRACKED_TICKETS
+)
+
+
+def ingestion_enabled() -> bool:
+    """Whether POST /prescriptions/ goes through the write-behind queue"""
+    return settings.INGESTION_MODE == "batched"
+
@@ -0,0 +1,252 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, Iterable, List, Optional, Tuple
+from bisect import bisect_left
+import threading
+import time
+
+from app.models.medication import Medication
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def normalize_medication_name(name: str) -> str:
+    """Collapse whitespace in a medication name for display and storage"""
+    return " ".join(name.split())
+
+
+def medication_name_key(name: str) -> str:
+    """Case-insensitive lookup key for a medication name"""
+    return normalize_medication_name(name).casefold()
+
+
+class MedicationIndex:
+    """
+    In-memory sorted index of the medications dictionary.
+
+    Serves name -> ID lookups and prefix searches without touching the
+    database. Entries created by this process are added when their
+    transaction commits; entries created elsewhere are picked up on the next
+    lookup miss or by a periodic full refresh.
+    """
+
+    def __init__(self, refresh_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._keys: List[str] = []
+        self._entries: List[Tuple[str, int, str]] = []
+        self._by_key: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+
+    def refresh(self, db: Session):
+        """Reload the whole index from the medications table"""
+        rows = db.query(Medication.name_key, Medication.medication_id, Medication.name).all()
+        entries = sorted((key, medication_id, name) for key, medication_id, name in rows)
+
+        with self._lock:
+            self._entries = entries
+            self._keys = [entry[0] for entry in entries]
+            self._by_key = {entry[0]: entry[1] for entry in entries}
+            self._loaded_at = time.monotonic()
+
+    def ensure_fresh(self, db: Session):
+        """Reload the index if it was never loaded or is older than the refresh interval"""
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.refresh_seconds:
+            self.refresh(db)
+
+    def add(self, name_key: str, medication_id: int, name: str):
+        """Insert a single committed medication into the index"""
+        with self._lock:
+            if name_key in self._by_key:
+                return
+            position = bisect_left(self._keys, name_key)
+            self._keys.insert(position, name_key)
+            self._entries.insert(position, (name_key, medication_id, name))
+            self._by_key[name_key] = medication_id
+
+    def get_id(self, name_key: str) -> Optional[int]:
+        """Get the medication ID for a lookup key, if indexed"""
+        return self._by_key.get(name_key)
+
+    def search(self, prefix: str, limit: int = 10) -> List[Tuple[int, str]]:
+        """
+        Find medications whose name starts with a prefix
+
+        Args:
+            prefix: Name prefix (case-insensitive)
+            limit: Maximum number of matches to return
+
+        Returns:
+            List of (medication_id, name) in alphabetical order
+        """
+        prefix_key = medication_name_key(prefix)
+
+        with self._lock:
+            position = bisect_left(self._keys, prefix_key)
+            matches = []
+            while position < len(self._entries) and len(matches) < limit:
+                key, medication_id, name = self._entries[position]
+                if not key.startswith(prefix_key):
+                    break
+                matches.append((medication_id, name))
+                position += 1
+
+        return matches
+
+
+medication_index = MedicationIndex(refresh_seconds=settings.MEDICATION_INDEX_REFRESH_SECONDS)
+
+
+@event.listens_for(Session, "after_commit")
+def _index_new_medications(session):
+    """Publish medications created in a transaction once it has committed"""
+    for entry in session.info.pop("new_medications", []):
+        medication_index.add(*entry)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_new_medications(session):
+    """Forget medications whose creating transaction was rolled back"""
+    session.info.pop("new_medications", None)
+
+
+class MedicationService:
+    """Service layer for the medications dictionary"""
+
+    @staticmethod
+    def get_or_create(db: Session, name: str) -> int:
+        """
+        Get the ID for a medication name, creating the dictionary entry if needed
+
+        Args:
+            db: Database session
+            name: Medication name as entered
+
+        Returns:
+            Medication ID
+        """
+        return MedicationService.get_or_create_many(db, [name])[medication_name_key(name)]
+
+    @staticmethod
+    def get_or_create_many(db: Session, names: Iterable[str]) -> Dict[str, int]:
+        """
+        Resolve many medication names to IDs, creating missing entries
+
+        Args:
+            db: Database session
+            names: Medication names as entered
+
+        Returns:
+            Mapping of lookup key -> medication ID
+        """
+        wanted = {}
+        for name in names:
+            wanted.setdefault(medication_name_key(name), normalize_medication_name(name))
+
+        resolved = {}
+        missing = []
+        for key in wanted:
+            medication_id = medication_index.get_id(key)
+            if medication_id is not None:
+                resolved[key] = medication_id
+            else:
+                missing.append(key)
+
+        if missing:
+            for medication in db.query(Medication).filter(Medication.name_key.in_(missing)).all():
+                resolved[medication.name_key] = medication.medication_id
+                medication_index.add(medication.name_key, medication.medication_id, medication.name)
+
+        for key in missing:
+            if key in resolved:
+                continue
+
+            medication = Medication(name=wanted[key], name_key=key)
+            try:
+                with db.begin_nested():
+                    db.add(medication)
+            except IntegrityError:
+                # Created concurrently by another request
+                medication = db.query(Medication).filter(Medication.name_key == key).one()
+            else:
+                db.info.setdefault("new_medications", []).append(
+                    (medication.name_key, medication.medication_id, medication.name)
+                )
+
+            resolved[key] = medication.medication_id
+
+        return resolved
+
+    @staticmethod
+    def replicate(home_db: Session, shard_db: Session, medication_ids: Iterable[int]) -> Dict[int, Medication]:
+        """
+        Copy dictionary entries from the home shard to another shard
+
+        Prescriptions reference medications by foreign key, so every shard
+        keeps a copy of the entries its prescriptions use. IDs and names are
+        always those allocated on the home shard.
+
+        Args:
+            home_db: Session on the home shard (entries must be committed)
+            shard_db: Session on the target shard
+            medication_ids: Medication IDs needed on the target shard
+
+        Returns:
+            Mapping of medication ID -> Medication loaded in `shard_db`
+        """
+        medication_ids = set(medication_ids)
+        replicas = {
+            medication.medication_id: medication
+            for medication in shard_db.query(Medication).filter(Medication.medication_id.in_(medication_ids)).all()
+        }
+
+        missing = medication_ids - replicas.keys()
+        if missing:
+            for source in home_db.query(Medication).filter(Medication.medication_id.in_(missing)).all():
+                medication = Medication(
+                    medication_id=source.medication_id,
+                    name=source.name,
+                    name_key=source.name_key
+                )
+                try:
+                    with shard_db.begin_nested():
+                        shard_db.add(medication)
+                except IntegrityError:
+                    # Replicated concurrently by another request
+                    medication = shard_db.get(Medication, source.medication_id)
+                replicas[source.medication_id] = medication
+
+        return replicas
+
+    @staticmethod
+    def resolve_id(db: Session, name: str) -> Optional[int]:
+        """
+        Look up the ID of an existing medication without creating it
+
+        Args:
+            db: Database session
+            name: Medication name
+
+        Returns:
+            Medication ID if the medication exists, None otherwise
+        """
+        key = medication_name_key(name)
+        medication_id = medication_index.get_id(key)
+        if medication_id is not None:
+            return medication_id
+
+        medication = db.query(Medication).filter(Medication.name_key == key).first()
+        if medication is None:
+            return None
+
+        medication_index.add(medication.name_key, medication.medication_id, medication.name)
+        return medication.medication_id
+
+    @staticmethod
+    def search(db: Session, prefix: str, limit: int = 10) -> List[Tuple[int, str]]:
+        """Autocomplete medication names from the in-memory index"""
+        medication_index.ensure_fresh(db)
+        return medication_index.search(prefix, limit=limit)
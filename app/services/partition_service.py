@@ -0,0 +1,160 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text, inspect, func
+from typing import List, Optional
+from datetime import date
+
+from app.models.prescription import Prescription
+
+PARTITIONED_TABLE = Prescription.__tablename__
+CATCH_ALL_PARTITION = "pmax"
+
+
+def month_start(day: date) -> date:
+    """First day of the month containing a date"""
+    return day.replace(day=1)
+
+
+def add_months(day: date, months: int) -> date:
+    """First day of the month `months` after the month containing a date"""
+    month_index = day.year * 12 + (day.month - 1) + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(period_start: date) -> str:
+    """Name of the monthly partition starting at a date, e.g. p202401"""
+    return f"p{period_start.year:04d}{period_start.month:02d}"
+
+
+def _period_start(name: str) -> date:
+    """First day of the month a partition name such as p202401 stands for"""
+    return date(int(name[1:5]), int(name[5:7]), 1)
+
+
+def _partition_clause(period_start: date) -> str:
+    return (
+        f"PARTITION {partition_name(period_start)} "
+        f"VALUES LESS THAN ('{add_months(period_start, 1).isoformat()}')"
+    )
+
+
+class PartitionService:
+    """
+    Monthly range partitioning of the prescriptions table on issued_at.
+
+    Only MySQL supports partitioning; on other databases every operation
+    reports that partitioning is unavailable and leaves the table alone.
+
+    MySQL requires the partitioning column in every unique key and does not
+    allow foreign keys on partitioned tables, so converting the table widens
+    the primary key to (prescription_id, issued_at) and drops its foreign
+    keys. The ORM keeps treating prescription_id alone as the identity.
+    """
+
+    @staticmethod
+    def is_supported(db: Session) -> bool:
+        return db.get_bind().dialect.name == "mysql"
+
+    @staticmethod
+    def get_partitions(db: Session) -> List[str]:
+        """Names of the existing partitions, oldest first (empty if not partitioned)"""
+        if not PartitionService.is_supported(db):
+            return []
+
+        rows = db.execute(text(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        ), {"table": PARTITIONED_TABLE}).all()
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def ensure_partitions(db: Session, months_ahead: int, today: Optional[date] = None) -> List[str]:
+        """
+        Partition the prescriptions table by month and create future partitions
+
+        Converts an unpartitioned table (one partition per month from the
+        oldest prescription onwards) and then makes sure a partition exists
+        for every month up to `months_ahead` months from now, including any
+        months since the newest partition that were missed. Rows beyond the
+        last monthly partition land in a catch-all partition.
+
+        Args:
+            db: Database session
+            months_ahead: Number of future months that must have a partition
+            today: Reference date (defaults to today)
+
+        Returns:
+            Names of the partitions that were created
+        """
+        if not PartitionService.is_supported(db):
+            return []
+
+        today = today or date.today()
+        last_period = add_months(month_start(today), months_ahead)
+        existing = PartitionService.get_partitions(db)
+
+        if not existing:
+            oldest = db.query(func.min(Prescription.issued_at)).scalar()
+            first_period = month_start(oldest.date()) if oldest else month_start(today)
+            periods = PartitionService._periods(first_period, last_period)
+            PartitionService._convert(db, periods)
+            return [partition_name(period) for period in periods]
+
+        monthly = [name for name in existing if name != CATCH_ALL_PARTITION]
+        if monthly:
+            # Continue right after the newest partition, so months the job missed
+            # get their own partition instead of being folded into the next one
+            first_period = add_months(_period_start(max(monthly)), 1)
+        else:
+            oldest = db.query(func.min(Prescription.issued_at)).scalar()
+            first_period = month_start(oldest.date()) if oldest else month_start(today)
+        periods = PartitionService._periods(first_period, last_period)
+        if not periods:
+            return []
+
+        clauses = ", ".join(_partition_clause(period) for period in periods)
+        db.execute(text(
+            f"ALTER TABLE {PARTITIONED_TABLE} REORGANIZE PARTITION {CATCH_ALL_PARTITION} INTO "
+            f"({clauses}, PARTITION {CATCH_ALL_PARTITION} VALUES LESS THAN (MAXVALUE))"
+        ))
+        return [partition_name(period) for period in periods]
+
+    @staticmethod
+    def drop_partition(db: Session, period_start: date) -> bool:
+        """
+        Drop the (already emptied) partition of a month
+
+        Returns:
+            True if a partition was dropped
+        """
+        name = partition_name(period_start)
+        if name not in PartitionService.get_partitions(db):
+            return False
+
+        db.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} DROP PARTITION {name}"))
+        return True
+
+    @staticmethod
+    def _periods(first: date, last: date) -> List[date]:
+        periods = []
+        period = first
+        while period <= last:
+            periods.append(period)
+            period = add_months(period, 1)
+        return periods
+
+    @staticmethod
+    def _convert(db: Session, periods: List[date]):
+        """Turn the plain prescriptions table into a monthly range-partitioned one"""
+        for foreign_key in inspect(db.get_bind()).get_foreign_keys(PARTITIONED_TABLE):
+            db.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} DROP FOREIGN KEY {foreign_key['name']}"))
+
+        db.execute(text(
+            f"ALTER TABLE {PARTITIONED_TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (prescription_id, issued_at)"
+        ))
+
+        clauses = ", ".join(_partition_clause(period) for period in periods)
+        db.execute(text(
+            f"ALTER TABLE {PARTITIONED_TABLE} PARTITION BY RANGE COLUMNS(issued_at) "
+            f"({clauses}, PARTITION {CATCH_ALL_PARTITION} VALUES LESS THAN (MAXVALUE))"
+        ))
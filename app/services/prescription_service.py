@@ -2,22 +2,44 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from datetime import datetime
+import heapq
 
+from app.database import HOME_SHARD, SHARD_COUNT, scatter, shard_for_id, shard_for_patient, shard_session
 from app.models.prescription import Prescription
+from app.models.relocation import RelocatedPrescription
 from app.schemas.prescription import PrescriptionCreate
+from app.services.rollup_service import RollupService
+from app.services.medication_service import MedicationService, medication_name_key
+from app.services.idempotency_service import IdempotencyService, idempotency_cache
+from app.services.archive_service import ArchiveService
+from app.services.change_feed_service import ChangeFeedService, change_notifier
+from app.services.appointment_client import appointment_validator
 
 
 class PrescriptionService:
-    """Service layer for prescription operations"""
+    """
+    Service layer for prescription operations
+
+    Prescriptions are sharded by a hash of patient_id; each shard also
+    holds the rollups, change log entries and idempotency keys written with
+    its prescriptions. Prescription IDs identify the shard that allocated
+    them. Patient and ID lookups read one shard, other queries read every
+    shard in parallel and merge the results in prescription ID order.
+    """
 
     @staticmethod
-    def create_prescription(db: Session, prescription: PrescriptionCreate) -> Prescription:
+    def create_prescription(
+        db: Session,
+        prescription: PrescriptionCreate,
+        idempotency_key: Optional[str] = None
+    ) -> Prescription:
         """
         Create a new prescription
 
         Args:
             db: Database session
             prescription: Prescription data
+            idempotency_key: Client Idempotency-Key to record with the prescription (optional)
 
         Returns:
             Created prescription
@@ -25,25 +47,126 @@ class PrescriptionService:
         Raises:
             ValueError: If appointment doesn't exist
         """
-        # Note: In a real application, you should verify that the appointment exists
-        # by calling the appointment service or checking the appointment table
-
-        db_prescription = Prescription(
-            appointment_id=prescription.appointment_id,
-            patient_id=prescription.patient_id,
-            doctor_id=prescription.doctor_id,
-            medication=prescription.medication,
-            dosage=prescription.dosage,
-            days=prescription.days,
-            issued_at=prescription.issued_at or datetime.utcnow()
-        )
-
-        db.add(db_prescription)
-        db.commit()
-        db.refresh(db_prescription)
+        with shard_session(db, shard_for_patient(prescription.patient_id)) as shard_db:
+            db_prescription = PrescriptionService.create_prescriptions(
+                shard_db,
+                [prescription],
+                idempotency_keys=[idempotency_key]
+            )[0]
+            shard_db.refresh(db_prescription)
 
         return db_prescription
 
+    @staticmethod
+    def create_prescriptions(
+        db: Session,
+        prescriptions: List[PrescriptionCreate],
+        idempotency_keys: Optional[List[Optional[str]]] = None
+    ) -> List[Prescription]:
+        """
+        Create several prescriptions in a single transaction (one commit)
+
+        All prescriptions must belong to patients on the same shard. New
+        medication names are committed on the home shard first and copied to
+        the patients' shard, where everything else is written in one
+        transaction.
+
+        Args:
+            db: Database session (on any shard)
+            prescriptions: Prescription data
+            idempotency_keys: Client Idempotency-Key per prescription, or None entries (optional)
+
+        Returns:
+            Created prescriptions, in input order
+
+        Raises:
+            ValueError: If appointment doesn't exist or the patients are on different shards
+            AppointmentServiceUnavailableError: If appointments cannot be validated
+        """
+        PrescriptionService.validate_appointments(prescriptions)
+
+        shard_ids = {shard_for_patient(prescription.patient_id) for prescription in prescriptions}
+        if len(shard_ids) > 1:
+            raise ValueError("Prescriptions for patients on different shards cannot be created together")
+        shard_id = shard_ids.pop()
+
+        idempotency_keys = idempotency_keys or [None] * len(prescriptions)
+
+        with shard_session(db, HOME_SHARD) as home_db, shard_session(db, shard_id) as shard_db:
+            medication_ids = MedicationService.get_or_create_many(
+                home_db,
+                [prescription.medication for prescription in prescriptions]
+            )
+            replicas = {}
+            if shard_db is not home_db:
+                home_db.commit()
+                replicas = MedicationService.replicate(home_db, shard_db, medication_ids.values())
+
+            db_prescriptions = []
+            for prescription in prescriptions:
+                medication_id = medication_ids[medication_name_key(prescription.medication)]
+                db_prescription = Prescription(
+                    appointment_id=prescription.appointment_id,
+                    patient_id=prescription.patient_id,
+                    doctor_id=prescription.doctor_id,
+                    medication_id=medication_id,
+                    dosage=prescription.dosage,
+                    days=prescription.days,
+                    issued_at=prescription.issued_at or datetime.utcnow()
+                )
+                if replicas:
+                    db_prescription.medication_entry = replicas[medication_id]
+                db_prescriptions.append(db_prescription)
+
+            shard_db.add_all(db_prescriptions)
+            RollupService.apply_prescriptions(shard_db, db_prescriptions)
+            shard_db.flush()
+
+            for db_prescription in db_prescriptions:
+                if shard_for_id(db_prescription.prescription_id) != shard_id:
+                    raise RuntimeError(
+                        f"Prescription ID {db_prescription.prescription_id} is outside the ID range of shard {shard_id}"
+                    )
+
+            ChangeFeedService.record_created(shard_db, db_prescriptions)
+
+            stored = []
+            if any(key is not None for key in idempotency_keys):
+                for prescription, db_prescription, key in zip(prescriptions, db_prescriptions, idempotency_keys):
+                    if key is None:
+                        continue
+                    stored.append((key, IdempotencyService.record(
+                        shard_db,
+                        key,
+                        IdempotencyService.hash_request(prescription),
+                        db_prescription
+                    )))
+
+            shard_db.commit()
+
+        change_notifier.notify()
+
+        for key, entry in stored:
+            idempotency_cache.put(key, entry)
+
+        return db_prescriptions
+
+    @staticmethod
+    def validate_appointments(prescriptions: List[PrescriptionCreate]):
+        """
+        Verify that every prescription refers to an existing appointment
+
+        Raises:
+            ValueError: If an appointment doesn't exist
+            AppointmentServiceUnavailableError: If appointments cannot be validated
+        """
+        results = appointment_validator.validate_many(
+            prescription.appointment_id for prescription in prescriptions
+        )
+        missing = [appointment_id for appointment_id, exists in results.items() if not exists]
+        if missing:
+            raise ValueError(f"Appointment not found: {', '.join(missing)}")
+
     @staticmethod
     def get_prescription(db: Session, prescription_id: int) -> Optional[Prescription]:
         """
@@ -54,11 +177,32 @@ class PrescriptionService:
             prescription_id: Prescription ID
 
         Returns:
-            Prescription if found, None otherwise
+            Prescription if found (including archived prescriptions), None otherwise
         """
-        return db.query(Prescription).filter(
-            Prescription.prescription_id == prescription_id
-        ).first()
+        shard_id = shard_for_id(prescription_id)
+
+        # Resharding moves prescriptions without changing their IDs; follow the shards they were moved to
+        for _ in range(SHARD_COUNT):
+            if not 0 <= shard_id < SHARD_COUNT:
+                return None
+
+            with shard_session(db, shard_id) as shard_db:
+                prescription = shard_db.query(Prescription).filter(
+                    Prescription.prescription_id == prescription_id
+                ).first()
+
+                if prescription is None:
+                    prescription = ArchiveService.get_archived_prescription(shard_db, prescription_id)
+                if prescription is not None:
+                    return prescription
+
+                relocated = shard_db.get(RelocatedPrescription, prescription_id)
+
+            if relocated is None:
+                return None
+            shard_id = relocated.shard_id
+
+        return None
 
     @staticmethod
     def get_prescriptions(
@@ -67,10 +211,17 @@ class PrescriptionService:
         limit: int = 100,
         patient_id: Optional[int] = None,
         doctor_id: Optional[int] = None,
-        appointment_id: Optional[str] = None
+        appointment_id: Optional[str] = None,
+        medication: Optional[str] = None,
+        after_id: Optional[int] = None
     ) -> tuple[List[Prescription], int]:
         """
-        Get prescriptions with optional filters
+        Get prescriptions with optional filters, in prescription ID order
+
+        A patient filter reads only that patient's shard; otherwise every
+        shard returns its first `skip + limit` matches after `after_id` and
+        the pages are merged. Deep pages should pass the last ID of the
+        previous page as `after_id` rather than a large `skip`.
 
         Args:
             db: Database session
@@ -79,23 +230,63 @@ class PrescriptionService:
             patient_id: Filter by patient ID
             doctor_id: Filter by doctor ID
             appointment_id: Filter by appointment ID
+            medication: Filter by medication name
+            after_id: Only return prescriptions with a greater ID (the total still counts all matches)
 
         Returns:
             Tuple of (list of prescriptions, total count)
         """
-        query = db.query(Prescription)
+        filters = []
 
         if patient_id is not None:
-            query = query.filter(Prescription.patient_id == patient_id)
+            filters.append(Prescription.patient_id == patient_id)
 
         if doctor_id is not None:
-            query = query.filter(Prescription.doctor_id == doctor_id)
+            filters.append(Prescription.doctor_id == doctor_id)
 
         if appointment_id is not None:
-            query = query.filter(Prescription.appointment_id == appointment_id)
+            filters.append(Prescription.appointment_id == appointment_id)
+
+        if medication is not None:
+            with shard_session(db, HOME_SHARD) as home_db:
+                medication_id = MedicationService.resolve_id(home_db, medication)
+            if medication_id is None:
+                return [], 0
+            filters.append(Prescription.medication_id == medication_id)
+
+        if patient_id is not None or SHARD_COUNT == 1:
+            shard_id = HOME_SHARD if patient_id is None else shard_for_patient(patient_id)
+            with shard_session(db, shard_id) as shard_db:
+                return PrescriptionService._query_page(shard_db, filters, skip, limit, after_id)
+
+        pages = scatter(
+            db,
+            lambda shard_db: PrescriptionService._query_page(shard_db, filters, 0, skip + limit, after_id)
+        )
+        merged = heapq.merge(
+            *[prescriptions for prescriptions, _ in pages],
+            key=lambda prescription: prescription.prescription_id
+        )
+        prescriptions = list(merged)[skip:skip + limit]
+        total = sum(count for _, count in pages)
+
+        return prescriptions, total
+
+    @staticmethod
+    def _query_page(
+        db: Session,
+        filters: list,
+        skip: int,
+        limit: int,
+        after_id: Optional[int] = None
+    ) -> tuple[List[Prescription], int]:
+        """Read one page of matching prescriptions and the number of matches from one shard"""
+        query = db.query(Prescription).filter(*filters)
 
         total = query.count()
-        prescriptions = query.offset(skip).limit(limit).all()
+        if after_id is not None:
+            query = query.filter(Prescription.prescription_id > after_id)
+        prescriptions = query.order_by(Prescription.prescription_id).offset(skip).limit(limit).all()
 
         return prescriptions, total
 
@@ -104,14 +295,16 @@ class PrescriptionService:
         db: Session,
         patient_id: int,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        after_id: Optional[int] = None
     ) -> tuple[List[Prescription], int]:
         """Get all prescriptions for a specific patient"""
         return PrescriptionService.get_prescriptions(
             db=db,
             skip=skip,
             limit=limit,
-            patient_id=patient_id
+            patient_id=patient_id,
+            after_id=after_id
         )
 
     @staticmethod
@@ -119,14 +312,16 @@ class PrescriptionService:
         db: Session,
         doctor_id: int,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        after_id: Optional[int] = None
     ) -> tuple[List[Prescription], int]:
         """Get all prescriptions issued by a specific doctor"""
         return PrescriptionService.get_prescriptions(
             db=db,
             skip=skip,
             limit=limit,
-            doctor_id=doctor_id
+            doctor_id=doctor_id,
+            after_id=after_id
         )
 
     @staticmethod
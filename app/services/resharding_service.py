@@ -0,0 +1,145 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from typing import List
+from collections import defaultdict
+from datetime import datetime
+
+from app.database import HOME_SHARD, session_shard, shard_for_patient, shard_session
+from app.models.idempotency import IdempotencyKey
+from app.models.prescription import Prescription
+from app.models.relocation import RelocatedPrescription
+from app.services.medication_service import MedicationService
+
+PRESCRIPTION_COLUMNS = [getattr(Prescription, column.name) for column in Prescription.__table__.columns]
+IDEMPOTENCY_KEY_COLUMNS = [getattr(IdempotencyKey, column.name) for column in IdempotencyKey.__table__.columns]
+
+
+class ReshardingService:
+    """
+    Service layer for moving prescriptions onto their patient's shard
+
+    Needed when sharding is enabled on an existing database, whose
+    prescriptions all start out on the home shard, and when shards are
+    added later. Prescriptions keep their IDs; the shard they leave records
+    where each one went, so ID lookups can follow it.
+    """
+
+    @staticmethod
+    def relocate_prescriptions(db: Session, chunk_size: int = 5000) -> int:
+        """
+        Move the prescriptions on the shard of `db` whose patient belongs on another shard
+
+        The shard is scanned in prescription ID order, `chunk_size` rows at a
+        time. Misplaced rows are copied to their patient's shard and
+        committed there first; then they are deleted from this shard in the
+        transaction that records their new shard. A run that is interrupted
+        can simply be repeated. Idempotency keys of moved prescriptions are
+        moved afterwards. Archived prescriptions, change log entries and
+        rollups stay where they are; rebuild the rollups afterwards.
+
+        Args:
+            db: Session on the shard to move prescriptions off
+            chunk_size: Prescriptions read per chunk
+
+        Returns:
+            Number of prescriptions moved
+        """
+        source_shard = session_shard(db)
+        moved = 0
+        last_id = None
+
+        while True:
+            query = db.query(*PRESCRIPTION_COLUMNS)
+            if last_id is not None:
+                query = query.filter(Prescription.prescription_id > last_id)
+            chunk = query.order_by(Prescription.prescription_id).limit(chunk_size).all()
+            if not chunk:
+                break
+            last_id = chunk[-1].prescription_id
+
+            misplaced = defaultdict(list)
+            for row in chunk:
+                shard_id = shard_for_patient(row.patient_id)
+                if shard_id != source_shard:
+                    misplaced[shard_id].append(row)
+
+            for shard_id, rows in misplaced.items():
+                ReshardingService._move_prescriptions(db, shard_id, rows)
+                moved += len(rows)
+
+        ReshardingService._move_idempotency_keys(db, chunk_size)
+        return moved
+
+    @staticmethod
+    def _move_prescriptions(db: Session, shard_id: int, rows: List):
+        """Copy prescription rows to a shard, then delete them from the shard of `db`"""
+        ids = [row.prescription_id for row in rows]
+
+        with shard_session(db, HOME_SHARD) as home_db, shard_session(db, shard_id) as shard_db:
+            if shard_db is not home_db:
+                MedicationService.replicate(home_db, shard_db, {row.medication_id for row in rows})
+
+            # Copied by an earlier, interrupted run
+            present = {
+                prescription_id for (prescription_id,) in shard_db.query(Prescription.prescription_id).filter(
+                    Prescription.prescription_id.in_(ids)
+                )
+            }
+            missing = [dict(row._mapping) for row in rows if row.prescription_id not in present]
+            if missing:
+                shard_db.execute(insert(Prescription), missing)
+            # Prescriptions that come back to a shard they were moved off live here again
+            shard_db.query(RelocatedPrescription).filter(
+                RelocatedPrescription.prescription_id.in_(ids)
+            ).delete(synchronize_session=False)
+            shard_db.commit()
+
+        now = datetime.utcnow()
+        db.query(RelocatedPrescription).filter(
+            RelocatedPrescription.prescription_id.in_(ids)
+        ).delete(synchronize_session=False)
+        db.execute(insert(RelocatedPrescription), [
+            {"prescription_id": prescription_id, "shard_id": shard_id, "relocated_at": now}
+            for prescription_id in ids
+        ])
+        db.query(Prescription).filter(Prescription.prescription_id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+
+    @staticmethod
+    def _move_idempotency_keys(db: Session, chunk_size: int) -> int:
+        """Move the idempotency keys of relocated prescriptions to the prescriptions' new shard"""
+        moved = 0
+
+        while True:
+            chunk = db.query(*IDEMPOTENCY_KEY_COLUMNS, RelocatedPrescription.shard_id).join(
+                RelocatedPrescription,
+                RelocatedPrescription.prescription_id == IdempotencyKey.prescription_id
+            ).order_by(IdempotencyKey.idempotency_key).limit(chunk_size).all()
+            if not chunk:
+                break
+
+            by_shard = defaultdict(list)
+            for row in chunk:
+                by_shard[row.shard_id].append({
+                    column.key: getattr(row, column.key) for column in IDEMPOTENCY_KEY_COLUMNS
+                })
+
+            for shard_id, keys in by_shard.items():
+                with shard_session(db, shard_id) as shard_db:
+                    present = {
+                        key for (key,) in shard_db.query(IdempotencyKey.idempotency_key).filter(
+                            IdempotencyKey.idempotency_key.in_([key["idempotency_key"] for key in keys])
+                        )
+                    }
+                    missing = [key for key in keys if key["idempotency_key"] not in present]
+                    if missing:
+                        shard_db.execute(insert(IdempotencyKey), missing)
+                    shard_db.commit()
+
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.idempotency_key.in_([row.idempotency_key for row in chunk])
+            ).delete(synchronize_session=False)
+            db.commit()
+            moved += len(chunk)
+
+        return moved
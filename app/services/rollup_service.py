@@ -0,0 +1,316 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, Date, delete, insert, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from typing import Iterable, List, Optional
+from datetime import date, datetime
+from collections import defaultdict
+
+from app.database import scatter
+from app.models.archive import ArchivedPartition
+from app.models.prescription import Prescription
+from app.models.rollup import (
+    DoctorDailyRollup,
+    MedicationDailyRollup,
+    DoctorDailyRollupRebuild,
+    MedicationDailyRollupRebuild
+)
+from app.services.partition_service import add_months
+
+# Live rollup table, the staging table a rebuild fills, and the key column besides the day
+REBUILD_TABLES = (
+    (DoctorDailyRollup, DoctorDailyRollupRebuild, "doctor_id"),
+    (MedicationDailyRollup, MedicationDailyRollupRebuild, "medication_id"),
+)
+
+
+def _dialect(db: Session) -> str:
+    """Name of the database dialect, which picks the upsert statement"""
+    return db.get_bind().dialect.name
+
+
+def _merge_daily(pages: List[list], key_columns: tuple) -> list:
+    """Sum the rollup rows read from each shard, keeping the order of the key columns"""
+    if len(pages) == 1:
+        return pages[0]
+
+    merged = {}
+    for rows in pages:
+        for row in rows:
+            key = tuple(getattr(row, column) for column in key_columns)
+            total = merged.get(key)
+            if total is None:
+                # Transient copy; never added to a session
+                total = merged[key] = type(row)(
+                    **{column: getattr(row, column) for column in key_columns},
+                    prescription_count=0,
+                    total_days=0
+                )
+                if hasattr(row, "medication_entry"):
+                    total.medication_entry = row.medication_entry
+            total.prescription_count += row.prescription_count
+            total.total_days += row.total_days
+
+    return [merged[key] for key in sorted(merged)]
+
+
+class RollupService:
+    """
+    Service layer for the dashboard rollup tables
+
+    Every shard keeps rollups of its own prescriptions; reads add them up
+    across shards.
+    """
+
+    @staticmethod
+    def _increment(db: Session, model, deltas: dict, key_columns: tuple):
+        """
+        Add count deltas to rollup rows, inserting rows that don't exist yet
+
+        Args:
+            db: Database session
+            model: Rollup model class
+            deltas: Mapping of key tuple -> (prescription_count, total_days)
+            key_columns: Names of the key columns, in the order of the key tuples
+        """
+        if not deltas:
+            return
+
+        rows = [
+            {
+                **dict(zip(key_columns, key)),
+                "prescription_count": count,
+                "total_days": days,
+            }
+            for key, (count, days) in deltas.items()
+        ]
+
+        dialect = _dialect(db)
+        table = model.__table__
+
+        if dialect == "mysql":
+            stmt = mysql_insert(table).values(rows)
+            stmt = stmt.on_duplicate_key_update(
+                prescription_count=table.c.prescription_count + stmt.inserted.prescription_count,
+                total_days=table.c.total_days + stmt.inserted.total_days,
+            )
+            db.execute(stmt)
+        elif dialect == "sqlite":
+            stmt = sqlite_insert(table).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(key_columns),
+                set_={
+                    "prescription_count": table.c.prescription_count + stmt.excluded.prescription_count,
+                    "total_days": table.c.total_days + stmt.excluded.total_days,
+                },
+            )
+            db.execute(stmt)
+        else:
+            # Portable fallback: update in place, insert when nothing matched
+            for row in rows:
+                key_filter = [getattr(model, column) == row[column] for column in key_columns]
+                updated = db.query(model).filter(*key_filter).update(
+                    {
+                        model.prescription_count: model.prescription_count + row["prescription_count"],
+                        model.total_days: model.total_days + row["total_days"],
+                    },
+                    synchronize_session=False,
+                )
+                if not updated:
+                    db.add(model(**row))
+
+    @staticmethod
+    def apply_prescriptions(db: Session, prescriptions: Iterable[Prescription]):
+        """
+        Add prescriptions to the rollup tables.
+
+        Must be called in the same transaction that inserts the prescriptions;
+        the caller is responsible for committing.
+
+        Args:
+            db: Database session
+            prescriptions: Newly inserted prescriptions
+        """
+        doctor_deltas = defaultdict(lambda: [0, 0])
+        medication_deltas = defaultdict(lambda: [0, 0])
+
+        for prescription in prescriptions:
+            day = prescription.issued_at.date()
+
+            doctor_delta = doctor_deltas[(prescription.doctor_id, day)]
+            doctor_delta[0] += 1
+            doctor_delta[1] += prescription.days
+
+            medication_delta = medication_deltas[(prescription.medication_id, day)]
+            medication_delta[0] += 1
+            medication_delta[1] += prescription.days
+
+        RollupService._increment(db, DoctorDailyRollup, doctor_deltas, ("doctor_id", "day"))
+        RollupService._increment(db, MedicationDailyRollup, medication_deltas, ("medication_id", "day"))
+
+    @staticmethod
+    def rebuild(db: Session, chunk_size: int = 5000) -> int:
+        """
+        Recompute the rollup tables from the prescriptions table.
+
+        Counts are aggregated into staging tables in primary-key ranges of
+        `chunk_size`, each chunk committed on its own, while the live tables
+        keep serving dashboards and taking increments; empty stretches of
+        the ID space are skipped. The staging tables then replace the live
+        ones in a single transaction. That transaction empties the live
+        tables first, so concurrent increments wait for it, and aggregates
+        the newest `chunk_size` IDs itself. Prescriptions created during the
+        rebuild, or still uncommitted when the chunks were read, are
+        therefore counted exactly once.
+
+        Months that have been archived are no longer in the prescriptions
+        table, so rollup rows for days before the end of the newest archived
+        month are kept as they are, and prescriptions issued on those days
+        are not aggregated again.
+
+        Args:
+            db: Database session
+            chunk_size: Number of prescription IDs aggregated per chunk
+
+        Returns:
+            Number of prescriptions processed
+        """
+        for _, staging, _ in REBUILD_TABLES:
+            db.execute(delete(staging))
+        db.commit()
+
+        kept_before = RollupService._archived_until(db)
+
+        min_id, max_id = db.query(
+            func.min(Prescription.prescription_id),
+            func.max(Prescription.prescription_id)
+        ).one()
+
+        processed = 0
+        cutoff = None
+        if max_id is not None:
+            cutoff = max_id - chunk_size
+            # IDs of other shards start far from zero
+            lower = min_id - 1
+            while lower < cutoff:
+                # Skip gaps, such as between resharded legacy IDs and this shard's own range
+                next_id = db.query(func.min(Prescription.prescription_id)).filter(
+                    Prescription.prescription_id > lower
+                ).scalar()
+                lower = max(lower, next_id - 1)
+                if lower >= cutoff:
+                    break
+                upper = min(lower + chunk_size, cutoff)
+                processed += RollupService._aggregate_into_staging(db, lower, upper, kept_before)
+                db.commit()
+                lower = upper
+
+        for live, _, _ in REBUILD_TABLES:
+            if kept_before is None:
+                db.execute(delete(live))
+            else:
+                db.execute(delete(live).where(live.day >= kept_before))
+        processed += RollupService._aggregate_into_staging(db, cutoff, None, kept_before)
+        for live, staging, key_column in REBUILD_TABLES:
+            columns = [key_column, "day", "prescription_count", "total_days"]
+            db.execute(insert(live).from_select(columns, select(*[getattr(staging, column) for column in columns])))
+            db.execute(delete(staging))
+        db.commit()
+
+        return processed
+
+    @staticmethod
+    def _archived_until(db: Session) -> Optional[date]:
+        """First day after the newest archived month, or None if nothing has been archived"""
+        newest = db.query(func.max(ArchivedPartition.period_start)).scalar()
+        return add_months(newest, 1) if newest is not None else None
+
+    @staticmethod
+    def _aggregate_into_staging(
+        db: Session,
+        lower: Optional[int],
+        upper: Optional[int],
+        kept_before: Optional[date] = None
+    ) -> int:
+        """
+        Add the prescriptions with `lower < prescription_id <= upper` to the staging tables
+
+        Prescriptions issued before `kept_before` are skipped.
+
+        Returns:
+            Number of prescriptions aggregated
+        """
+        id_range = []
+        if lower is not None:
+            id_range.append(Prescription.prescription_id > lower)
+        if upper is not None:
+            id_range.append(Prescription.prescription_id <= upper)
+        if kept_before is not None:
+            id_range.append(Prescription.issued_at >= datetime.combine(kept_before, datetime.min.time()))
+
+        day_column = func.date(Prescription.issued_at, type_=Date)
+        processed = 0
+        for _, staging, key_column in REBUILD_TABLES:
+            key = getattr(Prescription, key_column)
+            rows = db.query(
+                key,
+                day_column,
+                func.count(),
+                func.sum(Prescription.days),
+            ).filter(*id_range).group_by(key, day_column).all()
+
+            RollupService._increment(
+                db,
+                staging,
+                {(key_value, day): (count, days) for key_value, day, count, days in rows},
+                (key_column, "day"),
+            )
+            processed = sum(row[2] for row in rows)
+
+        return processed
+
+    @staticmethod
+    def get_doctor_daily(
+        db: Session,
+        doctor_id: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> List[DoctorDailyRollup]:
+        """Get daily prescription counts for a doctor, oldest first"""
+        filters = [DoctorDailyRollup.doctor_id == doctor_id]
+
+        if start is not None:
+            filters.append(DoctorDailyRollup.day >= start)
+
+        if end is not None:
+            filters.append(DoctorDailyRollup.day <= end)
+
+        pages = scatter(db, lambda shard_db: shard_db.query(DoctorDailyRollup).filter(*filters).order_by(
+            DoctorDailyRollup.day
+        ).all())
+        return _merge_daily(pages, ("day", "doctor_id"))
+
+    @staticmethod
+    def get_medication_daily(
+        db: Session,
+        medication_id: Optional[int] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> List[MedicationDailyRollup]:
+        """Get daily prescription counts per medication, oldest first"""
+        filters = []
+
+        if medication_id is not None:
+            filters.append(MedicationDailyRollup.medication_id == medication_id)
+
+        if start is not None:
+            filters.append(MedicationDailyRollup.day >= start)
+
+        if end is not None:
+            filters.append(MedicationDailyRollup.day <= end)
+
+        pages = scatter(db, lambda shard_db: shard_db.query(MedicationDailyRollup).filter(*filters).order_by(
+            MedicationDailyRollup.day,
+            MedicationDailyRollup.medication_id
+        ).all())
+        return _merge_daily(pages, ("day", "medication_id"))
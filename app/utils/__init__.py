@@ -1,4 +1,16 @@
 from app.utils.db_init import setup_database, init_db, seed_prescriptions
+from app.utils.rollups import rebuild_rollups
+from app.utils.medications import report_medication_savings
+from app.utils.idempotency import purge_expired_idempotency_keys
+from app.utils.partitions import maintain_partitions, archive_prescriptions
 
-__all__ = ["setup_database", "init_db", "seed_prescriptions"]
-
+__all__ = [
+    "setup_database",
+    "init_db",
+    "seed_prescriptions",
+    "rebuild_rollups",
+    "report_medication_savings",
+    "purge_expired_idempotency_keys",
+    "maintain_partitions",
+    "archive_prescriptions"
+]
@@ -4,8 +4,11 @@ from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
-from app.database import engine, Base
+from app.database import Base, HOME_SHARD, scatter, shard_engines, shard_for_patient, shard_id_base, shard_session
 from app.models.prescription import Prescription
+from app.models.change_log import PrescriptionChange
+from app.services.rollup_service import RollupService
+from app.services.medication_service import MedicationService, medication_name_key
 from app.config import get_settings
 
 settings = get_settings()
@@ -17,28 +20,61 @@ def wait_for_db(max_retries: int = 30, delay: int = 2):
     from sqlalchemy import create_engine
     from sqlalchemy.exc import OperationalError
 
-    retries = 0
-    while retries < max_retries:
-        try:
-            print(f"Connecting to database at {settings.database_url}...")
-            test_engine = create_engine(settings.database_url)
-            with test_engine.connect() as conn:
-                conn.execute(text("SELECT 1"))
-            print("✓ Database is ready")
-            test_engine.dispose()
-            return True
-        except OperationalError:
-            retries += 1
-            print(f"Waiting for database... ({retries}/{max_retries})")
-            time.sleep(delay)
+    for database_url in settings.shard_urls:
+        retries = 0
+        while True:
+            try:
+                print(f"Connecting to database at {database_url}...")
+                test_engine = create_engine(database_url)
+                with test_engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                print("✓ Database is ready")
+                test_engine.dispose()
+                break
+            except OperationalError:
+                retries += 1
+                if retries >= max_retries:
+                    raise Exception("Database is not available")
+                print(f"Waiting for database... ({retries}/{max_retries})")
+                time.sleep(delay)
+
+    return True
+
+
+def reserve_id_range(shard_engine, shard_id: int):
+    """Start a shard's prescription and change ID sequences at the beginning of its ID range"""
+    base = shard_id_base(shard_id)
+    if base == 0:
+        return
 
-    raise Exception("Database is not available")
+    dialect = shard_engine.dialect.name
+    with shard_engine.begin() as conn:
+        for table in (Prescription.__tablename__, PrescriptionChange.__tablename__):
+            if dialect == "mysql":
+                next_id = conn.execute(text(
+                    "SELECT AUTO_INCREMENT FROM information_schema.TABLES "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+                ), {"table": table}).scalar()
+                if next_id is None or next_id <= base:
+                    conn.execute(text(f"ALTER TABLE {table} AUTO_INCREMENT = {base + 1}"))
+            elif dialect == "sqlite":
+                conn.execute(text(
+                    "UPDATE sqlite_sequence SET seq = :base WHERE name = :table AND seq < :base"
+                ), {"table": table, "base": base})
+                conn.execute(text(
+                    "INSERT INTO sqlite_sequence (name, seq) SELECT :table, :base "
+                    "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :table)"
+                ), {"table": table, "base": base})
+            else:
+                raise Exception(f"Sharding is not supported on {dialect}")
 
 
 def init_db():
-    """Initialize database schema"""
+    """Initialize database schema on every shard"""
     print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    for shard_id, shard_engine in enumerate(shard_engines):
+        Base.metadata.create_all(bind=shard_engine)
+        reserve_id_range(shard_engine, shard_id)
     print("✓ Database tables created")
 
 
@@ -46,6 +82,9 @@ def seed_prescriptions(db: Session, csv_file_path: str):
     """
     Seed prescription data from CSV file
 
+    Rows are written to their patient's shard. Only the home shard keeps the
+    IDs from the file; other shards allocate IDs from their own range.
+
     Args:
         db: Database session
         csv_file_path: Path to CSV file containing prescription data
@@ -57,37 +96,48 @@ def seed_prescriptions(db: Session, csv_file_path: str):
     print(f"Seeding prescriptions from {csv_file_path}...")
 
     # Check if data already exists
-    existing_count = db.query(Prescription).count()
+    existing_count = sum(scatter(db, lambda shard_db: shard_db.query(Prescription).count()))
     if existing_count > 0:
         print(f"⚠ Database already contains {existing_count} prescriptions. Skipping seed.")
         return
 
-    prescriptions = []
+    prescriptions_by_shard = {}
 
     with open(csv_file_path, 'r', encoding='utf-8') as file:
-        csv_reader = csv.DictReader(file)
-
-        for row in csv_reader:
-            # Parse datetime
-            issued_at = datetime.strptime(row['issued_at'], '%Y-%m-%d %H:%M:%S')
-
-            prescription = Prescription(
-                prescription_id=int(row['prescription_id']),
-                appointment_id=str(row['appointment_id']),
-                patient_id=int(row['patient_id']),
-                doctor_id=int(row['doctor_id']),
-                medication=row['medication'],
-                dosage=row['dosage'],
-                days=int(row['days']),
-                issued_at=issued_at
-            )
-            prescriptions.append(prescription)
-
-    # Bulk insert
-    db.bulk_save_objects(prescriptions)
-    db.commit()
-
-    print(f"✓ Seeded {len(prescriptions)} prescriptions")
+        rows = list(csv.DictReader(file))
+
+    # Normalize medication names into the medications dictionary
+    with shard_session(db, HOME_SHARD) as home_db:
+        medication_ids = MedicationService.get_or_create_many(home_db, [row['medication'] for row in rows])
+        home_db.commit()
+
+    for row in rows:
+        # Parse datetime
+        issued_at = datetime.strptime(row['issued_at'], '%Y-%m-%d %H:%M:%S')
+        shard_id = shard_for_patient(int(row['patient_id']))
+
+        prescription = Prescription(
+            prescription_id=int(row['prescription_id']) if shard_id == HOME_SHARD else None,
+            appointment_id=str(row['appointment_id']),
+            patient_id=int(row['patient_id']),
+            doctor_id=int(row['doctor_id']),
+            medication_id=medication_ids[medication_name_key(row['medication'])],
+            dosage=row['dosage'],
+            days=int(row['days']),
+            issued_at=issued_at
+        )
+        prescriptions_by_shard.setdefault(shard_id, []).append(prescription)
+
+    # Bulk insert, with the dashboard rollups in the same transaction
+    for shard_id, prescriptions in prescriptions_by_shard.items():
+        with shard_session(db, HOME_SHARD) as home_db, shard_session(db, shard_id) as shard_db:
+            if shard_db is not home_db:
+                MedicationService.replicate(home_db, shard_db, {prescription.medication_id for prescription in prescriptions})
+            shard_db.bulk_save_objects(prescriptions)
+            RollupService.apply_prescriptions(shard_db, prescriptions)
+            shard_db.commit()
+
+    print(f"✓ Seeded {sum(len(prescriptions) for prescriptions in prescriptions_by_shard.values())} prescriptions")
 
 
 def setup_database():
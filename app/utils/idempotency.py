@@ -0,0 +1,37 @@
+import asyncio
+
+from app.database import shard_sessions
+from app.services.idempotency_service import IdempotencyService
+from app.utils.logger import setup_logger
+from app.config import get_settings
+
+settings = get_settings()
+logger = setup_logger(__name__)
+
+
+def purge_expired_idempotency_keys() -> int:
+    """Delete expired idempotency keys on every shard in chunks of IDEMPOTENCY_PURGE_CHUNK_SIZE"""
+    deleted = 0
+    for make_session in shard_sessions:
+        db = make_session()
+        try:
+            deleted += IdempotencyService.purge_expired(db, chunk_size=settings.IDEMPOTENCY_PURGE_CHUNK_SIZE)
+        finally:
+            db.close()
+    return deleted
+
+
+async def purge_idempotency_keys_periodically():
+    """Background task purging expired idempotency keys every IDEMPOTENCY_PURGE_INTERVAL_SECONDS"""
+    while True:
+        await asyncio.sleep(settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS)
+        try:
+            deleted = await asyncio.to_thread(purge_expired_idempotency_keys)
+            if deleted:
+                logger.info(f"Purged {deleted} expired idempotency keys")
+        except Exception as e:
+            logger.error(f"Failed to purge expired idempotency keys: {str(e)}")
+
+
+if __name__ == "__main__":
+    print(f"✓ Purged {purge_expired_idempotency_keys()} expired idempotency keys")
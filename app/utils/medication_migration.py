@@ -0,0 +1,148 @@
+import argparse
+from typing import Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from app.database import Base, HOME_SHARD, shard_sessions
+from app.models.prescription import Prescription
+from app.models.rollup import MedicationDailyRollup
+from app.services.medication_service import MedicationService, medication_name_key
+from app.services.rollup_service import RollupService
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def _columns(db: Session, table: str) -> set:
+    """Column names of a table as currently stored in the database"""
+    return {column["name"] for column in inspect(db.get_bind()).get_columns(table)}
+
+
+def migrate_shard(home_db: Session, shard_db: Session, chunk_size: int = 5000) -> int:
+    """
+    Move one shard's prescriptions from the `medication` name column to `medication_id`
+
+    Each step checks the current schema first, so an interrupted migration
+    can simply be run again:
+
+    1. add a nullable `medication_id` column
+    2. backfill it one medication name at a time, in chunks of `chunk_size`
+       rows, creating dictionary entries on the home shard
+    3. make it NOT NULL with an index and foreign key (MySQL), then drop
+       `medication`
+    4. recreate the name-keyed medication rollup and rebuild the rollups
+
+    Args:
+        home_db: Session on the home shard, which owns the medications dictionary
+        shard_db: Session on the shard to migrate (may be `home_db`)
+        chunk_size: Rows updated per transaction
+
+    Returns:
+        Number of prescriptions backfilled
+    """
+    table = Prescription.__tablename__
+    dialect = shard_db.get_bind().dialect.name
+
+    # Creates the medications and staging tables; existing tables are left alone
+    Base.metadata.create_all(bind=shard_db.get_bind())
+
+    columns = _columns(shard_db, table)
+    if "medication" not in columns:
+        return 0
+
+    if "medication_id" not in columns:
+        shard_db.execute(text(f"ALTER TABLE {table} ADD COLUMN medication_id INTEGER NULL"))
+        shard_db.commit()
+
+    names = [
+        name for (name,) in shard_db.execute(text(
+            f"SELECT DISTINCT medication FROM {table} WHERE medication_id IS NULL"
+        ))
+    ]
+    medication_ids = MedicationService.get_or_create_many(home_db, names)
+    home_db.commit()
+    if shard_db is not home_db:
+        MedicationService.replicate(home_db, shard_db, medication_ids.values())
+        shard_db.commit()
+
+    backfilled = 0
+    for name in names:
+        medication_id = medication_ids[medication_name_key(name)]
+        while True:
+            # MySQL cannot LIMIT an UPDATE with a subquery on the same table, SQLite cannot LIMIT an UPDATE
+            ids = [
+                prescription_id for (prescription_id,) in shard_db.execute(text(
+                    f"SELECT prescription_id FROM {table} "
+                    f"WHERE medication = :name AND medication_id IS NULL LIMIT {int(chunk_size)}"
+                ), {"name": name})
+            ]
+            if not ids:
+                break
+            shard_db.execute(
+                text(f"UPDATE {table} SET medication_id = :medication_id WHERE prescription_id = :prescription_id"),
+                [{"medication_id": medication_id, "prescription_id": prescription_id} for prescription_id in ids]
+            )
+            shard_db.commit()
+            backfilled += len(ids)
+
+    if dialect == "mysql":
+        shard_db.execute(text(
+            f"ALTER TABLE {table} "
+            f"MODIFY medication_id INTEGER NOT NULL, "
+            f"ADD INDEX ix_{table}_medication_id (medication_id), "
+            f"ADD CONSTRAINT fk_{table}_medication_id FOREIGN KEY (medication_id) "
+            f"REFERENCES medications (medication_id), "
+            f"DROP COLUMN medication"
+        ))
+    else:
+        # SQLite cannot add NOT NULL or foreign key constraints to an existing column
+        shard_db.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_medication_id ON {table} (medication_id)"))
+        shard_db.execute(text(f"ALTER TABLE {table} DROP COLUMN medication"))
+    shard_db.commit()
+
+    if "medication" in _columns(shard_db, MedicationDailyRollup.__tablename__):
+        MedicationDailyRollup.__table__.drop(bind=shard_db.get_bind())
+        MedicationDailyRollup.__table__.create(bind=shard_db.get_bind())
+    RollupService.rebuild(shard_db, chunk_size=chunk_size)
+
+    return backfilled
+
+
+def migrate_medications(chunk_size: Optional[int] = None) -> int:
+    """
+    Migrate every shard from medication names to the medications dictionary
+
+    Args:
+        chunk_size: Rows updated per transaction (defaults to ROLLUP_REBUILD_CHUNK_SIZE)
+
+    Returns:
+        Number of prescriptions backfilled
+    """
+    chunk_size = chunk_size or settings.ROLLUP_REBUILD_CHUNK_SIZE
+
+    print("Migrating prescriptions.medication to medication_id...")
+    backfilled = 0
+    home_db = shard_sessions[HOME_SHARD]()
+    try:
+        # The home shard first, so its dictionary exists before other shards copy from it
+        for shard_id, make_session in enumerate(shard_sessions):
+            shard_db = home_db if shard_id == HOME_SHARD else make_session()
+            try:
+                backfilled += migrate_shard(home_db, shard_db, chunk_size=chunk_size)
+            finally:
+                if shard_db is not home_db:
+                    shard_db.close()
+    finally:
+        home_db.close()
+
+    print(f"✓ Backfilled medication_id for {backfilled} prescriptions")
+    return backfilled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate prescriptions to the medications dictionary")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Rows updated per transaction")
+    args = parser.parse_args()
+
+    migrate_medications(chunk_size=args.chunk_size)
@@ -0,0 +1,138 @@
+import time
+
+from sqlalchemy import func, text
+
+from app.database import HOME_SHARD, shard_sessions
+from app.models.medication import Medication
+from app.models.prescription import Prescription
+
+# Bytes used by the integer medication_id, and the VARCHAR length prefix it replaces
+INTEGER_BYTES = 4
+VARCHAR_PREFIX_BYTES = 1
+
+# Temporary table holding each prescription's medication name, as the old column did
+LEGACY_NAMES_TABLE = "legacy_medication_names"
+
+
+def _time_query(query, iterations: int) -> float:
+    """Average wall time of running a query, in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        query()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def _create_legacy_names(db):
+    """Copy the names back into an indexed VARCHAR column on a temporary table"""
+    if db.get_bind().dialect.name == "mysql":
+        db.execute(text(
+            f"CREATE TEMPORARY TABLE {LEGACY_NAMES_TABLE} "
+            f"(INDEX ix_{LEGACY_NAMES_TABLE}_medication (medication)) "
+            f"SELECT p.prescription_id, CAST(m.name AS CHAR(255)) AS medication "
+            f"FROM prescriptions p JOIN medications m ON m.medication_id = p.medication_id"
+        ))
+    else:
+        db.execute(text(
+            f"CREATE TEMPORARY TABLE {LEGACY_NAMES_TABLE} AS "
+            f"SELECT p.prescription_id, m.name AS medication "
+            f"FROM prescriptions p JOIN medications m ON m.medication_id = p.medication_id"
+        ))
+        db.execute(text(
+            f"CREATE INDEX ix_{LEGACY_NAMES_TABLE}_medication ON {LEGACY_NAMES_TABLE} (medication)"
+        ))
+
+
+def _measure_shard(db, iterations: int) -> dict:
+    """Row storage figures and filter timings of one shard"""
+    prescription_count = db.query(func.count(Prescription.prescription_id)).scalar()
+    medication_count = db.query(func.count(Medication.medication_id)).scalar()
+
+    # Total bytes of medication names as they would be repeated on every prescription
+    repeated_name_bytes = db.query(
+        func.coalesce(func.sum(func.length(Medication.name) + VARCHAR_PREFIX_BYTES), 0)
+    ).select_from(Prescription).join(Prescription.medication_entry).scalar()
+
+    dictionary_bytes = db.query(
+        func.coalesce(func.sum(func.length(Medication.name) * 2 + VARCHAR_PREFIX_BYTES * 2 + INTEGER_BYTES), 0)
+    ).scalar()
+
+    sample = db.query(Medication).order_by(Medication.medication_id).first()
+    integer_ms = name_ms = None
+    if sample is not None:
+        _create_legacy_names(db)
+        try:
+            integer_ms = _time_query(
+                db.query(Prescription.prescription_id).filter(Prescription.medication_id == sample.medication_id).all,
+                iterations
+            )
+            name_ms = _time_query(
+                lambda: db.execute(
+                    text(f"SELECT prescription_id FROM {LEGACY_NAMES_TABLE} WHERE medication = :name"),
+                    {"name": sample.name}
+                ).all(),
+                iterations
+            )
+        finally:
+            db.execute(text(f"DROP TABLE {LEGACY_NAMES_TABLE}"))
+
+    return {
+        "prescriptions": prescription_count,
+        "medications": medication_count,
+        "row_bytes_saved": repeated_name_bytes - prescription_count * INTEGER_BYTES - dictionary_bytes,
+        "integer_filter_ms": integer_ms,
+        "name_filter_ms": name_ms,
+    }
+
+
+def report_medication_savings(iterations: int = 50) -> dict:
+    """
+    Report storage and query-time savings of the medications dictionary on every shard
+
+    Row storage is estimated from the stored names: each prescription row
+    would otherwise carry the full VARCHAR name instead of a 4-byte integer,
+    and each shard pays for its own copy of the dictionary entries it uses.
+    Filter times compare the indexed medication_id against an indexed name
+    column rebuilt on a temporary table, so both are plain index lookups;
+    the reported times are the sums over the shards.
+
+    Args:
+        iterations: Number of runs used to time each filter query
+
+    Returns:
+        Dictionary with the reported figures
+    """
+    figures = []
+    for make_session in shard_sessions:
+        db = make_session()
+        try:
+            figures.append(_measure_shard(db, iterations))
+        finally:
+            db.rollback()
+            db.close()
+
+    prescription_count = sum(shard["prescriptions"] for shard in figures)
+    # The home shard owns the dictionary; the other shards hold copies of its entries
+    medication_count = figures[HOME_SHARD]["medications"]
+    row_bytes_saved = sum(shard["row_bytes_saved"] for shard in figures)
+    timed = [shard for shard in figures if shard["integer_filter_ms"] is not None]
+    integer_ms = sum(shard["integer_filter_ms"] for shard in timed) if timed else None
+    name_ms = sum(shard["name_filter_ms"] for shard in timed) if timed else None
+
+    report = {
+        "prescriptions": prescription_count,
+        "medications": medication_count,
+        "row_bytes_saved": int(row_bytes_saved),
+        "integer_filter_ms": integer_ms,
+        "name_filter_ms": name_ms,
+    }
+
+    print(f"Prescriptions: {prescription_count}, distinct medications: {medication_count}")
+    print(f"Estimated row storage saved: {report['row_bytes_saved']} bytes")
+    if integer_ms is not None:
+        print(f"Indexed filter by medication_id: {integer_ms:.3f} ms, by medication name: {name_ms:.3f} ms")
+
+    return report
+
+
+if __name__ == "__main__":
+    report_medication_savings()
@@ -0,0 +1,105 @@
+import argparse
+from datetime import date
+from typing import Optional
+
+from app.database import SessionLocal, shard_sessions
+from app.services.partition_service import PartitionService, add_months, month_start
+from app.services.archive_service import ArchiveService
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def maintain_partitions(months_ahead: Optional[int] = None) -> list:
+    """
+    Partition the prescriptions table of every shard by month and create partitions ahead of time
+
+    Args:
+        months_ahead: Future months that must have a partition (defaults to PARTITION_MONTHS_AHEAD)
+
+    Returns:
+        Names of the partitions that were created
+    """
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+
+    db = SessionLocal()
+    try:
+        if not PartitionService.is_supported(db):
+            print("⚠ Partitioning requires MySQL. Skipping.")
+            return []
+    finally:
+        db.close()
+
+    created = []
+    for make_session in shard_sessions:
+        db = make_session()
+        try:
+            created += PartitionService.ensure_partitions(db, months_ahead)
+            db.commit()
+        finally:
+            db.close()
+
+    if created:
+        print(f"✓ Created partitions: {', '.join(created)}")
+    else:
+        print(f"✓ Partitions already cover the next {months_ahead} months")
+    return created
+
+
+def archive_prescriptions(
+    retention_months: Optional[int] = None,
+    mode: Optional[str] = None
+) -> int:
+    """
+    Archive months of prescriptions older than the retention horizon on every shard
+
+    Args:
+        retention_months: Months kept in the prescriptions table (defaults to ARCHIVE_RETENTION_MONTHS)
+        mode: "table" or "file" (defaults to ARCHIVE_MODE)
+
+    Returns:
+        Number of prescriptions archived
+    """
+    retention_months = settings.ARCHIVE_RETENTION_MONTHS if retention_months is None else retention_months
+    mode = mode or settings.ARCHIVE_MODE
+    cutoff = add_months(month_start(date.today()), -retention_months)
+
+    print(f"Archiving prescriptions issued before {cutoff} ({mode})...")
+    archived = 0
+    for make_session in shard_sessions:
+        db = make_session()
+        try:
+            records = ArchiveService.archive_before(
+                db,
+                cutoff,
+                mode=mode,
+                archive_dir=settings.ARCHIVE_DIR,
+                chunk_size=settings.ARCHIVE_CHUNK_SIZE
+            )
+            archived += sum(record.row_count for record in records)
+            for record in records:
+                print(f"  {record.partition_name}: {record.row_count} prescriptions -> {record.location}")
+        finally:
+            db.close()
+
+    print(f"✓ Archived {archived} prescriptions")
+    return archived
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prescription partition maintenance and archival")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    maintain_parser = subparsers.add_parser("maintain", help="Create monthly partitions ahead of time")
+    maintain_parser.add_argument("--months-ahead", type=int, default=None)
+
+    archive_parser = subparsers.add_parser("archive", help="Archive months past the retention horizon")
+    archive_parser.add_argument("--retention-months", type=int, default=None)
+    archive_parser.add_argument("--mode", choices=["table", "file"], default=None)
+
+    args = parser.parse_args()
+
+    if args.command == "maintain":
+        maintain_partitions(months_ahead=args.months_ahead)
+    else:
+        archive_prescriptions(retention_months=args.retention_months, mode=args.mode)
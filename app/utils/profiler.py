@@ -0,0 +1,106 @@
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from app.utils.request_trace import RequestTrace, folded_stacks
+from app.config import get_settings
+
+settings = get_settings()
+
+# Distinct stacks kept in the aggregate profile; further new stacks are counted under one bucket
+MAX_STACKS = 10000
+OVERFLOW_STACK = "[other stacks]"
+
+
+def _fold(frame) -> str:
+    """Collapse a frame and its callers into `root;...;leaf`"""
+    names = []
+    while frame is not None:
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Opt-in wall-clock sampling profiler for a fraction of requests.
+
+    While a sampled request is running, a background thread captures the
+    stack of the thread handling it every `interval_ms`. Samples are kept
+    on the request's trace and in a process-wide aggregate, both as folded
+    stacks for flamegraph.pl or speedscope.
+
+    Async endpoints run on the event loop thread, so their samples also
+    include whatever else the loop is doing at the time.
+    """
+
+    def __init__(self, sample_rate: float, interval_ms: float):
+        self.sample_rate = sample_rate
+        self.interval_ms = interval_ms
+        self.aggregate: Counter = Counter()
+        self._lock = threading.Lock()
+        self._active = set()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def should_profile(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, trace: RequestTrace):
+        """Start sampling a request"""
+        with self._lock:
+            self._active.add(trace)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self, trace: RequestTrace):
+        """Stop sampling a request"""
+        with self._lock:
+            self._active.discard(trace)
+
+    def reset(self):
+        with self._lock:
+            self.aggregate.clear()
+
+    def folded(self) -> str:
+        """Aggregate profile in folded-stack format"""
+        with self._lock:
+            stacks = Counter(self.aggregate)
+        return folded_stacks(stacks)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                active = list(self._active)
+                if not active:
+                    self._wake.clear()
+            if not active:
+                self._wake.wait()
+                continue
+
+            frames = sys._current_frames()
+            for trace in active:
+                for thread_id in list(trace.threads):
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        self._add_sample(trace, _fold(frame))
+            del frames
+
+            time.sleep(self.interval_ms / 1000)
+
+    def _add_sample(self, trace: RequestTrace, stack: str):
+        trace.add_sample(stack)
+        with self._lock:
+            if stack not in self.aggregate and len(self.aggregate) >= MAX_STACKS:
+                stack = OVERFLOW_STACK
+            self.aggregate[stack] += 1
+
+
+profiler = SamplingProfiler(
+    sample_rate=settings.PROFILER_SAMPLE_RATE,
+    interval_ms=settings.PROFILER_INTERVAL_MS
+)
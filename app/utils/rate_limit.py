@@ -0,0 +1,292 @@
+import hashlib
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+
+from app.services.appointment_client import CircuitBreaker
+from app.utils.logger import setup_logger
+from app.config import get_settings
+
+try:
+    import redis
+except ImportError:  # Optional dependency; only needed for a shared store
+    redis = None
+
+settings = get_settings()
+logger = setup_logger(__name__)
+
+
+class TokenBucketStore(ABC):
+    """
+    Where the clients' token buckets are kept
+
+    Implementations take tokens atomically, so every process sharing a
+    store enforces one limit per client.
+    """
+
+    # Whether take() does I/O and must not run on the event loop
+    blocking = False
+
+    @abstractmethod
+    def take(self, key: str, cost: float, rate: float, burst: float) -> float:
+        """
+        Take tokens from a client's bucket
+
+        Args:
+            key: Client key
+            cost: Tokens to take
+            rate: Tokens refilled per second
+            burst: Bucket capacity; new buckets start full
+
+        Returns:
+            0 if the tokens were taken, otherwise the seconds until enough
+            tokens are available (nothing is taken)
+        """
+
+
+class LocalTokenBucketStore(TokenBucketStore):
+    """In-process buckets, evicting the least recently used beyond `max_buckets`"""
+
+    def __init__(self, max_buckets: int):
+        self.max_buckets = max_buckets
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [burst, now]
+                while len(self._buckets) > self.max_buckets:
+                    # Idle buckets refill to full anyway
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens >= cost:
+                bucket[0] = tokens - cost
+                return 0.0
+            bucket[0] = tokens
+            return (cost - tokens) / rate
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisTokenBucketStore(TokenBucketStore):
+    """
+    Buckets shared by every instance through Redis
+
+    Each bucket is a hash updated by a Lua script, timed by the Redis
+    clock, and expires once it would have refilled. When Redis cannot be
+    reached the fallback store limits clients per instance instead, and
+    Redis is not tried again for `retry_seconds`, so requests do not each
+    wait out the timeout while it is down.
+    """
+
+    blocking = True
+
+    SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+local tokens = burst
+if bucket[1] then
+    tokens = math.min(burst, tonumber(bucket[1]) + (now - tonumber(bucket[2])) * rate)
+end
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated_at", tostring(now))
+redis.call("PEXPIRE", KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+    def __init__(self, url: str, timeout_seconds: float, retry_seconds: float, fallback: TokenBucketStore):
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_REDIS_URL is set but the redis package is not installed")
+        self.fallback = fallback
+        self.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=retry_seconds)
+        self._client = redis.Redis.from_url(
+            url,
+            socket_timeout=timeout_seconds,
+            socket_connect_timeout=timeout_seconds
+        )
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> float:
+        if not self.breaker.allow():
+            return self.fallback.take(key, cost, rate, burst)
+        try:
+            wait = float(self._script(keys=[f"rate_limit:{key}"], args=[rate, burst, cost]))
+        except redis.RedisError as e:
+            self.breaker.record_failure()
+            logger.warning(
+                f"Rate limit store unavailable, limiting per instance for "
+                f"{self.breaker.reset_seconds:g} seconds: {str(e)}"
+            )
+            return self.fallback.take(key, cost, rate, burst)
+        self.breaker.record_success()
+        return wait
+
+
+class RateLimiter:
+    """
+    Per-client token bucket rate limiter
+
+    Every request costs its route's base cost plus one token per
+    `rows_per_token` rows it reads with `skip` and `limit`, so large and
+    deep list pages drain a client's bucket faster than single lookups. A
+    client that runs out waits for its own bucket to refill without
+    affecting others.
+
+    Clients sending one of `api_keys` in `key_header` get a bucket per key.
+    Everyone else is limited by address: the one in `client_ip_header` when
+    a trusted proxy sets it, otherwise the connection's.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        store: TokenBucketStore,
+        rows_per_token: int,
+        route_costs: Dict[str, float],
+        api_keys: Iterable[str] = (),
+        key_header: str = "X-API-Key",
+        client_ip_header: Optional[str] = None
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.store = store
+        self.rows_per_token = rows_per_token
+        self.route_costs = route_costs
+        self.key_header = key_header
+        self.client_ip_header = client_ip_header
+        self._api_key_digests = {_digest(api_key) for api_key in api_keys}
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def cost(self, route: str, rows: int) -> float:
+        """
+        Tokens a request costs
+
+        Args:
+            route: "METHOD /path" of the matched route template
+            rows: Rows read to serve it, `skip + limit` (0 for routes without a `limit`)
+        """
+        cost = self.route_costs.get(route, 1.0) + rows / self.rows_per_token
+        # A request costing more than the bucket holds could never be served
+        return min(cost, self.burst)
+
+    def acquire(self, client: str, cost: float) -> float:
+        """Take `cost` tokens for a client; returns 0, or the seconds to wait before retrying"""
+        return self.store.take(client, cost, self.rate, self.burst)
+
+    def client_key(self, request: Request) -> str:
+        """Rate limit key of the caller: its configured API key (hashed) or else its address"""
+        api_key = request.headers.get(self.key_header)
+        if api_key:
+            digest = _digest(api_key)
+            # Unknown keys are not trusted, or every made-up key would get a fresh bucket
+            if digest in self._api_key_digests:
+                return f"key:{digest[:16]}"
+
+        if self.client_ip_header:
+            forwarded = request.headers.get(self.client_ip_header)
+            if forwarded:
+                # Proxies append the address they received the request from; earlier entries are the client's to forge
+                return f"addr:{forwarded.rsplit(',', 1)[-1].strip()}"
+
+        return f"addr:{request.client.host if request.client else 'unknown'}"
+
+
+def _digest(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def _create_store() -> TokenBucketStore:
+    local_store = LocalTokenBucketStore(max_buckets=settings.RATE_LIMIT_MAX_CLIENTS)
+    if not settings.RATE_LIMIT_REDIS_URL:
+        return local_store
+    return RedisTokenBucketStore(
+        settings.RATE_LIMIT_REDIS_URL,
+        timeout_seconds=settings.RATE_LIMIT_REDIS_TIMEOUT_SECONDS,
+        retry_seconds=settings.RATE_LIMIT_REDIS_RETRY_SECONDS,
+        fallback=local_store
+    )
+
+
+rate_limiter = RateLimiter(
+    rate=settings.RATE_LIMIT_PER_SECOND,
+    burst=settings.RATE_LIMIT_BURST,
+    store=_create_store(),
+    rows_per_token=settings.RATE_LIMIT_ROWS_PER_TOKEN,
+    route_costs=settings.rate_limit_route_costs,
+    api_keys=settings.rate_limit_api_keys,
+    key_header=settings.RATE_LIMIT_KEY_HEADER,
+    client_ip_header=settings.RATE_LIMIT_CLIENT_IP_HEADER
+)
+
+
+def _default_limit(route) -> int:
+    """Default of a route's `limit` query parameter, or 0 if it has none"""
+    for param in route.dependant.query_params:
+        if param.name == "limit":
+            return param.default or 0
+    return 0
+
+
+def _requested_rows(request: Request, route) -> int:
+    """Rows a request makes the database read: `limit`, plus the `skip`ped rows before them"""
+    limit = request.query_params.get("limit")
+    skip = request.query_params.get("skip", "0")
+    try:
+        rows = _default_limit(route) if limit is None else max(int(limit), 0)
+        return rows + max(int(skip), 0) if rows else 0
+    except ValueError:
+        # Rejected by the route's own validation
+        return 0
+
+
+async def rate_limit(request: Request):
+    """Dependency rejecting callers that are over their rate limit with 429 and Retry-After"""
+    if not rate_limiter.enabled:
+        return
+
+    # The router stores the matched route in the scope before resolving dependencies
+    route = request.scope["route"]
+    cost = rate_limiter.cost(f"{request.method} {route.path}", _requested_rows(request, route))
+    client = rate_limiter.client_key(request)
+
+    if rate_limiter.store.blocking:
+        wait = await run_in_threadpool(rate_limiter.acquire, client, cost)
+    else:
+        wait = rate_limiter.acquire(client, cost)
+
+    if wait > 0:
+        retry_after = max(math.ceil(wait), 1)
+        logger.warning(f"Rate limit exceeded by {client} on {request.method} {route.path} (cost {cost:g})")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Rate limit exceeded; retry in {retry_after} seconds",
+            headers={"Retry-After": str(retry_after)}
+        )
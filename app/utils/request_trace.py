@@ -0,0 +1,213 @@
+import asyncio
+import functools
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Value recorded in place of parameters not listed in SLOW_REQUEST_RECORDED_PARAMS
+REDACTED = "[redacted]"
+
+
+class RequestTrace:
+    """Timing and SQL activity of a single request"""
+
+    def __init__(self, correlation_id: Optional[str], method: str, params: dict, profiled: bool = False):
+        self.correlation_id = correlation_id
+        self.method = method
+        self.route: Optional[str] = None
+        self.params = params
+        self.status_code: Optional[int] = None
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.statements: List[dict] = []
+        self.dropped_statements = 0
+        self.sql_ms = 0.0
+        self.pool_wait_ms = 0.0
+        self.profiled = profiled
+        self.profile: Counter = Counter()
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def add_statement(self, statement: str, duration_ms: float, row_count: int):
+        with self._lock:
+            self.sql_ms += duration_ms
+            if len(self.statements) >= settings.SLOW_REQUEST_MAX_STATEMENTS:
+                self.dropped_statements += 1
+                return
+            self.statements.append({
+                "statement": statement,
+                "duration_ms": round(duration_ms, 3),
+                "row_count": row_count,
+            })
+
+    def add_pool_wait(self, duration_ms: float):
+        with self._lock:
+            self.pool_wait_ms += duration_ms
+
+    def add_sample(self, stack: str):
+        with self._lock:
+            self.profile[stack] += 1
+
+    def finish(self, status_code: int):
+        self.status_code = status_code
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+
+    def to_dict(self) -> dict:
+        """
+        Record of the trace for the slow request buffer
+
+        Only the route template is kept, never the raw path, and parameter
+        values are redacted unless listed in SLOW_REQUEST_RECORDED_PARAMS, so
+        identifiers such as patient IDs are not retained.
+        """
+        with self._lock:
+            profile = Counter(self.profile)
+        recorded_params = settings.slow_request_recorded_params
+        return {
+            "correlation_id": self.correlation_id,
+            "method": self.method,
+            "route": self.route,
+            "params": {
+                name: value if name in recorded_params else REDACTED
+                for name, value in self.params.items()
+            },
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms or 0.0, 3),
+            "sql_ms": round(self.sql_ms, 3),
+            "pool_wait_ms": round(self.pool_wait_ms, 3),
+            "statement_count": len(self.statements) + self.dropped_statements,
+            "statements": self.statements,
+            "profile": folded_stacks(profile) if self.profiled else None,
+        }
+
+
+# Trace of the request being handled in the current context
+request_trace_var: ContextVar[Optional[RequestTrace]] = ContextVar('request_trace', default=None)
+
+
+class SlowRequestRecorder:
+    """Bounded ring buffer of the most recent requests slower than a threshold"""
+
+    def __init__(self, threshold_ms: float, max_size: int):
+        self.threshold_ms = threshold_ms
+        self._lock = threading.Lock()
+        self._requests = deque(maxlen=max_size)
+
+    def record(self, trace: RequestTrace):
+        if trace.duration_ms is None or trace.duration_ms < self.threshold_ms:
+            return
+        with self._lock:
+            self._requests.append(trace.to_dict())
+
+    def get_slowest(self, limit: int = 50) -> List[dict]:
+        """Recorded requests, slowest first"""
+        with self._lock:
+            requests = list(self._requests)
+        return sorted(requests, key=lambda request: request["duration_ms"], reverse=True)[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._requests.clear()
+
+
+slow_request_recorder = SlowRequestRecorder(
+    threshold_ms=settings.SLOW_REQUEST_THRESHOLD_MS,
+    max_size=settings.SLOW_REQUEST_BUFFER_SIZE
+)
+
+
+def folded_stacks(stacks: Counter) -> str:
+    """Render stack samples in the folded format read by flamegraph.pl and speedscope"""
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("query_start", None)
+    trace = request_trace_var.get()
+    if trace is not None and start is not None:
+        trace.add_statement(statement, (time.perf_counter() - start) * 1000, cursor.rowcount)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not run for failed statements
+    if exception_context.connection is not None:
+        exception_context.connection.info.pop("query_start", None)
+
+
+def install_sql_tracing(engine: Engine):
+    """
+    Record every SQL statement and connection pool wait on the current request's trace
+
+    Pool wait is measured around Engine.connect(), which sessions call to
+    check out a connection; it includes opening new connections.
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+    connect = engine.connect
+
+    @functools.wraps(connect)
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            trace = request_trace_var.get()
+            if trace is not None:
+                trace.add_pool_wait((time.perf_counter() - start) * 1000)
+
+    engine.connect = timed_connect
+
+
+def _register_thread(endpoint: Callable) -> Callable:
+    """Wrap an endpoint so the profiler knows which thread is running the request"""
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            trace = request_trace_var.get()
+            if trace is not None:
+                trace.threads.add(threading.get_ident())
+            return await endpoint(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        trace = request_trace_var.get()
+        if trace is None:
+            return endpoint(*args, **kwargs)
+        thread_id = threading.get_ident()
+        trace.threads.add(thread_id)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            # The threadpool thread moves on to other requests afterwards
+            trace.threads.discard(thread_id)
+
+    return wrapper
+
+
+class TracedRoute(APIRoute):
+    """API route that registers its handling thread on the request trace"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _register_thread(endpoint), **kwargs)
@@ -0,0 +1,46 @@
+import argparse
+from typing import Optional
+
+from app.database import shard_sessions
+from app.services.resharding_service import ReshardingService
+from app.utils.rollups import rebuild_rollups
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def reshard(chunk_size: Optional[int] = None) -> int:
+    """
+    Move every prescription to its patient's shard, then rebuild the rollups
+
+    Args:
+        chunk_size: Prescriptions read per chunk (defaults to ROLLUP_REBUILD_CHUNK_SIZE)
+
+    Returns:
+        Number of prescriptions moved
+    """
+    chunk_size = chunk_size or settings.ROLLUP_REBUILD_CHUNK_SIZE
+
+    print("Moving prescriptions to their patients' shards...")
+    moved = 0
+    for shard_id, make_session in enumerate(shard_sessions):
+        db = make_session()
+        try:
+            shard_moved = ReshardingService.relocate_prescriptions(db, chunk_size=chunk_size)
+        finally:
+            db.close()
+        print(f"  shard {shard_id}: moved {shard_moved} prescriptions")
+        moved += shard_moved
+    print(f"✓ Moved {moved} prescriptions")
+
+    # Moved prescriptions are still counted in the rollups of the shard they left
+    rebuild_rollups(chunk_size=chunk_size)
+    return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move prescriptions to their patients' shards")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Prescriptions read per chunk")
+    args = parser.parse_args()
+
+    reshard(chunk_size=args.chunk_size)
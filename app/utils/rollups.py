@@ -0,0 +1,41 @@
+import argparse
+from typing import Optional
+
+from app.database import shard_sessions
+from app.services.rollup_service import RollupService
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def rebuild_rollups(chunk_size: Optional[int] = None) -> int:
+    """
+    Recompute the dashboard rollup tables from the prescriptions table on every shard
+
+    Args:
+        chunk_size: Prescription IDs aggregated per chunk (defaults to ROLLUP_REBUILD_CHUNK_SIZE)
+
+    Returns:
+        Number of prescriptions processed
+    """
+    chunk_size = chunk_size or settings.ROLLUP_REBUILD_CHUNK_SIZE
+
+    print(f"Rebuilding rollup tables in chunks of {chunk_size}...")
+    processed = 0
+    for make_session in shard_sessions:
+        db = make_session()
+        try:
+            processed += RollupService.rebuild(db, chunk_size=chunk_size)
+        finally:
+            db.close()
+
+    print(f"✓ Rebuilt rollups from {processed} prescriptions")
+    return processed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild dashboard rollup tables")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Prescription IDs per chunk")
+    args = parser.parse_args()
+
+    rebuild_rollups(chunk_size=args.chunk_size)
@@ -0,0 +1,189 @@
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type, get_args, get_origin
+
+from fastapi import Request, Response
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import msgpack
+except ImportError:  # Optional dependency; MessagePack is not offered without it
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+COLUMNAR_JSON_MEDIA_TYPE = "application/vnd.hms.columnar+json"
+COLUMNAR_MSGPACK_MEDIA_TYPE = "application/vnd.hms.columnar+msgpack"
+
+# Other names clients use for the same formats
+MEDIA_TYPE_ALIASES = {
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+}
+
+COLUMNAR_MEDIA_TYPES = {COLUMNAR_JSON_MEDIA_TYPE, COLUMNAR_MSGPACK_MEDIA_TYPE}
+MSGPACK_MEDIA_TYPES = {MSGPACK_MEDIA_TYPE, COLUMNAR_MSGPACK_MEDIA_TYPE}
+
+
+def available_media_types() -> List[str]:
+    """Response formats this process can produce, JSON (the default) first"""
+    media_types = [JSON_MEDIA_TYPE, COLUMNAR_JSON_MEDIA_TYPE]
+    if msgpack is not None:
+        media_types += [MSGPACK_MEDIA_TYPE, COLUMNAR_MSGPACK_MEDIA_TYPE]
+    return media_types
+
+
+def _parse_accept(accept: str) -> List[Tuple[str, float]]:
+    """Media ranges of an Accept header with their quality values"""
+    ranges = []
+    for part in accept.split(","):
+        media_range, *params = [item.strip() for item in part.split(";")]
+        if not media_range:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        media_range = media_range.lower()
+        ranges.append((MEDIA_TYPE_ALIASES.get(media_range, media_range), quality))
+    return ranges
+
+
+def _quality(media_type: str, ranges: List[Tuple[str, float]]) -> float:
+    """Quality the client gives a media type, from the most specific matching range"""
+    main_type = media_type.split("/")[0]
+    best_specificity, best_quality = -1, 0.0
+    for media_range, quality in ranges:
+        if media_range == media_type:
+            specificity = 2
+        elif media_range == f"{main_type}/*":
+            specificity = 1
+        elif media_range == "*/*":
+            specificity = 0
+        else:
+            continue
+        if specificity > best_specificity:
+            best_specificity, best_quality = specificity, quality
+    return best_quality
+
+
+@lru_cache(maxsize=256)
+def choose_media_type(accept: Optional[str]) -> str:
+    """
+    Pick the response format for an Accept header
+
+    JSON wins ties and is returned when the header is missing or asks only
+    for formats this process cannot produce.
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+
+    ranges = _parse_accept(accept)
+    chosen, chosen_quality = JSON_MEDIA_TYPE, 0.0
+    for media_type in available_media_types():
+        quality = _quality(media_type, ranges)
+        if quality > chosen_quality:
+            chosen, chosen_quality = media_type, quality
+    return chosen
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Any) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def _row_model(annotation: Any) -> Optional[Type[BaseModel]]:
+    """Item model of a `list[SomeModel]` field annotation"""
+    if get_origin(annotation) is not list:
+        return None
+    (item,) = get_args(annotation)
+    if isinstance(item, type) and issubclass(item, BaseModel):
+        return item
+    return None
+
+
+def to_columns(schema: Any, body: Any) -> Any:
+    """
+    Rewrite the list-of-rows fields of a response as one array per column
+
+    Only fields of `schema` annotated as a list of models are rewritten;
+    other fields and responses are left as they are.
+    """
+    if not (isinstance(schema, type) and issubclass(schema, BaseModel)) or not isinstance(body, dict):
+        return body
+
+    for name, field in schema.model_fields.items():
+        row_model = _row_model(field.annotation)
+        if row_model is None or body.get(name) is None:
+            continue
+        rows = body[name]
+        body[name] = {column: [row[column] for row in rows] for column in row_model.model_fields}
+    return body
+
+
+def render(content: Any, schema: Any, media_type: str) -> bytes:
+    """
+    Serialize a response body in a negotiated format
+
+    Args:
+        content: Response model, ORM object(s) or plain data matching `schema`
+        schema: Response schema of the route (a model or e.g. `list[SomeModel]`)
+        media_type: One of `available_media_types()`
+
+    Returns:
+        Encoded response body
+    """
+    adapter = _adapter(schema)
+    body = adapter.dump_python(adapter.validate_python(content, from_attributes=True), mode="json")
+
+    if media_type in COLUMNAR_MEDIA_TYPES:
+        body = to_columns(schema, body)
+
+    if media_type in MSGPACK_MEDIA_TYPES:
+        return msgpack.packb(body, use_bin_type=True)
+
+    # Same encoding as JSONResponse
+    return json.dumps(body, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def negotiate(
+    request: Request,
+    content: Any,
+    schema: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None
+) -> Any:
+    """
+    Encode a route's response in the format requested by the Accept header
+
+    Plain JSON responses without extra headers are returned unchanged, so
+    FastAPI serializes them through the route's `response_model` as usual.
+
+    Args:
+        request: Incoming request
+        content: What the route would otherwise return
+        schema: Response schema of the route
+        status_code: Status of the response when it is encoded here
+        headers: Extra response headers (optional)
+
+    Returns:
+        `content` itself, or a Response with the encoded body
+    """
+    media_type = choose_media_type(request.headers.get("accept"))
+    if media_type == JSON_MEDIA_TYPE and headers is None:
+        return content
+
+    return Response(
+        content=render(content, schema, media_type),
+        status_code=status_code,
+        headers={**(headers or {}), "Vary": "Accept"},
+        media_type=media_type
+    )
+
+
+def vary_on_accept(response: Response):
+    """Dependency marking responses of content-negotiated routes as varying with Accept"""
+    response.headers["Vary"] = "Accept"
@@ -0,0 +1,77 @@
+import json
+from typing import List, Optional, Tuple
+
+# Parameters that change what is measured: results recorded with different values are not comparable
+WORKLOAD_PARAMETERS = ("rows", "iterations", "requests", "concurrency", "database", "shards")
+# Parameters describing the machine: differences are reported, since absolute numbers shift with them
+ENVIRONMENT_PARAMETERS = ("host", "cpus", "python")
+
+
+def load_results(path: str) -> Tuple[Optional[dict], dict]:
+    """
+    Read a results file
+
+    Returns:
+        The run parameters (None for files written before they were recorded) and the results
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    if set(data) == {"parameters", "results"}:
+        return data["parameters"], data["results"]
+    return None, data
+
+
+def save_results(path: str, parameters: dict, results: dict):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({"parameters": parameters, "results": results}, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def parameter_differences(parameters: dict, baseline_parameters: dict, names: Tuple[str, ...]) -> List[str]:
+    """Describe each of `names` whose value differs between a run and its baseline"""
+    return [
+        f"{name}: baseline {baseline_parameters.get(name)!r}, this run {parameters.get(name)!r}"
+        for name in names
+        if parameters.get(name) != baseline_parameters.get(name)
+    ]
+
+
+def failed_benchmarks(results: dict) -> List[str]:
+    """Describe each benchmark with failed operations, whose timings leave those operations out"""
+    return [
+        f"{key}: {summary['errors']} failed operation(s)"
+        for key, summary in sorted(results.items())
+        if summary.get("errors")
+    ]
+
+
+def compare_to_baseline(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """
+    Find benchmarks that regressed against a baseline
+
+    A benchmark regresses when its p95 latency grows, or its throughput
+    drops, by more than `threshold` (a fraction, e.g. 0.2 for 20%).
+    Benchmarks missing from either side are ignored.
+
+    Returns:
+        Human-readable description of each regression
+    """
+    regressions = []
+    for key, current in sorted(results.items()):
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+
+        if previous["p95_ms"] > 0 and current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{key}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms "
+                f"(+{(current['p95_ms'] / previous['p95_ms'] - 1) * 100:.0f}%)"
+            )
+
+        if previous["throughput_ops"] > 0 and current["throughput_ops"] < previous["throughput_ops"] * (1 - threshold):
+            regressions.append(
+                f"{key}: throughput {previous['throughput_ops']} -> {current['throughput_ops']} ops/s "
+                f"({(current['throughput_ops'] / previous['throughput_ops'] - 1) * 100:.0f}%)"
+            )
+
+    return regressions
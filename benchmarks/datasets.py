@@ -0,0 +1,184 @@
+import argparse
+import csv
+import random
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple
+
+MEDICATIONS = [
+    "Paracetamol", "Amoxicillin", "Ibuprofen", "Cetirizine", "Metformin", "Amlodipine",
+    "Atorvastatin", "Omeprazole", "Azithromycin", "Losartan", "Pantoprazole", "Montelukast",
+    "Levothyroxine", "Salbutamol", "Doxycycline", "Ciprofloxacin", "Prednisolone", "Ranitidine",
+    "Clopidogrel", "Metoprolol",
+]
+DOSAGES = ["1-0-1", "0-1-1", "1-1-1", "1-0-0", "0-0-1", "1-1-0"]
+
+FIELDS = ["prescription_id", "appointment_id", "patient_id", "doctor_id", "medication", "dosage", "days", "issued_at"]
+
+
+def generate_rows(count: int, seed: int = 42, start_id: int = 1) -> Iterator[dict]:
+    """
+    Generate synthetic prescriptions shaped like the seed data
+
+    Patients, doctors and appointments are drawn so that per-patient and
+    per-doctor result sets grow with the dataset, the way they do in production.
+
+    Args:
+        count: Number of prescriptions
+        seed: Random seed, so datasets are reproducible
+        start_id: First prescription ID
+
+    Yields:
+        Prescription rows in CSV column order
+    """
+    rng = random.Random(seed)
+    patients = max(count // 5, 1)
+    doctors = max(min(count // 500, 2000), 20)
+    appointments = max(count // 2, 1)
+    end = datetime(2024, 12, 31)
+    span_seconds = int(timedelta(days=730).total_seconds())
+
+    for offset in range(count):
+        yield {
+            "prescription_id": start_id + offset,
+            "appointment_id": str(rng.randint(1, appointments)),
+            "patient_id": rng.randint(1, patients),
+            "doctor_id": rng.randint(1, doctors),
+            "medication": rng.choice(MEDICATIONS),
+            "dosage": rng.choice(DOSAGES),
+            "days": rng.randint(1, 30),
+            "issued_at": (end - timedelta(seconds=rng.randint(0, span_seconds))).strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+
+def write_csv(path: str, count: int, seed: int = 42):
+    """Write a synthetic dataset in the seed CSV format"""
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in generate_rows(count, seed=seed):
+            writer.writerow(row)
+
+    print(f"✓ Wrote {count} prescriptions to {path}")
+
+
+def load_dataset(count: int, seed: int = 42, chunk_size: int = 10000) -> int:
+    """
+    Load a synthetic dataset into the configured database
+
+    Creates the schema, inserts each prescription on its patient's shard
+    in chunks (one commit per chunk and shard) and rebuilds the rollup
+    tables. Each shard allocates IDs from its own range. Does nothing if
+    the shards already hold at least `count` prescriptions.
+
+    Args:
+        count: Number of prescriptions
+        seed: Random seed
+        chunk_size: Rows inserted per commit
+
+    Returns:
+        Number of prescriptions in the database
+    """
+    from sqlalchemy import func, insert
+
+    from app.database import HOME_SHARD, SHARD_COUNT, SessionLocal, scatter, shard_for_patient, shard_session
+    from app.models.prescription import Prescription
+    from app.services.medication_service import MedicationService, medication_name_key
+    from app.services.rollup_service import RollupService
+    from app.utils.db_init import init_db
+
+    init_db()
+    db = SessionLocal()
+    try:
+        existing = sum(scatter(db, lambda shard_db: shard_db.query(func.count(Prescription.prescription_id)).scalar()))
+        if existing >= count:
+            print(f"⚠ Database already contains {existing} prescriptions. Skipping load.")
+            return existing
+
+        with shard_session(db, HOME_SHARD) as home_db:
+            medication_ids = MedicationService.get_or_create_many(home_db, MEDICATIONS)
+            home_db.commit()
+            for shard_id in range(SHARD_COUNT):
+                with shard_session(db, shard_id) as shard_db:
+                    if shard_db is not home_db:
+                        MedicationService.replicate(home_db, shard_db, medication_ids.values())
+                        shard_db.commit()
+
+        def flush(shard_id: int, rows: list):
+            with shard_session(db, shard_id) as shard_db:
+                shard_db.execute(insert(Prescription), rows)
+                shard_db.commit()
+
+        print(f"Loading {count - existing} synthetic prescriptions...")
+        chunks = {}
+        for row in generate_rows(count - existing, seed=seed):
+            shard_id = shard_for_patient(row["patient_id"])
+            chunk = chunks.setdefault(shard_id, [])
+            chunk.append({
+                "appointment_id": row["appointment_id"],
+                "patient_id": row["patient_id"],
+                "doctor_id": row["doctor_id"],
+                "medication_id": medication_ids[medication_name_key(row["medication"])],
+                "dosage": row["dosage"],
+                "days": row["days"],
+                "issued_at": datetime.strptime(row["issued_at"], '%Y-%m-%d %H:%M:%S'),
+            })
+            if len(chunk) >= chunk_size:
+                flush(shard_id, chunk)
+                chunks[shard_id] = []
+
+        for shard_id, chunk in chunks.items():
+            if chunk:
+                flush(shard_id, chunk)
+
+        for shard_id in range(SHARD_COUNT):
+            with shard_session(db, shard_id) as shard_db:
+                RollupService.rebuild(shard_db)
+        print(f"✓ Loaded {count} prescriptions")
+        return count
+    finally:
+        db.close()
+
+
+def prescription_id_ranges() -> List[Tuple[int, int, int]]:
+    """
+    Lowest ID, highest ID and row count of the prescriptions on each shard
+
+    Shards allocate IDs sequentially and the benchmarks never delete, so
+    drawing uniformly from these ranges picks existing prescriptions.
+    """
+    from sqlalchemy import func
+
+    from app.database import SessionLocal, scatter
+    from app.models.prescription import Prescription
+
+    db = SessionLocal()
+    try:
+        return [
+            tuple(row) for row in scatter(db, lambda shard_db: shard_db.query(
+                func.min(Prescription.prescription_id),
+                func.max(Prescription.prescription_id),
+                func.count(Prescription.prescription_id)
+            ).one())
+            if row[2]
+        ]
+    finally:
+        db.close()
+
+
+def random_prescription_id(rng: random.Random, id_ranges: List[Tuple[int, int, int]]) -> int:
+    """An existing prescription ID, each row being equally likely"""
+    low, high, _ = rng.choices(id_ranges, weights=[count for _, _, count in id_ranges])[0]
+    return rng.randint(low, high)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic prescription dataset")
+    parser.add_argument("--rows", type=int, default=10000, help="Number of prescriptions (10k to 10M)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--csv", help="Write a CSV file instead of loading the configured database")
+    args = parser.parse_args()
+
+    if args.csv:
+        write_csv(args.csv, args.rows, seed=args.seed)
+    else:
+        load_dataset(args.rows, seed=args.seed)
@@ -0,0 +1,140 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Optional
+
+import httpx
+
+from benchmarks.datasets import prescription_id_ranges, random_prescription_id
+from benchmarks.stats import summarize
+
+API_PREFIX = "/api/v1/prescriptions"
+
+
+class Route(NamedTuple):
+    """A route in app/routes/prescription.py and how to build a request for it"""
+    name: str
+    method: str
+    build: Callable[[random.Random], tuple]
+
+
+def _create_body(rng: random.Random) -> dict:
+    return {
+        "appointment_id": f"BENCH-{rng.randint(1, 10 ** 9)}",
+        "patient_id": rng.randint(1, 1000),
+        "doctor_id": rng.randint(1, 20),
+        "medication": rng.choice(["Paracetamol", "Amoxicillin", "Ibuprofen", "Cetirizine"]),
+        "dosage": "1-0-1",
+        "days": rng.randint(1, 30),
+    }
+
+
+def build_routes(rows: int) -> List[Route]:
+    """Request factories for every prescription route, drawing IDs from the loaded dataset"""
+    patients = max(rows // 5, 1)
+    doctors = max(min(rows // 500, 2000), 20)
+    appointments = max(rows // 2, 1)
+    id_ranges = prescription_id_ranges()
+
+    return [
+        Route("POST /prescriptions/", "POST",
+              lambda rng: (f"{API_PREFIX}/", None, _create_body(rng))),
+        Route("GET /prescriptions/{prescription_id}", "GET",
+              lambda rng: (f"{API_PREFIX}/{random_prescription_id(rng, id_ranges)}", None, None)),
+        Route("GET /prescriptions/", "GET",
+              lambda rng: (f"{API_PREFIX}/", {"skip": rng.randint(0, 1000), "limit": 100}, None)),
+        Route("GET /prescriptions/?doctor_id", "GET",
+              lambda rng: (f"{API_PREFIX}/", {"doctor_id": rng.randint(1, doctors), "limit": 100}, None)),
+        Route("GET /prescriptions/?medication", "GET",
+              lambda rng: (f"{API_PREFIX}/", {"medication": "Paracetamol", "limit": 100}, None)),
+        Route("GET /prescriptions/patient/{patient_id}", "GET",
+              lambda rng: (f"{API_PREFIX}/patient/{rng.randint(1, patients)}", None, None)),
+        Route("GET /prescriptions/doctor/{doctor_id}", "GET",
+              lambda rng: (f"{API_PREFIX}/doctor/{rng.randint(1, doctors)}", {"limit": 500}, None)),
+        Route("GET /prescriptions/appointment/{appointment_id}/prescriptions", "GET",
+              lambda rng: (f"{API_PREFIX}/appointment/{rng.randint(1, appointments)}/prescriptions", None, None)),
+        # GET /prescriptions/ingestion/{ticket_id} only serves tickets in batched ingestion mode,
+        # so it is exercised through POST when INGESTION_MODE=batched rather than on its own.
+    ]
+
+
+def run_route(
+    base_url: str,
+    route: Route,
+    concurrency: int,
+    requests: int,
+    seed: int = 42
+) -> dict:
+    """
+    Drive one route at a fixed concurrency level
+
+    Only 2xx responses are timed; anything else counts as an error.
+
+    Args:
+        base_url: Service base URL
+        route: Route to drive
+        concurrency: Number of concurrent clients
+        requests: Total number of requests
+        seed: Random seed for request parameters
+
+    Returns:
+        Throughput and latency summary
+    """
+    per_worker = max(requests // concurrency, 1)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    with httpx.Client(base_url=base_url, limits=limits, timeout=30.0) as client:
+        def worker(worker_id: int) -> tuple:
+            rng = random.Random(seed * 1000 + worker_id)
+            latencies, errors = [], 0
+            for _ in range(per_worker):
+                path, params, body = route.build(rng)
+                start = time.perf_counter()
+                try:
+                    response = client.request(route.method, path, params=params, json=body)
+                    # A rejected request (404, 422, 429, ...) is fast and would pass for an improvement
+                    ok = response.is_success
+                except httpx.HTTPError:
+                    ok = False
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                if ok:
+                    latencies.append(elapsed_ms)
+                else:
+                    errors += 1
+            return latencies, errors
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(worker, range(concurrency)))
+        wall = time.perf_counter() - start
+
+    latencies = [latency for worker_latencies, _ in results for latency in worker_latencies]
+    errors = sum(worker_errors for _, worker_errors in results)
+    return summarize(latencies, wall, errors)
+
+
+def run_http_benchmarks(
+    base_url: str,
+    rows: int,
+    concurrency_levels: List[int],
+    requests: int,
+    routes: Optional[List[str]] = None
+) -> dict:
+    """
+    Drive every prescription route at each concurrency level
+
+    Returns:
+        Mapping of "http:<route>@c<concurrency>" -> summary
+    """
+    results = {}
+    for route in build_routes(rows):
+        if routes and route.name not in routes:
+            continue
+        for concurrency in concurrency_levels:
+            summary = run_route(base_url, route, concurrency, requests)
+            key = f"http:{route.name}@c{concurrency}"
+            results[key] = summary
+            print(f"  {key}: {summary['throughput_ops']} req/s, "
+                  f"p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms "
+                  f"errors={summary['errors']}")
+    return results
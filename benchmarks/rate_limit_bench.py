@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import time
+from typing import Callable
+
+from benchmarks.stats import summarize
+
+# Limiter calls per timed operation, so p50_ms reads as microseconds per call
+BATCH = 1000
+
+
+def _time(operation: Callable[[int], object], iterations: int) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for iteration in range(iterations):
+        op_start = time.perf_counter()
+        operation(iteration)
+        latencies.append((time.perf_counter() - op_start) * 1000)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run_rate_limit_benchmarks(iterations: int) -> dict:
+    """
+    Measure the per-request overhead of rate limiting
+
+    Times batches of BATCH calls against the in-process store, so each
+    summary's latencies in ms are microseconds per request. The limiter
+    never runs out of tokens here, so every call takes the normal path.
+
+    Returns:
+        Mapping of "rate_limit:<operation>" -> summary
+    """
+    from starlette.requests import Request
+
+    import app.utils.rate_limit as rate_limit_module
+    from app.main import app
+    from app.utils.rate_limit import LocalTokenBucketStore, RateLimiter, rate_limit
+
+    limiter = RateLimiter(
+        rate=1e9,
+        burst=1e9,
+        store=LocalTokenBucketStore(max_buckets=100000),
+        rows_per_token=100,
+        route_costs={}
+    )
+    configured_limiter, rate_limit_module.rate_limiter = rate_limit_module.rate_limiter, limiter
+
+    route = next(route for route in app.routes if getattr(route, "path", None) == "/api/v1/prescriptions/doctor/{doctor_id}")
+    request = Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/prescriptions/doctor/1",
+        "query_string": b"limit=500",
+        "headers": [(b"x-api-key", b"bench-client")],
+        "client": ("127.0.0.1", 50000),
+        "route": route,
+    })
+
+    def acquire(clients: int) -> Callable[[int], object]:
+        keys = [f"addr:10.0.{n // 256}.{n % 256}" for n in range(clients)]
+
+        def operation(iteration: int):
+            for n in range(BATCH):
+                limiter.acquire(keys[(iteration * BATCH + n) % clients], 6)
+        return operation
+
+    loop = asyncio.new_event_loop()
+
+    async def dependency_batch():
+        for _ in range(BATCH):
+            await rate_limit(request)
+
+    operations = {
+        "acquire[1 client]": acquire(1),
+        "acquire[100k clients]": acquire(100000),
+        "dependency": lambda iteration: loop.run_until_complete(dependency_batch()),
+    }
+
+    results = {}
+    try:
+        for name, operation in operations.items():
+            summary = _time(operation, iterations)
+            key = f"rate_limit:{name}"
+            results[key] = summary
+            print(f"  {key}: p50={summary['p50_ms']}us p95={summary['p95_ms']}us per request")
+    finally:
+        loop.close()
+        rate_limit_module.rate_limiter = configured_limiter
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rate limiter overhead benchmark")
+    parser.add_argument("--iterations", type=int, default=200, help="Batches of calls per operation")
+    args = parser.parse_args()
+
+    run_rate_limit_benchmarks(args.iterations)
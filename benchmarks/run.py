@@ -0,0 +1,179 @@
+import argparse
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+
+def run_parameters(args: argparse.Namespace) -> dict:
+    """Parameters recorded with the results, so runs are only compared with like runs"""
+    from sqlalchemy.engine import make_url
+
+    from app.config import get_settings
+
+    shard_urls = get_settings().shard_urls
+    return {
+        "rows": args.rows,
+        "iterations": args.iterations,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        # The driver only: URLs can carry credentials
+        "database": make_url(shard_urls[0]).drivername,
+        "shards": len(shard_urls),
+        "host": platform.node(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def start_server(database_url: str, port: int) -> subprocess.Popen:
+    """Start the service under uvicorn against the benchmark database and wait for /health"""
+    env = dict(os.environ, DATABASE_URL=database_url)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("Benchmark server exited during startup")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+
+    server.terminate()
+    raise RuntimeError("Benchmark server did not become healthy")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Prescription service benchmark suite")
+    parser.add_argument("--rows", type=int, default=10000, help="Synthetic dataset size (10k to 10M)")
+    parser.add_argument("--database-url", help="Database to benchmark (default: SQLite file under benchmarks/.data)")
+    parser.add_argument("--base-url", help="Benchmark an already running service instead of starting one")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the service started by the suite")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Concurrency levels")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per route and concurrency level")
+    parser.add_argument("--iterations", type=int, default=200, help="Iterations per service micro-benchmark")
+    parser.add_argument("--skip-http", action="store_true", help="Skip the HTTP route benchmarks")
+    parser.add_argument("--skip-service", action="store_true", help="Skip the PrescriptionService micro-benchmarks")
+    parser.add_argument("--skip-wire", action="store_true", help="Skip the response wire format benchmarks")
+    parser.add_argument("--skip-rate-limit", action="store_true", help="Skip the rate limiter overhead benchmarks")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression as a fraction (0.2 = 20%%)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url is None:
+        data_dir = os.path.join(BENCH_DIR, '.data')
+        os.makedirs(data_dir, exist_ok=True)
+        database_url = f"sqlite:///{os.path.join(data_dir, f'bench-{args.rows}.db')}"
+
+    # Must be set before any app module reads the settings
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, REPO_DIR)
+
+    from benchmarks.compare import (
+        ENVIRONMENT_PARAMETERS,
+        WORKLOAD_PARAMETERS,
+        compare_to_baseline,
+        failed_benchmarks,
+        load_results,
+        parameter_differences,
+        save_results
+    )
+    from benchmarks.datasets import load_dataset
+    from benchmarks.http_bench import run_http_benchmarks
+    from benchmarks.rate_limit_bench import run_rate_limit_benchmarks
+    from benchmarks.service_bench import run_service_benchmarks
+    from benchmarks.wire_bench import run_wire_benchmarks
+
+    parameters = run_parameters(args)
+    print(f"Benchmarking against {database_url}")
+    rows = load_dataset(args.rows)
+    results = {}
+
+    if not args.skip_service:
+        print("Running PrescriptionService micro-benchmarks...")
+        results.update(run_service_benchmarks(rows, args.iterations))
+
+    if not args.skip_wire:
+        print("Running response wire format benchmarks...")
+        results.update(run_wire_benchmarks(args.iterations))
+
+    if not args.skip_rate_limit:
+        print("Running rate limiter overhead benchmarks...")
+        results.update(run_rate_limit_benchmarks(args.iterations))
+
+    if not args.skip_http:
+        server = None if args.base_url else start_server(database_url, args.port)
+        base_url = args.base_url or f"http://127.0.0.1:{args.port}"
+        try:
+            print(f"Running HTTP benchmarks against {base_url}...")
+            results.update(run_http_benchmarks(base_url, rows, args.concurrency, args.requests))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    if args.output:
+        save_results(args.output, parameters, results)
+
+    failures = failed_benchmarks(results)
+    if failures:
+        print("✗ Some operations failed, so the results are not comparable (and are not saved as a baseline):")
+        for failure in failures:
+            print(f"  {failure}")
+        return 2
+
+    if args.save_baseline:
+        save_results(args.baseline, parameters, results)
+        print(f"✓ Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠ No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    baseline_parameters, baseline = load_results(args.baseline)
+    if baseline_parameters is None:
+        print(f"⚠ {args.baseline} does not record its run parameters; record a new baseline to check them")
+    else:
+        mismatches = parameter_differences(parameters, baseline_parameters, WORKLOAD_PARAMETERS)
+        if mismatches:
+            print(f"✗ {args.baseline} was recorded with different parameters, so the results are not comparable:")
+            for mismatch in mismatches:
+                print(f"  {mismatch}")
+            print("  Re-run with the baseline's parameters, or record a new baseline with --save-baseline")
+            return 2
+        for difference in parameter_differences(parameters, baseline_parameters, ENVIRONMENT_PARAMETERS):
+            print(f"⚠ Baseline recorded on a different machine: {difference}")
+
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+    if regressions:
+        print(f"✗ {len(regressions)} regression(s) beyond {args.threshold * 100:.0f}%:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+
+    print(f"✓ No regressions beyond {args.threshold * 100:.0f}% against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+import random
+import time
+from typing import Callable, List
+
+from benchmarks.datasets import prescription_id_ranges, random_prescription_id
+from benchmarks.stats import summarize
+
+
+def _time(operation: Callable[[random.Random], object], iterations: int, seed: int = 42) -> dict:
+    rng = random.Random(seed)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        op_start = time.perf_counter()
+        operation(rng)
+        latencies.append((time.perf_counter() - op_start) * 1000)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run_service_benchmarks(rows: int, iterations: int) -> dict:
+    """
+    Micro-benchmark the PrescriptionService methods against the configured database
+
+    Each operation runs in its own session, as it would per request.
+
+    Returns:
+        Mapping of "service:<method>" -> summary
+    """
+    from app.database import SessionLocal, shard_for_patient
+    from app.schemas.prescription import PrescriptionCreate
+    from app.services.prescription_service import PrescriptionService
+
+    patients = max(rows // 5, 1)
+    doctors = max(min(rows // 500, 2000), 20)
+    appointments = max(rows // 2, 1)
+    id_ranges = prescription_id_ranges()
+
+    # A batch is written to one shard, so its patients must share one
+    patients_by_shard = {}
+    for patient_id in range(1, 1001):
+        patients_by_shard.setdefault(shard_for_patient(patient_id), []).append(patient_id)
+    shard_patients = list(patients_by_shard.values())
+
+    def create_body(rng: random.Random, patient_id: int) -> PrescriptionCreate:
+        return PrescriptionCreate(
+            appointment_id=f"BENCH-{rng.randint(1, 10 ** 9)}",
+            patient_id=patient_id,
+            doctor_id=rng.randint(1, 20),
+            medication=rng.choice(["Paracetamol", "Amoxicillin", "Ibuprofen"]),
+            dosage="1-0-1",
+            days=rng.randint(1, 30),
+        )
+
+    def in_session(call: Callable) -> Callable[[random.Random], object]:
+        def operation(rng: random.Random):
+            db = SessionLocal()
+            try:
+                return call(db, rng)
+            finally:
+                db.close()
+        return operation
+
+    def create_batch(rng: random.Random, size: int) -> List[PrescriptionCreate]:
+        patients = rng.choice(shard_patients)
+        return [create_body(rng, rng.choice(patients)) for _ in range(size)]
+
+    operations = {
+        "create_prescription": lambda db, rng: PrescriptionService.create_prescription(
+            db, create_body(rng, rng.randint(1, 1000))
+        ),
+        "create_prescriptions[100]": lambda db, rng: PrescriptionService.create_prescriptions(
+            db, create_batch(rng, 100)
+        ),
+        "get_prescription": lambda db, rng: PrescriptionService.get_prescription(
+            db, random_prescription_id(rng, id_ranges)
+        ),
+        "get_prescriptions": lambda db, rng: PrescriptionService.get_prescriptions(
+            db, skip=rng.randint(0, 1000), limit=100
+        ),
+        "get_prescriptions[medication]": lambda db, rng: PrescriptionService.get_prescriptions(
+            db, medication="Paracetamol", limit=100
+        ),
+        "get_prescriptions_by_patient": lambda db, rng: PrescriptionService.get_prescriptions_by_patient(
+            db, rng.randint(1, patients)
+        ),
+        "get_prescriptions_by_doctor": lambda db, rng: PrescriptionService.get_prescriptions_by_doctor(
+            db, rng.randint(1, doctors), limit=500
+        ),
+        "get_prescriptions_by_appointment": lambda db, rng: PrescriptionService.get_prescriptions_by_appointment(
+            db, str(rng.randint(1, appointments))
+        ),
+    }
+
+    results = {}
+    for name, call in operations.items():
+        summary = _time(in_session(call), iterations)
+        key = f"service:{name}"
+        results[key] = summary
+        print(f"  {key}: p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms")
+    return results
@@ -0,0 +1,33 @@
+import math
+from typing import List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies_ms: List[float], wall_seconds: float, errors: int = 0) -> dict:
+    """
+    Summarize a benchmark run
+
+    Args:
+        latencies_ms: Latency of each successful operation, in milliseconds
+        wall_seconds: Wall time of the whole run
+        errors: Number of failed operations
+
+    Returns:
+        Dictionary with throughput and p50/p95/p99 latency
+    """
+    return {
+        "operations": len(latencies_ms),
+        "errors": errors,
+        "throughput_ops": round(len(latencies_ms) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+    }
@@ -0,0 +1,67 @@
+import argparse
+import gzip
+import json
+import time
+from typing import Callable
+
+from benchmarks.datasets import generate_rows
+from benchmarks.stats import summarize
+
+
+def _time(operation: Callable[[], object], iterations: int) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        op_start = time.perf_counter()
+        operation()
+        latencies.append((time.perf_counter() - op_start) * 1000)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run_wire_benchmarks(iterations: int, page_size: int = 500) -> dict:
+    """
+    Compare the negotiated response formats on one page of prescriptions
+
+    Encoding goes through the same code as the routes; plain JSON is what
+    FastAPI sends for a PrescriptionListResponse today. Decoding is what a
+    Python client does with the body. MessagePack formats are skipped when
+    msgpack is not installed.
+
+    Returns:
+        Mapping of "wire:<media type>:encode|decode" -> summary, with the
+        encoded and gzipped body sizes on the encode entries
+    """
+    from app.schemas.prescription import PrescriptionListResponse
+    from app.utils.wire_format import MSGPACK_MEDIA_TYPES, available_media_types, msgpack, render
+
+    page = PrescriptionListResponse(total=page_size, prescriptions=list(generate_rows(page_size)))
+
+    results = {}
+    for media_type in available_media_types():
+        body = render(page, PrescriptionListResponse, media_type)
+        if media_type in MSGPACK_MEDIA_TYPES:
+            decode = lambda: msgpack.unpackb(body)
+        else:
+            decode = lambda: json.loads(body)
+
+        encode_summary = _time(lambda: render(page, PrescriptionListResponse, media_type), iterations)
+        encode_summary["bytes"] = len(body)
+        encode_summary["gzip_bytes"] = len(gzip.compress(body))
+        decode_summary = _time(decode, iterations)
+
+        results[f"wire:{media_type}:encode"] = encode_summary
+        results[f"wire:{media_type}:decode"] = decode_summary
+        print(
+            f"  {media_type} [{page_size} rows]: {len(body)} bytes ({encode_summary['gzip_bytes']} gzipped), "
+            f"encode p50={encode_summary['p50_ms']}ms, decode p50={decode_summary['p50_ms']}ms"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Response wire format benchmark")
+    parser.add_argument("--iterations", type=int, default=200, help="Encodes and decodes per format")
+    parser.add_argument("--page-size", type=int, default=500, help="Prescriptions per response")
+    args = parser.parse_args()
+
+    run_wire_benchmarks(args.iterations, args.page_size)
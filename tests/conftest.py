@@ -0,0 +1,37 @@
+"""
+Test configuration: the app runs against three SQLite files standing in for prescription shards
+"""
+
+import os
+import tempfile
+
+# Must be set before any app module creates its engines
+SHARD_DIR = tempfile.mkdtemp(prefix="hms-shards-")
+os.environ["SHARD_DATABASE_URLS"] = ",".join(
+    f"sqlite:///{os.path.join(SHARD_DIR, f'shard{shard_id}.db')}" for shard_id in range(3)
+)
+
+# Imported only now, so the engines are created for the shards above
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+@pytest.fixture(scope="module")
+def client():
+    """Test client for the app; starting it creates the shard schemas"""
+    with TestClient(app) as client:
+        yield client
+
+
+def prescription_body(patient_id: int, days: int = 5) -> dict:
+    """JSON body creating a prescription for a patient"""
+    return {
+        "appointment_id": f"TEST-{patient_id}",
+        "patient_id": patient_id,
+        "doctor_id": 9301,
+        "medication": "Testomycin",
+        "dosage": "1-0-1",
+        "days": days
+    }
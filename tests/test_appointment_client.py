@@ -0,0 +1,222 @@
+"""
+Tests for the appointment validation client, against a local stub appointment service
+"""
+
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import pytest
+
+from app.services.appointment_client import AppointmentServiceUnavailableError, AppointmentValidator
+
+
+class StubAppointmentService:
+    """
+    Stub appointment service: APPT-* exist, anything else is 404, and it can be taken down
+
+    Paths outside /appointments/ (such as /health) answer 200.
+    """
+
+    def __init__(self):
+        self.requests = Counter()
+        self.down = False
+        self.delay = 0.0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                prefix, _, segment = self.path.partition("/appointments/")
+                appointment_id = unquote(segment)
+                stub.requests[appointment_id if not prefix else self.path] += 1
+                time.sleep(stub.delay)
+                if stub.down:
+                    status = 500
+                elif prefix:
+                    status = 200
+                elif appointment_id.startswith("APPT") and appointment_id.replace("-", "").isalnum():
+                    status = 200
+                else:
+                    status = 404
+                body = b"{}"
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    with StubAppointmentService() as service:
+        yield service
+
+
+def make_validator(url, **overrides):
+    options = dict(
+        base_url=url,
+        timeout_seconds=2.0,
+        cache_ttl_seconds=60,
+        negative_cache_ttl_seconds=0.2,
+        cache_size=100,
+        pool_size=8,
+        failure_threshold=2,
+        reset_seconds=0.3,
+        fail_open=False
+    )
+    options.update(overrides)
+    return AppointmentValidator(**options)
+
+
+def test_disabled_without_url():
+    validator = make_validator(None)
+    assert validator.exists("anything") is True
+    assert validator.validate_many(["a", "b"]) == {"a": True, "b": True}
+
+
+def test_positive_results_are_cached(stub):
+    validator = make_validator(stub.url)
+    try:
+        assert validator.exists("APPT-1") is True
+        assert validator.exists("APPT-1") is True
+        assert stub.requests["APPT-1"] == 1
+    finally:
+        validator.close()
+
+
+def test_negative_results_are_cached_briefly(stub):
+    validator = make_validator(stub.url)
+    try:
+        assert validator.exists("MISSING") is False
+        assert validator.exists("MISSING") is False
+        assert stub.requests["MISSING"] == 1
+
+        time.sleep(0.3)
+        assert validator.exists("MISSING") is False
+        assert stub.requests["MISSING"] == 2
+    finally:
+        validator.close()
+
+
+def test_concurrent_lookups_are_deduplicated(stub):
+    stub.delay = 0.2
+    validator = make_validator(stub.url)
+    try:
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            results = list(executor.map(lambda _: validator.exists("APPT-2"), range(10)))
+        assert results == [True] * 10
+        assert stub.requests["APPT-2"] == 1
+    finally:
+        validator.close()
+
+
+def test_validate_many_batches_and_dedupes(stub):
+    validator = make_validator(stub.url)
+    try:
+        validator.exists("APPT-3")
+        results = validator.validate_many(["APPT-3", "APPT-4", "APPT-4", "NOPE"])
+        assert results == {"APPT-3": True, "APPT-4": True, "NOPE": False}
+        assert stub.requests == Counter({"APPT-3": 1, "APPT-4": 1, "NOPE": 1})
+    finally:
+        validator.close()
+
+
+def test_circuit_breaker_fails_closed_and_recovers(stub):
+    stub.down = True
+    validator = make_validator(stub.url)
+    try:
+        for _ in range(2):
+            with pytest.raises(AppointmentServiceUnavailableError):
+                validator.exists("APPT-5")
+        assert validator.breaker.state == "open"
+
+        # Open circuit: rejected without calling the service
+        with pytest.raises(AppointmentServiceUnavailableError):
+            validator.exists("APPT-5")
+        assert stub.requests["APPT-5"] == 2
+
+        stub.down = False
+        time.sleep(0.35)
+        assert validator.exists("APPT-5") is True
+        assert validator.breaker.state == "closed"
+    finally:
+        validator.close()
+
+
+def test_circuit_breaker_fail_open_accepts(stub):
+    stub.down = True
+    validator = make_validator(stub.url, fail_open=True)
+    try:
+        assert validator.exists("APPT-6") is True
+        assert validator.exists("APPT-6") is True
+        assert validator.exists("APPT-6") is True
+        assert stub.requests["APPT-6"] == 2
+    finally:
+        validator.close()
+
+
+def test_unreachable_service_counts_as_failure():
+    validator = make_validator("http://127.0.0.1:9", timeout_seconds=0.5, fail_open=True)
+    try:
+        assert validator.exists("APPT-7") is True
+        assert validator.exists("APPT-8") is True
+        assert validator.breaker.state == "open"
+    finally:
+        validator.close()
+
+
+@pytest.mark.parametrize("appointment_id", ["../health", "APPT-9/../../health", "X?y=1", "a#b", "APPT-9?x"])
+def test_appointment_ids_stay_in_one_path_segment(stub, appointment_id):
+    validator = make_validator(stub.url)
+    try:
+        assert validator.exists(appointment_id) is False
+        assert stub.requests[appointment_id] == 1
+    finally:
+        validator.close()
+
+
+def test_unexpected_error_releases_half_open_trial(stub, monkeypatch):
+    stub.down = True
+    validator = make_validator(stub.url)
+    try:
+        for _ in range(2):
+            with pytest.raises(AppointmentServiceUnavailableError):
+                validator.exists("APPT-10")
+        time.sleep(0.35)
+        assert validator.breaker.state == "half_open"
+
+        def broken_client():
+            raise RuntimeError("client misconfigured")
+
+        monkeypatch.setattr(validator, "_get_client", broken_client)
+        with pytest.raises(RuntimeError):
+            validator.exists("APPT-10")
+        monkeypatch.undo()
+
+        # The failed trial reopened the circuit; the next trial goes through again
+        stub.down = False
+        time.sleep(0.35)
+        assert validator.exists("APPT-10") is True
+        assert validator.breaker.state == "closed"
+    finally:
+        validator.close()
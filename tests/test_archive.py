@@ -0,0 +1,124 @@
+"""
+Tests for cold-data archival and monthly partition maintenance
+"""
+
+import json
+import os
+from datetime import date, datetime
+
+import pytest
+
+import app.services.archive_service as archive_service
+from app.database import HOME_SHARD, SessionLocal, shard_for_patient
+from app.models.prescription import Prescription
+from app.schemas.prescription import PrescriptionCreate
+from app.services.archive_service import INDEX_SUFFIX, ArchiveService, _load_file_index
+from app.services.partition_service import PartitionService
+from app.services.prescription_service import PrescriptionService
+from app.services.rollup_service import RollupService
+
+API_PREFIX = "/api/v1/prescriptions"
+HOME_PATIENTS = [patient_id for patient_id in range(9600, 9700) if shard_for_patient(patient_id) == HOME_SHARD]
+
+
+def create(patient_id: int, issued_at: datetime, doctor_id: int = 9601) -> int:
+    db = SessionLocal()
+    try:
+        return PrescriptionService.create_prescriptions(db, [PrescriptionCreate(
+            appointment_id=f"ARCHIVE-{patient_id}-{issued_at:%Y%m%d}",
+            patient_id=patient_id,
+            doctor_id=doctor_id,
+            medication="Archivol",
+            dosage="1-0-1",
+            days=3,
+            issued_at=issued_at
+        )])[0].prescription_id
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def db(client):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_table_archive_keeps_prescriptions_readable(client, db):
+    ids = [create(patient_id, datetime(2014, 6, 2 + n, 9)) for n, patient_id in enumerate(HOME_PATIENTS[:3])]
+
+    records = ArchiveService.archive_before(db, date(2015, 1, 1), mode="table", chunk_size=2)
+
+    assert [(record.partition_name, record.row_count) for record in records] == [("p201406", 3)]
+    assert db.query(Prescription).filter(Prescription.prescription_id.in_(ids)).count() == 0
+    for prescription_id in ids:
+        response = client.get(f"{API_PREFIX}/{prescription_id}")
+        assert response.status_code == 200
+        assert response.json()["medication"] == "Archivol"
+
+
+def test_file_archive_reads_one_chunk_per_lookup(client, db, tmp_path, monkeypatch):
+    march = [create(patient_id, datetime(2015, 3, 2 + n, 9)) for n, patient_id in enumerate(HOME_PATIENTS[3:8])]
+    april = [create(patient_id, datetime(2015, 4, 2 + n, 9)) for n, patient_id in enumerate(HOME_PATIENTS[8:10])]
+
+    records = ArchiveService.archive_before(db, date(2015, 6, 1), mode="file", archive_dir=str(tmp_path), chunk_size=2)
+
+    assert [(record.partition_name, record.row_count) for record in records] == [("p201503", 5), ("p201504", 2)]
+    with open(records[0].location + INDEX_SUFFIX, encoding="utf-8") as file:
+        members = json.load(file)["members"]
+    assert [member[0] for member in members] == [march[0], march[2], march[4]]
+
+    # Indexed lookups never scan the whole file
+    def no_full_scan(*args, **kwargs):
+        raise AssertionError("Archive file was scanned")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(archive_service.gzip, "open", no_full_scan)
+        for prescription_id in march + april:
+            response = client.get(f"{API_PREFIX}/{prescription_id}")
+            assert response.status_code == 200
+            assert response.json()["prescription_id"] == prescription_id
+        assert ArchiveService._read_from_file(db, records[0].location, march[0] - 1) is None
+
+    # Files archived without an index are still scanned
+    os.remove(records[0].location + INDEX_SUFFIX)
+    _load_file_index.cache_clear()
+    assert ArchiveService._read_from_file(db, records[0].location, march[3]).prescription_id == march[3]
+
+
+def test_rebuild_keeps_rollups_of_archived_months(client, db):
+    create(HOME_PATIENTS[10], datetime(2016, 1, 4, 9), doctor_id=9602)
+    create(HOME_PATIENTS[11], datetime(2024, 6, 3, 9), doctor_id=9602)
+    ArchiveService.archive_before(db, date(2016, 2, 1), mode="table")
+
+    def daily_counts():
+        response = client.get("/api/v1/dashboards/doctors/9602/daily")
+        return {row["day"]: row["prescription_count"] for row in response.json()["days"]}
+
+    assert daily_counts() == {"2016-01-04": 1, "2024-06-03": 1}
+    RollupService.rebuild(db, chunk_size=2)
+    assert daily_counts() == {"2016-01-04": 1, "2024-06-03": 1}
+
+
+class RecordingSession:
+    """Stands in for a MySQL session, recording the DDL it is given"""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+
+
+def test_missed_months_get_their_own_partitions(monkeypatch):
+    monkeypatch.setattr(PartitionService, "is_supported", staticmethod(lambda db: True))
+    monkeypatch.setattr(PartitionService, "get_partitions", staticmethod(lambda db: ["p202401", "p202402", "pmax"]))
+    db = RecordingSession()
+
+    created = PartitionService.ensure_partitions(db, months_ahead=1, today=date(2024, 5, 15))
+
+    assert created == ["p202403", "p202404", "p202405", "p202406"]
+    assert "PARTITION p202403 VALUES LESS THAN ('2024-04-01')" in db.statements[0]
+    assert PartitionService.ensure_partitions(db, months_ahead=0, today=date(2024, 2, 10)) == []
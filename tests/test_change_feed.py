@@ -0,0 +1,126 @@
+"""
+Tests for change feed gap handling and long-polling
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func
+
+import app.services.change_feed_service as change_feed_service
+from app.database import HOME_SHARD, SessionLocal, shard_id_base, shard_sessions
+from app.models.change_log import PrescriptionChange
+from app.services.change_feed_service import CREATED, ChangeFeedService, GapTracker, change_gaps, format_cursor
+
+API_PREFIX = "/api/v1/prescriptions"
+
+
+@pytest.fixture
+def db(client):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def latest_change_ids() -> list:
+    """Cursor positions at the current end of every shard's change log"""
+    positions = []
+    for shard_id, make_session in enumerate(shard_sessions):
+        session = make_session()
+        try:
+            latest = session.query(func.max(PrescriptionChange.change_id)).scalar()
+        finally:
+            session.close()
+        positions.append(latest or shard_id_base(shard_id))
+    return positions
+
+
+def add_change(db, change_id: int):
+    """Commit a change with an explicit ID, as if its transaction committed out of order"""
+    db.add(PrescriptionChange(change_id=change_id, prescription_id=change_id, change_type=CREATED, changed_at=datetime.utcnow()))
+    db.commit()
+
+
+def test_gap_settles_from_when_it_was_first_seen(monkeypatch):
+    tracker = GapTracker(settle_seconds=2, max_gaps=2)
+    now = [100.0]
+    monkeypatch.setattr(change_feed_service.time, "monotonic", lambda: now[0])
+
+    assert not tracker.is_settled(0, 10)
+    now[0] += 1.5
+    assert not tracker.is_settled(0, 10)
+    assert tracker.seconds_until_settled() == pytest.approx(0.5)
+    now[0] += 0.5
+    assert tracker.is_settled(0, 10)
+    assert tracker.seconds_until_settled() is None
+
+    # A gap first seen later waits the full window, however old its neighbours are
+    assert not tracker.is_settled(1, 10)
+    assert not tracker.is_settled(0, 20)
+    assert list(tracker._first_seen) == [(1, 10), (0, 20)]
+
+
+def test_changes_after_an_uncommitted_id_are_held_back(db):
+    since = latest_change_ids()[HOME_SHARD]
+
+    add_change(db, since + 1)
+    add_change(db, since + 3)
+    assert [change.change_id for change in ChangeFeedService.get_changes(db, since)] == [since + 1]
+
+    # The in-flight insert commits
+    add_change(db, since + 2)
+    assert [change.change_id for change in ChangeFeedService.get_changes(db, since)] == [since + 1, since + 2, since + 3]
+
+
+def test_long_poll_wakes_when_a_gap_settles(client, db, monkeypatch):
+    monkeypatch.setattr(change_gaps, "settle_seconds", 0.3)
+    cursor = latest_change_ids()
+    since = cursor[HOME_SHARD]
+
+    # since + 2 is rolled back and never appears
+    add_change(db, since + 1)
+    add_change(db, since + 3)
+
+    response = client.get(f"{API_PREFIX}/changes", params={"since": format_cursor(cursor), "wait": 10}).json()
+    assert [change["change_id"] for change in response["changes"]] == [since + 1]
+
+    start = time.monotonic()
+    response = client.get(f"{API_PREFIX}/changes", params={"since": response["next_cursor"], "wait": 10}).json()
+    assert [change["change_id"] for change in response["changes"]] == [since + 3]
+    assert time.monotonic() - start < 5
+
+
+def test_long_poll_times_out_without_changes(client):
+    cursor = format_cursor(latest_change_ids())
+
+    start = time.monotonic()
+    response = client.get(f"{API_PREFIX}/changes", params={"since": cursor, "wait": 0.3}).json()
+    assert response == {"changes": [], "next_cursor": cursor}
+    assert time.monotonic() - start >= 0.3
+
+
+def test_long_poll_returns_when_a_prescription_is_created(client):
+    cursor = format_cursor(latest_change_ids())
+    body = {
+        "appointment_id": "FEED-1",
+        "patient_id": 8501,
+        "doctor_id": 9701,
+        "medication": "Feedomycin",
+        "dosage": "1-0-1",
+        "days": 2
+    }
+
+    timer = threading.Timer(0.3, lambda: client.post(f"{API_PREFIX}/", json=body))
+    timer.start()
+    try:
+        start = time.monotonic()
+        response = client.get(f"{API_PREFIX}/changes", params={"since": cursor, "wait": 10}).json()
+    finally:
+        timer.join()
+
+    assert [change["prescription"]["patient_id"] for change in response["changes"]] == [8501]
+    assert time.monotonic() - start < 5
@@ -0,0 +1,139 @@
+"""
+Tests for request tracing, the slow request buffer and the sampling profiler
+"""
+
+import json
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import app.routes.admin as admin_routes
+from app.database import SessionLocal, shard_engines
+from app.utils.profiler import SamplingProfiler, profiler
+from app.utils.request_trace import REDACTED, RequestTrace, request_trace_var, slow_request_recorder
+
+API_PREFIX = "/api/v1"
+ADMIN_HEADERS = {"X-Admin-Token": "diagnostics-token"}
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    monkeypatch.setattr(admin_routes.settings, "ADMIN_TOKEN", ADMIN_HEADERS["X-Admin-Token"])
+    monkeypatch.setattr(slow_request_recorder, "threshold_ms", 0)
+    monkeypatch.setattr(profiler, "sample_rate", 0.0)
+    monkeypatch.setattr(profiler, "interval_ms", profiler.interval_ms)
+    slow_request_recorder.clear()
+    yield
+    slow_request_recorder.clear()
+    profiler.reset()
+
+
+@pytest.fixture
+def trace():
+    trace = RequestTrace(correlation_id="test", method="GET", params={})
+    token = request_trace_var.set(trace)
+    yield trace
+    request_trace_var.reset(token)
+
+
+def test_admin_endpoints_require_the_token(client, monkeypatch):
+    assert client.get(f"{API_PREFIX}/admin/slow-requests").status_code == 403
+
+    monkeypatch.setattr(admin_routes.settings, "ADMIN_TOKEN", "diagnostics-token")
+    assert client.get(f"{API_PREFIX}/admin/slow-requests").status_code == 401
+    assert client.get(f"{API_PREFIX}/admin/slow-requests", headers={"X-Admin-Token": "wrong"}).status_code == 401
+    assert client.get(f"{API_PREFIX}/admin/slow-requests", headers=ADMIN_HEADERS).status_code == 200
+
+
+def test_slow_requests_are_recorded_without_identifiers(client, admin):
+    assert client.get(f"{API_PREFIX}/prescriptions/patient/8123", params={"limit": 5}).status_code == 200
+
+    response = client.get(f"{API_PREFIX}/admin/slow-requests", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    records = [
+        record for record in response.json()["requests"]
+        if record["route"] == "/api/v1/prescriptions/patient/{patient_id}"
+    ]
+    assert len(records) == 1
+    record = records[0]
+    assert record["params"] == {"limit": "5", "patient_id": REDACTED}
+    assert "8123" not in json.dumps(record)
+    assert record["status_code"] == 200
+    assert record["statement_count"] == len(record["statements"]) > 0
+    assert record["sql_ms"] > 0
+
+    assert client.delete(f"{API_PREFIX}/admin/slow-requests", headers=ADMIN_HEADERS).status_code == 204
+    # Only the DELETE itself has been recorded since
+    remaining = client.get(f"{API_PREFIX}/admin/slow-requests", headers=ADMIN_HEADERS).json()["requests"]
+    assert [(record["method"], record["route"]) for record in remaining] == [("DELETE", "/api/v1/admin/slow-requests")]
+
+
+def test_pool_checkout_is_timed(trace):
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+    finally:
+        db.close()
+
+    assert trace.pool_wait_ms > 0
+    assert [statement["statement"] for statement in trace.statements] == ["SELECT 1"]
+
+
+def test_failed_statements_do_not_leave_timers_behind(trace):
+    with shard_engines[0].connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM no_such_table"))
+        assert "query_start" not in conn.info
+
+        conn.execute(text("SELECT 2"))
+
+    assert [statement["statement"] for statement in trace.statements] == ["SELECT 2"]
+
+
+def busy_request(stop: threading.Event):
+    while not stop.is_set():
+        time.sleep(0.001)
+
+
+def test_profiler_samples_the_request_thread():
+    sampler = SamplingProfiler(sample_rate=1.0, interval_ms=1)
+    trace = RequestTrace(correlation_id="test", method="GET", params={}, profiled=True)
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_request, args=(stop,))
+    worker.start()
+    try:
+        trace.threads.add(worker.ident)
+        sampler.start(trace)
+        time.sleep(0.1)
+        sampler.stop(trace)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert any("busy_request" in stack for stack in trace.profile)
+    assert "busy_request" in sampler.folded()
+    assert "busy_request" in trace.to_dict()["profile"]
+
+
+def test_profiler_is_switched_at_runtime(client, admin):
+    response = client.put(
+        f"{API_PREFIX}/admin/profiler",
+        json={"sample_rate": 1.0, "interval_ms": 1},
+        headers=ADMIN_HEADERS
+    )
+    assert response.json() == {"sample_rate": 1.0, "interval_ms": 1.0}
+    assert client.get(f"{API_PREFIX}/admin/profiler", headers=ADMIN_HEADERS).json()["sample_rate"] == 1.0
+    assert client.put(f"{API_PREFIX}/admin/profiler", json={"sample_rate": 2}, headers=ADMIN_HEADERS).status_code == 422
+
+    client.get(f"{API_PREFIX}/prescriptions/doctor/1")
+    profile = client.get(f"{API_PREFIX}/admin/profile", headers=ADMIN_HEADERS)
+    assert profile.status_code == 200
+    assert profile.headers["content-type"].startswith("text/plain")
+
+    # Switched off first, so clearing is not itself sampled
+    client.put(f"{API_PREFIX}/admin/profiler", json={"sample_rate": 0}, headers=ADMIN_HEADERS)
+    assert client.delete(f"{API_PREFIX}/admin/profile", headers=ADMIN_HEADERS).status_code == 204
+    assert profiler.folded() == ""
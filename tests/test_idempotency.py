@@ -0,0 +1,103 @@
+"""
+Tests for Idempotency-Key handling on prescription creation
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+import app.routes.prescription as prescription_routes
+from app.database import SHARD_COUNT, session_shard, shard_for_patient, shard_sessions
+from app.models.idempotency import IdempotencyKey
+from app.services.idempotency_service import IdempotencyService, idempotency_cache
+from tests.conftest import prescription_body
+
+API_PREFIX = "/api/v1/prescriptions"
+
+
+def test_retry_returns_the_original_response(client):
+    headers = {"Idempotency-Key": "idem-retry"}
+    first = client.post(f"{API_PREFIX}/", json=prescription_body(8101), headers=headers)
+    idempotency_cache.clear()
+    retry = client.post(f"{API_PREFIX}/", json=prescription_body(8101), headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert client.get(f"{API_PREFIX}/patient/8101").json()["total"] == 1
+
+
+def test_reused_key_with_different_body_is_rejected(client):
+    headers = {"Idempotency-Key": "idem-mismatch"}
+    assert client.post(f"{API_PREFIX}/", json=prescription_body(8102), headers=headers).status_code == 201
+    idempotency_cache.clear()
+
+    response = client.post(f"{API_PREFIX}/", json=prescription_body(8102, days=9), headers=headers)
+    assert response.status_code == 422
+
+
+def test_key_is_read_on_the_patients_shard_only(client, monkeypatch):
+    assert SHARD_COUNT > 1
+    headers = {"Idempotency-Key": "idem-one-shard"}
+    assert client.post(f"{API_PREFIX}/", json=prescription_body(8103), headers=headers).status_code == 201
+    idempotency_cache.clear()
+
+    reads = []
+    get = Session.get
+
+    def counting_get(self, entity, ident, **kwargs):
+        if entity is IdempotencyKey:
+            reads.append(session_shard(self))
+        return get(self, entity, ident, **kwargs)
+
+    monkeypatch.setattr(Session, "get", counting_get)
+    retry = client.post(f"{API_PREFIX}/", json=prescription_body(8103), headers=headers)
+
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert reads == [shard_for_patient(8103)]
+
+
+def test_concurrent_insert_with_same_key_is_replayed(client, monkeypatch):
+    headers = {"Idempotency-Key": "idem-race"}
+    first = client.post(f"{API_PREFIX}/", json=prescription_body(8104), headers=headers)
+    idempotency_cache.clear()
+
+    # The retry misses the key on its first lookup, as if the original had not committed yet
+    lookup = IdempotencyService.lookup
+    misses = iter([None])
+    monkeypatch.setattr(
+        prescription_routes.IdempotencyService,
+        "lookup",
+        staticmethod(lambda db, key: next(misses, None) or lookup(db, key))
+    )
+
+    retry = client.post(f"{API_PREFIX}/", json=prescription_body(8104), headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert client.get(f"{API_PREFIX}/patient/8104").json()["total"] == 1
+
+
+def test_expired_key_is_replaced_when_reused(client):
+    key = "idem-expired"
+    db = shard_sessions[shard_for_patient(8105)]()
+    try:
+        db.add(IdempotencyKey(
+            idempotency_key=key,
+            request_hash="stale",
+            prescription_id=1,
+            status_code=201,
+            response_body="{}",
+            expires_at=datetime.utcnow() - timedelta(seconds=1)
+        ))
+        db.commit()
+        idempotency_cache.clear()
+
+        response = client.post(f"{API_PREFIX}/", json=prescription_body(8105), headers={"Idempotency-Key": key})
+        assert response.status_code == 201
+        assert "Idempotent-Replayed" not in response.headers
+
+        db.expire_all()
+        assert db.get(IdempotencyKey, key).prescription_id == response.json()["prescription_id"]
+    finally:
+        db.close()
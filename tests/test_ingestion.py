@@ -0,0 +1,148 @@
+"""
+Tests for batched (write-behind) prescription ingestion
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.routes.prescription as prescription_routes
+import app.services.ingestion_service as ingestion_service
+from app.database import HOME_SHARD, SessionLocal, shard_engines, shard_for_patient
+from app.models.idempotency import IdempotencyKey
+from app.services.appointment_client import AppointmentServiceUnavailableError
+from app.services.idempotency_service import idempotency_cache
+from app.services.ingestion_service import IngestionQueue
+from tests.conftest import prescription_body
+
+API_PREFIX = "/api/v1/prescriptions"
+# On the home shard the request's own session would be used for the key lookup
+HOME_PATIENTS = [patient_id for patient_id in range(8010, 8100) if shard_for_patient(patient_id) == HOME_SHARD]
+
+
+@pytest.fixture
+def ingestion(monkeypatch):
+    """Batched ingestion with a flush window long enough to retry while queued"""
+    queue = IngestionQueue(max_size=100, batch_size=50, flush_interval_ms=300, max_tracked_tickets=100)
+    queue.start()
+    monkeypatch.setattr(ingestion_service.settings, "INGESTION_MODE", "batched")
+    monkeypatch.setattr(prescription_routes, "ingestion_queue", queue)
+    yield queue
+    queue.stop()
+
+
+def set_ack(monkeypatch, ack: str):
+    monkeypatch.setattr(prescription_routes.settings, "INGESTION_ACK", ack)
+
+
+def wait_for_ticket(client, ticket_id: str) -> dict:
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        ticket = client.get(f"{API_PREFIX}/ingestion/{ticket_id}").json()
+        if ticket["status"] != "pending":
+            return ticket
+        time.sleep(0.05)
+    raise AssertionError("Ticket was not flushed")
+
+
+def test_retry_while_queued_shares_the_ticket(client, ingestion, monkeypatch):
+    set_ack(monkeypatch, "accepted")
+    headers = {"Idempotency-Key": "ingest-retry-1"}
+
+    first = client.post(f"{API_PREFIX}/", json=prescription_body(8001), headers=headers)
+    retry = client.post(f"{API_PREFIX}/", json=prescription_body(8001), headers=headers)
+    assert first.status_code == retry.status_code == 202
+    assert retry.json()["ticket_id"] == first.json()["ticket_id"]
+
+    ticket = wait_for_ticket(client, first.json()["ticket_id"])
+    assert ticket["status"] == "committed"
+
+    replay = client.post(f"{API_PREFIX}/", json=prescription_body(8001), headers=headers)
+    assert replay.status_code == 201
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json() == ticket["prescription"]
+    assert client.get(f"{API_PREFIX}/patient/8001").json()["total"] == 1
+
+
+def test_retry_with_different_body_while_queued_is_rejected(client, ingestion, monkeypatch):
+    set_ack(monkeypatch, "accepted")
+    headers = {"Idempotency-Key": "ingest-retry-2"}
+
+    assert client.post(f"{API_PREFIX}/", json=prescription_body(8002), headers=headers).status_code == 202
+    response = client.post(f"{API_PREFIX}/", json=prescription_body(8002, days=9), headers=headers)
+    assert response.status_code == 422
+
+
+def test_commit_ack_waits_for_the_group_commit(client, ingestion, monkeypatch):
+    set_ack(monkeypatch, "commit")
+
+    response = client.post(f"{API_PREFIX}/", json=prescription_body(8003))
+    assert response.status_code == 201
+    assert response.json()["patient_id"] == 8003
+
+
+@pytest.mark.parametrize("error, status_code", [
+    (ValueError("Appointment not found: INGEST-8004"), 400),
+    (AppointmentServiceUnavailableError("Appointment service unavailable: HTTP 500"), 503),
+    (RuntimeError("disk full"), 500),
+])
+def test_worker_errors_keep_their_status(client, ingestion, monkeypatch, error, status_code):
+    set_ack(monkeypatch, "commit")
+
+    def failing_write(db, batch):
+        raise error
+
+    monkeypatch.setattr(ingestion, "_write", failing_write)
+    response = client.post(f"{API_PREFIX}/", json=prescription_body(8004))
+    assert response.status_code == status_code
+    assert str(error) in response.json()["detail"]
+
+
+def checked_out_connections() -> int:
+    return sum(shard_engine.pool.checkedout() for shard_engine in shard_engines)
+
+
+def test_keyed_requests_do_not_hold_a_connection_while_queued(client, ingestion, monkeypatch):
+    set_ack(monkeypatch, "commit")
+    before = checked_out_connections()
+    during = []
+    write = ingestion._write
+
+    def observing_write(db, batch):
+        during.append(checked_out_connections())
+        return write(db, batch)
+
+    monkeypatch.setattr(ingestion, "_write", observing_write)
+    patient_id = HOME_PATIENTS[0]
+    response = client.post(f"{API_PREFIX}/", json=prescription_body(patient_id), headers={"Idempotency-Key": "ingest-pool"})
+
+    assert response.status_code == 201
+    assert during == [before]
+
+
+def test_expired_key_is_replaced_by_the_group_commit(client, ingestion, monkeypatch):
+    set_ack(monkeypatch, "commit")
+    patient_id = HOME_PATIENTS[1]
+    key = "ingest-expired"
+    db = SessionLocal()
+    try:
+        db.add(IdempotencyKey(
+            idempotency_key=key,
+            request_hash="stale",
+            prescription_id=1,
+            status_code=201,
+            response_body="{}",
+            expires_at=datetime.utcnow() - timedelta(seconds=1)
+        ))
+        db.commit()
+        idempotency_cache.clear()
+
+        response = client.post(f"{API_PREFIX}/", json=prescription_body(patient_id), headers={"Idempotency-Key": key})
+        assert response.status_code == 201
+
+        record = db.get(IdempotencyKey, key)
+        assert record.prescription_id == response.json()["prescription_id"]
+        assert record.expires_at > datetime.utcnow()
+    finally:
+        db.close()
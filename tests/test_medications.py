@@ -0,0 +1,158 @@
+"""
+Tests for the medications dictionary, its in-memory index and the column migration
+"""
+
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, func, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import SessionLocal, shard_sessions
+from app.models.medication import Medication
+from app.models.prescription import Prescription
+from app.models.rollup import MedicationDailyRollup
+from app.services.medication_service import MedicationIndex, MedicationService, medication_index
+from app.utils.medication_migration import migrate_shard
+from app.utils.medications import report_medication_savings
+from tests.conftest import prescription_body
+
+LEGACY_SCHEMA = [
+    """
+    CREATE TABLE prescriptions (
+        prescription_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        appointment_id VARCHAR(50) NOT NULL,
+        patient_id INTEGER NOT NULL,
+        doctor_id INTEGER NOT NULL,
+        medication VARCHAR(255) NOT NULL,
+        dosage VARCHAR(50) NOT NULL,
+        days INTEGER NOT NULL,
+        issued_at DATETIME NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE rollup_medication_daily (
+        medication VARCHAR(255) NOT NULL,
+        day DATE NOT NULL,
+        prescription_count INTEGER NOT NULL,
+        total_days INTEGER NOT NULL,
+        PRIMARY KEY (medication, day)
+    )
+    """,
+]
+
+
+@pytest.fixture(scope="module")
+def db(client):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_index_searches_prefixes_in_order():
+    index = MedicationIndex(refresh_seconds=60)
+    for name_key, medication_id, name in [
+        ("paracetamol", 1, "Paracetamol"),
+        ("pantoprazole", 2, "Pantoprazole"),
+        ("amoxicillin", 3, "Amoxicillin"),
+        ("paroxetine", 4, "Paroxetine"),
+    ]:
+        index.add(name_key, medication_id, name)
+    index.add("paracetamol", 99, "Paracetamol")
+
+    assert index.get_id("paracetamol") == 1
+    assert index.get_id("ibuprofen") is None
+    assert index.search("PA") == [(2, "Pantoprazole"), (1, "Paracetamol"), (4, "Paroxetine")]
+    assert index.search("par", limit=1) == [(1, "Paracetamol")]
+    assert index.search("zz") == []
+
+
+def test_names_are_matched_after_normalization(db):
+    ids = MedicationService.get_or_create_many(db, ["  Normalo   Forte ", "normalo forte", "Normalo Mite"])
+    db.commit()
+
+    assert set(ids) == {"normalo forte", "normalo mite"}
+    medication = db.get(Medication, ids["normalo forte"])
+    assert medication.name == "Normalo Forte"
+    assert MedicationService.resolve_id(db, "NORMALO  FORTE") == ids["normalo forte"]
+    assert MedicationService.search(db, "normalo") == [
+        (ids["normalo forte"], "Normalo Forte"),
+        (ids["normalo mite"], "Normalo Mite"),
+    ]
+
+
+def test_rolled_back_medications_are_not_indexed(db):
+    MedicationService.get_or_create(db, "Phantomycin")
+    db.rollback()
+
+    assert medication_index.get_id("phantomycin") is None
+
+
+def test_savings_report_times_both_indexed_filters(db):
+    MedicationService.get_or_create(db, "Reportamol")
+    db.commit()
+
+    for _ in range(2):
+        report = report_medication_savings(iterations=2)
+        assert report["integer_filter_ms"] is not None
+        assert report["name_filter_ms"] is not None
+    assert "index_bytes_saved" not in report
+
+
+def test_savings_report_covers_every_shard(client, db):
+    for patient_id in range(9700, 9720):
+        response = client.post("/api/v1/prescriptions/", json=prescription_body(patient_id))
+        assert response.status_code == 201
+
+    counts = []
+    for make_session in shard_sessions:
+        shard_db = make_session()
+        try:
+            counts.append(shard_db.query(func.count(Prescription.prescription_id)).scalar())
+        finally:
+            shard_db.close()
+    assert all(count > 0 for count in counts)
+
+    report = report_medication_savings(iterations=1)
+    assert report["prescriptions"] == sum(counts)
+    assert report["medications"] == db.query(func.count(Medication.medication_id)).scalar()
+
+
+def test_migration_backfills_medication_ids(db, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text(
+            "INSERT INTO prescriptions (appointment_id, patient_id, doctor_id, medication, dosage, days, issued_at) "
+            "VALUES (:appointment_id, 1, 2, :medication, '1-0-1', :days, '2024-05-01 09:00:00')"
+        ), [
+            {"appointment_id": "LEGACY-1", "medication": "Legacymol", "days": 3},
+            {"appointment_id": "LEGACY-2", "medication": " legacymol ", "days": 4},
+            {"appointment_id": "LEGACY-3", "medication": "Oldocillin", "days": 5},
+        ])
+        conn.execute(text("INSERT INTO rollup_medication_daily VALUES ('Legacymol', '2024-05-01', 1, 3)"))
+
+    shard_db = sessionmaker(bind=engine)()
+    try:
+        assert migrate_shard(db, shard_db, chunk_size=1) == 3
+
+        assert "medication" not in {column["name"] for column in inspect(engine).get_columns("prescriptions")}
+        prescriptions = shard_db.query(Prescription).order_by(Prescription.prescription_id).all()
+        assert [prescription.medication for prescription in prescriptions] == ["Legacymol", "Legacymol", "Oldocillin"]
+        legacymol = MedicationService.resolve_id(db, "legacymol")
+        assert prescriptions[0].medication_id == legacymol
+
+        rollups = {
+            (row.medication, row.day): (row.prescription_count, row.total_days)
+            for row in shard_db.query(MedicationDailyRollup).all()
+        }
+        assert rollups == {("Legacymol", date(2024, 5, 1)): (2, 7), ("Oldocillin", date(2024, 5, 1)): (1, 5)}
+
+        # Already migrated
+        assert migrate_shard(db, shard_db) == 0
+    finally:
+        shard_db.close()
+        engine.dispose()
@@ -0,0 +1,143 @@
+"""
+Tests for per-client token bucket rate limiting
+"""
+
+import pytest
+from starlette.requests import Request
+
+import app.utils.rate_limit as rate_limit_module
+from app.utils.rate_limit import LocalTokenBucketStore, RateLimiter, RedisTokenBucketStore
+
+API_PREFIX = "/api/v1/prescriptions"
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """A slow-refilling limiter with a bucket of 10 tokens per client"""
+    limiter = RateLimiter(
+        rate=0.5,
+        burst=10,
+        store=LocalTokenBucketStore(max_buckets=100),
+        rows_per_token=100,
+        route_costs={"GET /api/v1/prescriptions/{prescription_id}": 3},
+        api_keys=["integration-a", "integration-b"]
+    )
+    monkeypatch.setattr(rate_limit_module, "rate_limiter", limiter)
+    return limiter
+
+
+def test_bucket_refills_over_time(monkeypatch):
+    store = LocalTokenBucketStore(max_buckets=10)
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit_module.time, "monotonic", lambda: now[0])
+
+    assert store.take("client", 4, rate=2, burst=5) == 0
+    assert store.take("client", 4, rate=2, burst=5) == pytest.approx(1.5)
+    now[0] += 1.5
+    assert store.take("client", 4, rate=2, burst=5) == 0
+    # Other clients have their own bucket
+    assert store.take("other", 5, rate=2, burst=5) == 0
+
+
+def test_least_recently_used_buckets_are_evicted():
+    store = LocalTokenBucketStore(max_buckets=2)
+    for key in ("a", "b", "a", "c"):
+        store.take(key, 1, rate=1, burst=5)
+
+    assert list(store._buckets) == ["a", "c"]
+
+
+def test_cost_scales_with_requested_rows(limiter):
+    assert limiter.cost("GET /api/v1/prescriptions/", 0) == 1
+    assert limiter.cost("GET /api/v1/prescriptions/", 500) == 6
+    assert limiter.cost("GET /api/v1/prescriptions/{prescription_id}", 0) == 3
+    assert limiter.cost("GET /api/v1/prescriptions/", 5000) == limiter.burst
+
+
+def test_large_pages_are_limited_first(client, limiter):
+    headers = {"X-API-Key": "integration-a"}
+    for _ in range(3):
+        assert client.get(f"{API_PREFIX}/doctor/1", params={"limit": 200}, headers=headers).status_code == 200
+
+    response = client.get(f"{API_PREFIX}/doctor/1", params={"limit": 200}, headers=headers)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+    # Another API key is unaffected
+    response = client.get(f"{API_PREFIX}/doctor/1", params={"limit": 200}, headers={"X-API-Key": "integration-b"})
+    assert response.status_code == 200
+
+
+def test_admin_routes_are_not_limited(client, limiter, monkeypatch):
+    monkeypatch.setattr(limiter, "burst", 1)
+    for _ in range(3):
+        assert client.get("/api/v1/admin/slow-requests").status_code == 403
+
+
+def test_skipped_rows_are_charged(client, limiter):
+    headers = {"X-API-Key": "integration-a"}
+    # 1 + (400 + 100) / 100 tokens
+    assert client.get(f"{API_PREFIX}/doctor/1", params={"skip": 400, "limit": 100}, headers=headers).status_code == 200
+    assert client.get(f"{API_PREFIX}/doctor/1", params={"skip": 400, "limit": 100}, headers=headers).status_code == 429
+    # A keyset page costs only its limit
+    assert client.get(f"{API_PREFIX}/doctor/1", params={"after_id": 400, "limit": 100}, headers=headers).status_code == 200
+
+
+def test_unknown_api_keys_share_the_address_bucket(client, limiter):
+    for n in range(3):
+        response = client.get(f"{API_PREFIX}/doctor/1", params={"limit": 200}, headers={"X-API-Key": f"made-up-{n}"})
+        assert response.status_code == 200
+
+    response = client.get(f"{API_PREFIX}/doctor/1", params={"limit": 200}, headers={"X-API-Key": "made-up-3"})
+    assert response.status_code == 429
+
+
+def make_request(headers: dict) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": ("10.0.0.1", 50000),
+    })
+
+
+def test_client_address_is_read_from_the_trusted_header():
+    limiter = RateLimiter(
+        rate=1,
+        burst=1,
+        store=LocalTokenBucketStore(max_buckets=10),
+        rows_per_token=100,
+        route_costs={},
+        client_ip_header="X-Forwarded-For"
+    )
+
+    assert limiter.client_key(make_request({})) == "addr:10.0.0.1"
+    # Only the entry appended by the proxy is trusted
+    assert limiter.client_key(make_request({"X-Forwarded-For": "1.2.3.4, 203.0.113.7"})) == "addr:203.0.113.7"
+    assert limiter.client_key(make_request({"X-API-Key": "unknown", "X-Forwarded-For": "203.0.113.7"})) == "addr:203.0.113.7"
+
+
+def test_unreachable_redis_falls_back_without_retrying_every_request():
+    pytest.importorskip("redis")
+    fallback = LocalTokenBucketStore(max_buckets=10)
+    # Nothing listens on port 1, so every call fails with a RedisError
+    store = RedisTokenBucketStore("redis://127.0.0.1:1/0", timeout_seconds=0.1, retry_seconds=60, fallback=fallback)
+    calls = []
+    script = store._script
+
+    def counting_script(**kwargs):
+        calls.append(kwargs["keys"])
+        return script(**kwargs)
+
+    store._script = counting_script
+
+    assert store.take("client", 3, rate=0.1, burst=5) == 0
+    assert store.take("client", 3, rate=0.1, burst=5) > 0
+    assert len(calls) == 1
+    assert "client" in fallback._buckets
+
+    # Once the retry interval has passed Redis is tried again
+    store.breaker.reset_seconds = 0
+    store.take("client", 1, rate=0.1, burst=5)
+    assert len(calls) == 2
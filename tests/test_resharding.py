@@ -0,0 +1,94 @@
+"""
+Tests for moving prescriptions of an existing database onto their patients' shards
+"""
+
+from datetime import datetime
+
+from app.database import HOME_SHARD, SHARD_ID_SPACE, SessionLocal, shard_for_patient, shard_sessions
+from app.models.idempotency import IdempotencyKey
+from app.models.prescription import Prescription
+from app.models.relocation import RelocatedPrescription
+from app.schemas.prescription import PrescriptionCreate
+from app.services.idempotency_service import IdempotencyService, idempotency_cache
+from app.services.medication_service import MedicationService
+from app.services.rollup_service import RollupService
+from app.utils.resharding import reshard
+from tests.conftest import prescription_body
+
+API_PREFIX = "/api/v1/prescriptions"
+DOCTOR_ID = 9801
+OTHER_PATIENTS = [patient_id for patient_id in range(9800, 9900) if shard_for_patient(patient_id) != HOME_SHARD]
+
+
+def add_legacy_prescriptions(patient_ids: list) -> list:
+    """Write prescriptions to the home shard regardless of patient, as before sharding was enabled"""
+    db = SessionLocal()
+    try:
+        medication_id = MedicationService.get_or_create(db, "Legacycillin")
+        prescriptions = [
+            Prescription(
+                appointment_id=f"TEST-{patient_id}",
+                patient_id=patient_id,
+                doctor_id=DOCTOR_ID,
+                medication_id=medication_id,
+                dosage="1-0-1",
+                days=5,
+                issued_at=datetime(2024, 7, 1, 9)
+            )
+            for patient_id in patient_ids
+        ]
+        db.add_all(prescriptions)
+        RollupService.apply_prescriptions(db, prescriptions)
+        db.flush()
+        IdempotencyService.record(
+            db,
+            "legacy-key",
+            IdempotencyService.hash_request(PrescriptionCreate(**prescription_body(patient_ids[0]))),
+            prescriptions[0]
+        )
+        db.commit()
+        return [prescription.prescription_id for prescription in prescriptions]
+    finally:
+        db.close()
+
+
+def test_reshard_moves_prescriptions_to_their_patients_shard(client):
+    patient_ids = OTHER_PATIENTS[:3]
+    ids = add_legacy_prescriptions(patient_ids)
+    assert all(prescription_id < SHARD_ID_SPACE for prescription_id in ids)
+    assert client.get(f"{API_PREFIX}/patient/{patient_ids[0]}").json()["total"] == 0
+
+    assert reshard(chunk_size=2) >= len(ids)
+
+    for patient_id, prescription_id in zip(patient_ids, ids):
+        page = client.get(f"{API_PREFIX}/patient/{patient_id}").json()
+        assert [prescription["prescription_id"] for prescription in page["prescriptions"]] == [prescription_id]
+        # Legacy IDs still resolve, through the record left on the home shard
+        response = client.get(f"{API_PREFIX}/{prescription_id}")
+        assert response.status_code == 200
+        assert response.json()["patient_id"] == patient_id
+
+    db = SessionLocal()
+    try:
+        assert db.query(Prescription).filter(Prescription.prescription_id.in_(ids)).count() == 0
+        assert db.query(RelocatedPrescription).filter(RelocatedPrescription.prescription_id.in_(ids)).count() == 3
+        assert db.get(IdempotencyKey, "legacy-key") is None
+    finally:
+        db.close()
+
+    # The idempotency key moved with its prescription
+    idempotency_cache.clear()
+    replay = client.post(f"{API_PREFIX}/", json=prescription_body(patient_ids[0]), headers={"Idempotency-Key": "legacy-key"})
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json()["prescription_id"] == ids[0]
+
+    dashboard = client.get(f"/api/v1/dashboards/doctors/{DOCTOR_ID}/daily").json()
+    assert dashboard["total"] == 3
+    target = shard_sessions[shard_for_patient(patient_ids[0])]()
+    try:
+        assert target.query(Prescription).filter(Prescription.doctor_id == DOCTOR_ID).count() >= 1
+    finally:
+        target.close()
+
+    # Nothing is left to move
+    assert reshard() == 0
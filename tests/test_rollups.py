@@ -0,0 +1,117 @@
+"""
+Tests for the dashboard rollup tables and their rebuild
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+
+import pytest
+
+import app.services.rollup_service as rollup_service
+from app.database import HOME_SHARD, SessionLocal, shard_for_patient
+from app.models.prescription import Prescription
+from app.models.rollup import DoctorDailyRollup, MedicationDailyRollup
+from app.schemas.prescription import PrescriptionCreate
+from app.services.prescription_service import PrescriptionService
+from app.services.rollup_service import RollupService
+
+DOCTOR_ID = 9501
+HOME_PATIENTS = [patient_id for patient_id in range(9000, 9100) if shard_for_patient(patient_id) == HOME_SHARD]
+
+
+def create(patient_id: int, days: int, issued_at: datetime) -> Prescription:
+    db = SessionLocal()
+    try:
+        return PrescriptionService.create_prescriptions(db, [PrescriptionCreate(
+            appointment_id=f"ROLLUP-{patient_id}-{days}",
+            patient_id=patient_id,
+            doctor_id=DOCTOR_ID,
+            medication="Rollupine",
+            dosage="1-0-1",
+            days=days,
+            issued_at=issued_at
+        )])[0]
+    finally:
+        db.close()
+
+
+def expected(db, key_column: str) -> dict:
+    """This doctor's rollups computed directly from the prescriptions table"""
+    totals = defaultdict(lambda: (0, 0))
+    for prescription in db.query(Prescription).filter(Prescription.doctor_id == DOCTOR_ID).all():
+        key = (getattr(prescription, key_column), prescription.issued_at.date())
+        count, days = totals[key]
+        totals[key] = (count + 1, days + prescription.days)
+    return dict(totals)
+
+
+def actual(db, model, key_column: str) -> dict:
+    """Stored rollup rows for this doctor's prescriptions (Rollupine is only prescribed by them)"""
+    keys = {key for key, _ in expected(db, key_column)}
+    return {
+        (getattr(row, key_column), row.day): (row.prescription_count, row.total_days)
+        for row in db.query(model).filter(getattr(model, key_column).in_(keys)).all()
+    }
+
+
+@pytest.fixture(scope="module")
+def db(client):
+    for offset, patient_id in enumerate(HOME_PATIENTS[:6]):
+        create(patient_id, days=offset + 1, issued_at=datetime(2024, 3, 1 + offset % 2, 9))
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_increments_match_the_base_table(db):
+    assert actual(db, DoctorDailyRollup, "doctor_id") == expected(db, "doctor_id")
+    assert actual(db, MedicationDailyRollup, "medication_id") == expected(db, "medication_id")
+
+
+def test_rebuild_repairs_drift(db):
+    db.query(DoctorDailyRollup).update({DoctorDailyRollup.prescription_count: DoctorDailyRollup.prescription_count + 5})
+    db.query(MedicationDailyRollup).delete()
+    db.commit()
+
+    processed = RollupService.rebuild(db, chunk_size=2)
+
+    assert processed == db.query(Prescription).count()
+    assert actual(db, DoctorDailyRollup, "doctor_id") == expected(db, "doctor_id")
+    assert actual(db, MedicationDailyRollup, "medication_id") == expected(db, "medication_id")
+
+
+def test_rebuild_keeps_serving_and_counts_concurrent_creates_once(db, monkeypatch):
+    aggregate = RollupService._aggregate_into_staging
+    seen = []
+
+    def aggregate_with_concurrent_create(session, lower, upper, kept_before=None):
+        if upper is not None and not seen:
+            # Dashboards still read the old counts while the staging tables fill
+            seen.append(session.query(DoctorDailyRollup).count())
+            create(HOME_PATIENTS[6], days=7, issued_at=datetime(2024, 3, 1, 9))
+        return aggregate(session, lower, upper, kept_before)
+
+    monkeypatch.setattr(RollupService, "_aggregate_into_staging", staticmethod(aggregate_with_concurrent_create))
+    RollupService.rebuild(db, chunk_size=2)
+
+    assert seen and seen[0] > 0
+    assert actual(db, DoctorDailyRollup, "doctor_id") == expected(db, "doctor_id")
+    assert actual(db, MedicationDailyRollup, "medication_id") == expected(db, "medication_id")
+
+
+def test_portable_increment_fallback(db, monkeypatch):
+    monkeypatch.setattr(rollup_service, "_dialect", lambda session: "postgresql")
+    day = date(2031, 1, 1)
+
+    RollupService._increment(db, DoctorDailyRollup, {(DOCTOR_ID, day): (2, 10)}, ("doctor_id", "day"))
+    db.flush()
+    RollupService._increment(db, DoctorDailyRollup, {(DOCTOR_ID, day): (1, 4)}, ("doctor_id", "day"))
+    db.flush()
+
+    row = db.get(DoctorDailyRollup, (DOCTOR_ID, day))
+    db.refresh(row)
+    assert (row.prescription_count, row.total_days) == (3, 14)
+    db.rollback()
@@ -0,0 +1,143 @@
+"""
+Tests for prescription sharding by patient_id, with SQLite files standing in for shards
+"""
+
+import pytest
+
+from app.database import SHARD_COUNT, SHARD_ID_SPACE, shard_for_id, shard_for_patient
+
+DOCTOR_ID = 9001
+
+
+@pytest.fixture(scope="module")
+def created(client):
+    """Two prescriptions for each of 15 patients, all by one doctor"""
+    prescriptions = []
+    for patient_id in range(5000, 5015):
+        for days in (3, 5):
+            response = client.post("/api/v1/prescriptions/", json={
+                "appointment_id": f"SHARD-{patient_id}-{days}",
+                "patient_id": patient_id,
+                "doctor_id": DOCTOR_ID,
+                "medication": "Shardomycin",
+                "dosage": "1-0-1",
+                "days": days
+            })
+            assert response.status_code == 201, response.text
+            prescriptions.append(response.json())
+    return prescriptions
+
+
+def test_uses_several_shards():
+    assert SHARD_COUNT == 3
+
+
+def test_prescription_ids_carry_patient_shard(created):
+    for prescription in created:
+        assert shard_for_id(prescription["prescription_id"]) == shard_for_patient(prescription["patient_id"])
+    assert {shard_for_id(prescription["prescription_id"]) for prescription in created} == set(range(SHARD_COUNT))
+
+
+def test_get_by_id_reads_the_owning_shard(client, created):
+    for prescription in created:
+        response = client.get(f"/api/v1/prescriptions/{prescription['prescription_id']}")
+        assert response.status_code == 200
+        assert response.json() == prescription
+
+
+def test_get_by_id_outside_every_shard_is_not_found(client):
+    assert client.get(f"/api/v1/prescriptions/{SHARD_COUNT * SHARD_ID_SPACE + 1}").status_code == 404
+
+
+def test_patient_reads_do_not_scatter(client, created, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("patient reads must hit a single shard")
+
+    monkeypatch.setattr("app.services.prescription_service.scatter", fail)
+    response = client.get("/api/v1/prescriptions/patient/5003")
+    assert response.status_code == 200
+    assert response.json()["total"] == 2
+
+
+def test_doctor_pages_merge_in_id_order(client, created):
+    expected = sorted(prescription["prescription_id"] for prescription in created)
+
+    pages = []
+    for skip in range(0, len(expected), 7):
+        response = client.get(f"/api/v1/prescriptions/doctor/{DOCTOR_ID}?skip={skip}&limit=7").json()
+        assert response["total"] == len(expected)
+        pages.extend(prescription["prescription_id"] for prescription in response["prescriptions"])
+
+    assert pages == expected
+
+
+def test_doctor_pages_follow_after_id(client, created):
+    expected = sorted(prescription["prescription_id"] for prescription in created)
+
+    pages = []
+    after_id = 0
+    while True:
+        response = client.get(f"/api/v1/prescriptions/doctor/{DOCTOR_ID}?after_id={after_id}&limit=7").json()
+        assert response["total"] == len(expected)
+        if not response["prescriptions"]:
+            break
+        pages.extend(prescription["prescription_id"] for prescription in response["prescriptions"])
+        after_id = pages[-1]
+
+    assert pages == expected
+
+
+def test_skip_is_capped(client):
+    assert client.get("/api/v1/prescriptions/?skip=10000&limit=1").status_code == 200
+    assert client.get("/api/v1/prescriptions/?skip=10001&limit=1").status_code == 422
+    assert client.get(f"/api/v1/prescriptions/doctor/{DOCTOR_ID}?skip=10001").status_code == 422
+
+
+def test_appointment_query_finds_prescription_on_any_shard(client, created):
+    for prescription in created[:6]:
+        response = client.get(f"/api/v1/prescriptions/appointment/{prescription['appointment_id']}/prescriptions")
+        assert [row["prescription_id"] for row in response.json()] == [prescription["prescription_id"]]
+
+
+def test_dashboard_adds_up_shards(client, created):
+    response = client.get(f"/api/v1/dashboards/doctors/{DOCTOR_ID}/daily").json()
+    assert response["total"] == len(created)
+    assert sum(day["total_days"] for day in response["days"]) == sum(p["days"] for p in created)
+
+
+def test_idempotent_replay_on_every_shard(client):
+    for patient_id in range(6000, 6006):
+        body = {
+            "appointment_id": f"IDEM-{patient_id}",
+            "patient_id": patient_id,
+            "doctor_id": DOCTOR_ID + 1,
+            "medication": "Shardomycin",
+            "dosage": "0-0-1",
+            "days": 1
+        }
+        headers = {"Idempotency-Key": f"shard-test-{patient_id}"}
+        first = client.post("/api/v1/prescriptions/", json=body, headers=headers)
+        again = client.post("/api/v1/prescriptions/", json=body, headers=headers)
+        assert first.status_code == again.status_code == 201
+        assert again.headers["Idempotent-Replayed"] == "true"
+        assert again.json()["prescription_id"] == first.json()["prescription_id"]
+
+
+def test_change_feed_cursor_covers_every_shard(client, created):
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 4} if cursor is None else {"limit": 4, "since": cursor}
+        response = client.get("/api/v1/prescriptions/changes", params=params).json()
+        if not response["changes"]:
+            break
+        seen.extend(change["prescription_id"] for change in response["changes"])
+        cursor = response["next_cursor"]
+
+    assert len(cursor.split(".")) == SHARD_COUNT
+    assert len(seen) == len(set(seen))
+    assert {prescription["prescription_id"] for prescription in created} <= set(seen)
+
+
+def test_change_feed_rejects_single_shard_cursor(client):
+    assert client.get("/api/v1/prescriptions/changes", params={"since": "5"}).status_code == 400
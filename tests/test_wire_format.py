@@ -0,0 +1,113 @@
+"""
+Tests for Accept-header negotiation of the prescription response formats
+"""
+
+import json
+
+import msgpack
+import pytest
+
+from app.utils.wire_format import (
+    COLUMNAR_JSON_MEDIA_TYPE,
+    COLUMNAR_MSGPACK_MEDIA_TYPE,
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    choose_media_type
+)
+
+API_PREFIX = "/api/v1/prescriptions"
+DOCTOR_ID = 9101
+
+
+@pytest.fixture(scope="module")
+def created(client):
+    """Three prescriptions by one doctor"""
+    prescriptions = []
+    for patient_id in range(7000, 7003):
+        response = client.post(f"{API_PREFIX}/", json={
+            "appointment_id": f"WIRE-{patient_id}",
+            "patient_id": patient_id,
+            "doctor_id": DOCTOR_ID,
+            "medication": "Wireazole",
+            "dosage": "1-0-1",
+            "days": 4
+        })
+        assert response.status_code == 201, response.text
+        prescriptions.append(response.json())
+    return sorted(prescriptions, key=lambda prescription: prescription["prescription_id"])
+
+
+def test_choose_media_type():
+    assert choose_media_type(None) == JSON_MEDIA_TYPE
+    assert choose_media_type("*/*") == JSON_MEDIA_TYPE
+    assert choose_media_type("text/html") == JSON_MEDIA_TYPE
+    assert choose_media_type(f"{COLUMNAR_JSON_MEDIA_TYPE}, {JSON_MEDIA_TYPE};q=0.5") == COLUMNAR_JSON_MEDIA_TYPE
+    assert choose_media_type(f"{COLUMNAR_JSON_MEDIA_TYPE};q=0.2, application/*") == JSON_MEDIA_TYPE
+
+
+def test_json_is_default(client, created):
+    response = client.get(f"{API_PREFIX}/doctor/{DOCTOR_ID}")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == JSON_MEDIA_TYPE
+    assert response.headers["vary"] == "Accept"
+    assert response.json() == {"total": 3, "prescriptions": created}
+
+
+def test_columnar_list(client, created):
+    response = client.get(f"{API_PREFIX}/doctor/{DOCTOR_ID}", headers={"Accept": COLUMNAR_JSON_MEDIA_TYPE})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == COLUMNAR_JSON_MEDIA_TYPE
+    assert response.headers["vary"] == "Accept"
+    body = response.json()
+    assert body["total"] == 3
+    assert body["prescriptions"] == {
+        field: [prescription[field] for prescription in created] for field in created[0]
+    }
+
+
+def test_columnar_single_prescription_is_a_row(client, created):
+    prescription = created[0]
+    response = client.get(
+        f"{API_PREFIX}/{prescription['prescription_id']}",
+        headers={"Accept": COLUMNAR_JSON_MEDIA_TYPE}
+    )
+
+    assert response.status_code == 200
+    assert json.loads(response.content) == prescription
+
+
+def test_msgpack(client, created):
+    response = client.get(f"{API_PREFIX}/doctor/{DOCTOR_ID}", headers={"Accept": MSGPACK_MEDIA_TYPE})
+    assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE
+    assert msgpack.unpackb(response.content) == {"total": 3, "prescriptions": created}
+
+    response = client.get(f"{API_PREFIX}/doctor/{DOCTOR_ID}", headers={"Accept": COLUMNAR_MSGPACK_MEDIA_TYPE})
+    assert response.headers["content-type"] == COLUMNAR_MSGPACK_MEDIA_TYPE
+    assert msgpack.unpackb(response.content)["prescriptions"]["prescription_id"] == [
+        prescription["prescription_id"] for prescription in created
+    ]
+
+    response = client.post(f"{API_PREFIX}/", headers={"Accept": MSGPACK_MEDIA_TYPE}, json={
+        "appointment_id": "WIRE-MSGPACK",
+        "patient_id": 7100,
+        "doctor_id": DOCTOR_ID + 1,
+        "medication": "Wireazole",
+        "dosage": "1-0-1",
+        "days": 4
+    })
+    assert response.status_code == 201
+    assert msgpack.unpackb(response.content)["appointment_id"] == "WIRE-MSGPACK"
+
+
+def test_msgpack_falls_back_to_json_when_unavailable(client, created, monkeypatch):
+    monkeypatch.setattr("app.utils.wire_format.msgpack", None)
+    choose_media_type.cache_clear()
+    try:
+        response = client.get(f"{API_PREFIX}/doctor/{DOCTOR_ID}", headers={"Accept": MSGPACK_MEDIA_TYPE})
+    finally:
+        choose_media_type.cache_clear()
+
+    assert response.headers["content-type"] == JSON_MEDIA_TYPE
+    assert response.json()["total"] == 3